@@ -34,7 +34,9 @@ class Student:
         self.branch = branch
 
         # Logging an informational message when a student is added
-        logger.info("Added Student: {} from {}".format(self.name, self.branch))
+        # The arguments are passed separately rather than with "...".format(), so the message
+        # is only built if INFO is enabled (see json_formatter.py for LazyFormat and Lazy)
+        logger.info("Added Student: %s from %s", self.name, self.branch)
 
 # Creating instances of the Student class
 student_1 = Student("Lucifer", "Computer Science")
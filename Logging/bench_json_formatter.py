@@ -0,0 +1,86 @@
+'''
+Microbenchmarks of json_formatter.py.
+
+1. Formatting throughput, records/s, of one prepared LogRecord:
+   - logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"), basics2_1.py
+   - a naive JSON formatter: formatTime() and json.dumps() per record, all attributes
+   - JsonFormatter, with and without an extra= field
+   - JsonFormatter with the timestamp cache defeated (a new second every record)
+2. The cost of one log call at a disabled level (DEBUG off), ns per call:
+   - "...".format(...) before the call, as the Student class in basics2_1.py does
+   - %-style arguments
+   - LazyFormat
+   - an expensive argument, computed eagerly or wrapped in Lazy
+
+Run it from inside the Logging folder:
+
+    python bench_json_formatter.py
+'''
+
+import json
+import logging
+import timeit
+
+from json_formatter import RECORD_ATTRS, JsonFormatter, Lazy, LazyFormat
+
+N = 100_000
+
+
+class NaiveJsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = dict(record.__dict__)
+        payload["message"] = record.getMessage()
+        payload["timestamp"] = self.formatTime(record, "%Y-%m-%dT%H:%M:%S")
+        return json.dumps(payload, default=str, separators=(",", ":"))
+
+
+def make_record(**extra):
+    record = logging.LogRecord(
+        "basics2_1", logging.INFO, __file__, 42, "Added Student: %s from %s", ("Lucifer", "Computer Science"), None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+def rate(formatter, record, n=N, before=None):
+    def one():
+        if before:
+            before(record)
+        formatter.format(record)
+
+    return n / timeit.timeit(one, number=n)
+
+
+def expensive():
+    return sum(range(1000))
+
+
+if __name__ == "__main__":
+    record = make_record()
+    with_extra = make_record(student_id=7)
+    fresh = make_record()
+
+    def next_second(record):
+        record.created += 1
+
+    print("formatting, records/s")
+    print(f"  logging.Formatter with asctime        {rate(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'), record):>10,.0f}")
+    print(f"  naive json.dumps of the record        {rate(NaiveJsonFormatter(), record):>10,.0f}")
+    print(f"  JsonFormatter                         {rate(JsonFormatter(), record):>10,.0f}")
+    print(f"  JsonFormatter, one extra= field       {rate(JsonFormatter(), with_extra):>10,.0f}")
+    print(f"  JsonFormatter, new second per record  {rate(JsonFormatter(), fresh, before=next_second):>10,.0f}")
+    assert "student_id" not in RECORD_ATTRS and '"student_id":7' in JsonFormatter().format(with_extra)
+
+    logger = logging.getLogger("bench")
+    logger.setLevel(logging.INFO)
+    name, branch = "Lucifer", "Computer Science"
+    calls = {
+        "str.format() before the call": lambda: logger.debug("Added Student: {} from {}".format(name, branch)),
+        "%-style arguments": lambda: logger.debug("Added Student: %s from %s", name, branch),
+        "LazyFormat": lambda: logger.debug(LazyFormat("Added Student: {} from {}", name, branch)),
+        "expensive argument": lambda: logger.debug("sum %s", expensive()),
+        "expensive argument in Lazy": lambda: logger.debug("sum %s", Lazy(expensive)),
+    }
+    print("\nDEBUG disabled, ns per call")
+    for label, call in calls.items():
+        print(f"  {label:<30} {timeit.timeit(call, number=N) / N * 1e9:>8,.0f}")
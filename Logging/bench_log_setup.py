@@ -0,0 +1,111 @@
+'''
+Cost of one logger.info() call on the calling thread, with the handler setup of
+basics2_1.py (a FileHandler on the logger) and with setup_logging() (log_setup.py).
+
+1. Fast disk: the file lands in the page cache, a flush costs microseconds.
+2. Slow disk: every flush also sleeps FLUSH_DELAY, standing in for a busy disk, a
+   network file system or an fsync. This is what the queue is for: the FileHandler
+   flushes after every record on the calling thread, the pipeline once per batch on
+   its own thread.
+3. A burst much larger than the queue, on the slow disk, with policy="drop": the
+   records that were dropped instead of slowing the caller down.
+
+On a single CPU the writer thread shares the GIL with the caller, so on the fast disk
+the queue only adds work; its per-call time there includes the writer's share.
+
+The files go to a temporary folder. Run it from inside the Logging folder:
+
+    python bench_log_setup.py
+'''
+
+import logging
+import os
+import tempfile
+import time
+
+from log_setup import BufferedFileHandler, setup_logging
+
+RECORDS = 100_000
+SLOW_RECORDS = 2_000
+FLUSH_DELAY = 0.001
+FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+
+class SlowFileHandler(logging.FileHandler):
+    def flush(self):
+        super().flush()
+        time.sleep(FLUSH_DELAY)
+
+
+class SlowBufferedFileHandler(BufferedFileHandler):
+    def flush(self):
+        super().flush()
+        time.sleep(FLUSH_DELAY)
+
+
+def new_logger(name):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    return logger
+
+
+def log_loop(logger, n):
+    start = time.perf_counter()
+    for i in range(n):
+        logger.info("Added Student: %s from %s", i, "Computer Science")
+    return time.perf_counter() - start
+
+
+def direct(handler_class, path, n):
+    logger = new_logger(f"direct-{handler_class.__name__}")
+    logger.setLevel(logging.DEBUG)
+    handler = handler_class(path)
+    handler.setFormatter(logging.Formatter(FORMAT, datefmt="%Y-%m-%d %H:%M:%S"))
+    logger.addHandler(handler)
+    elapsed = log_loop(logger, n)
+    logger.removeHandler(handler)
+    handler.close()
+    return elapsed
+
+
+def queued(handler_class, path, n, policy="block", queue_size=RECORDS):
+    logger = new_logger(f"queued-{handler_class.__name__}-{policy}")
+    pipeline = setup_logging(
+        [handler_class(path)],
+        logger=logger,
+        formatter=logging.Formatter(FORMAT, datefmt="%Y-%m-%d %H:%M:%S"),
+        queue_size=queue_size,
+        policy=policy,
+    )
+    elapsed = log_loop(logger, n)
+    start = time.perf_counter()
+    pipeline.stop()
+    return elapsed, time.perf_counter() - start, pipeline.stats()
+
+
+def compare(title, direct_class, queued_class, n, folder):
+    print(f"{title}, {n:,} logger.info() calls, microseconds per call on the calling thread")
+    elapsed = direct(direct_class, os.path.join(folder, "direct.log"), n)
+    print(f"  FileHandler on the logger (basics2_1)  {elapsed / n * 1e6:8.2f}")
+    elapsed, drain, stats = queued(queued_class, os.path.join(folder, "queued.log"), n)
+    print(
+        f"  setup_logging                          {elapsed / n * 1e6:8.2f}"
+        f"   (+{drain:.2f} s for the writer to finish, {stats['batches']:,} flushes)"
+    )
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as folder:
+        compare("fast disk", logging.FileHandler, BufferedFileHandler, RECORDS, folder)
+        print()
+        compare(f"slow disk ({FLUSH_DELAY * 1000:.0f} ms per flush)", SlowFileHandler, SlowBufferedFileHandler, SLOW_RECORDS, folder)
+
+        burst = RECORDS
+        elapsed, drain, stats = queued(
+            SlowBufferedFileHandler, os.path.join(folder, "burst.log"), burst, policy="drop", queue_size=1000
+        )
+        print(f"\nslow disk, burst of {burst:,} into a queue of 1,000, policy='drop'")
+        print(
+            f"  {elapsed / burst * 1e6:.2f} us per call, {stats['written']:,} written, "
+            f"{stats['dropped_total']:,} dropped {stats['dropped']}"
+        )
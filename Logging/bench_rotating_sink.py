@@ -0,0 +1,74 @@
+'''
+Sustained write throughput of RotatingFileSink (rotating_sink.py) with rotation on.
+
+RECORDS log lines of ~110 bytes go through setup_logging() (log_setup.py) into:
+
+- BufferedFileHandler, no rotation, the baseline
+- logging.handlers.RotatingFileHandler, the standard library one: flushes every line
+  and doesn't compress
+- RotatingFileSink, no compression
+- RotatingFileSink, gzip on the compressor thread
+- RotatingFileSink, gzip, fsync="flush" (every batch forced to the disk)
+
+with files rotated every MAX_BYTES and BACKUP_COUNT kept. The time runs until the sink
+is closed, i.e. until the last rotated file is compressed. The files go to a temporary
+folder. Run it from inside the Logging folder:
+
+    python bench_rotating_sink.py
+'''
+
+import logging
+import os
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+from log_setup import BufferedFileHandler, setup_logging
+from rotating_sink import RotatingFileSink
+
+RECORDS = 300_000
+MAX_BYTES = 4 * 2**20
+BACKUP_COUNT = 3
+FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+
+def line_bytes():
+    record = logging.LogRecord(
+        "sink", logging.INFO, __file__, 0, "Added Student: %s from %s, enrolled in %d courses",
+        (f"student-{RECORDS // 2}", "Computer Science", 3), None,
+    )
+    return len(logging.Formatter(FORMAT).format(record)) + 1
+
+
+def run(label, make_handler, folder):
+    path = os.path.join(folder, f"{label}.log")
+    handler = make_handler(path)
+    logger = logging.getLogger(label)
+    logger.propagate = False
+    pipeline = setup_logging([handler], logger=logger, formatter=logging.Formatter(FORMAT), policy="block")
+    start = time.perf_counter()
+    for i in range(RECORDS):
+        logger.info("Added Student: %s from %s, enrolled in %d courses", f"student-{i}", "Computer Science", i % 7)
+    pipeline.stop()
+    elapsed = time.perf_counter() - start
+
+    files = [entry for entry in os.listdir(folder) if entry.startswith(f"{label}.log")]
+    size = sum(os.path.getsize(os.path.join(folder, entry)) for entry in files)
+    for entry in files:
+        os.remove(os.path.join(folder, entry))
+    rotations = getattr(handler, "stats", {}).get("rotations", "-")
+    print(
+        f"{label:<22} {RECORDS / elapsed:>10,.0f} {RECORDS * line_bytes() / elapsed / 2**20:>7.1f}"
+        f" {rotations:>9} {len(files):>6} {size / 2**20:>8.1f}"
+    )
+
+
+if __name__ == "__main__":
+    print(f"{RECORDS:,} records of {line_bytes()} bytes, rotate at {MAX_BYTES // 2**20} MB, keep {BACKUP_COUNT}")
+    print(f"{'sink':<22} {'records/s':>10} {'MB/s':>7} {'rotations':>9} {'files':>6} {'on disk':>8}")
+    with tempfile.TemporaryDirectory() as folder:
+        run("buffered", BufferedFileHandler, folder)
+        run("stdlib-rotating", lambda path: RotatingFileHandler(path, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT), folder)
+        run("sink", lambda path: RotatingFileSink(path, MAX_BYTES, backup_count=BACKUP_COUNT, compress=False), folder)
+        run("sink-gzip", lambda path: RotatingFileSink(path, MAX_BYTES, backup_count=BACKUP_COUNT), folder)
+        run("sink-gzip-fsync", lambda path: RotatingFileSink(path, MAX_BYTES, backup_count=BACKUP_COUNT, fsync="flush"), folder)
@@ -0,0 +1,160 @@
+'''
+A structured (JSON lines) log formatter, and helpers that make log calls at a
+disabled level close to free.
+
+JsonFormatter writes every record as one JSON object per line, which log collectors
+can parse without a regex:
+
+    {"timestamp":"2024-10-31T12:00:00.123Z","level":"INFO","logger":"basics2_1","message":"Added Student: Lucifer from Computer Science"}
+
+Building JSON costs more than filling in a "%(asctime)s ..." string, but JsonFormatter
+keeps the work per record down:
+
+- The timestamp: formatTime() (asctime) runs time.strftime() for every record. Records of the same
+  second share everything up to the milliseconds, so the formatted second is cached
+  and only the milliseconds are added per record.
+- Only the fields asked for: a LogRecord has ~20 attributes; the formatter looks up
+  just the fields it was given (plus the extra= ones), instead of dumping
+  record.__dict__ and throwing most of it away.
+- One JSON encoder for all records: json.dumps() with any non-default option (like
+  separators) builds a new JSONEncoder on every call.
+
+Log calls at a disabled level: logger.debug(...) checks the level first and returns,
+but the arguments have been evaluated by then. Two things still cost time:
+
+- Pre-formatting: logger.info("Added Student: {} from {}".format(name, branch)) (as in
+  the Student class of basics2_1.py) builds the string even when INFO is off. Pass the
+  arguments instead, logger.info("Added Student: %s from %s", name, branch), or for
+  {}-style messages LazyFormat("Added Student: {} from {}", name, branch).
+- Expensive arguments: logger.debug("state %s", Lazy(dump_state)) calls dump_state()
+  only if the record is actually formatted. For a whole block of code that only
+  prepares a message, check logger.isEnabledFor(logging.DEBUG) first.
+'''
+
+import json
+import logging
+import time
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+# The attributes every LogRecord has. Anything else on a record came from extra=.
+RECORD_ATTRS = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+DEFAULT_FIELDS = ("timestamp", "level", "logger", "message")
+
+# output key -> how to get it from the record, with the formatter as the first argument
+FIELDS: Dict[str, Callable[["JsonFormatter", logging.LogRecord], Any]] = {
+    "timestamp": lambda formatter, record: formatter.timestamp(record),
+    "level": lambda formatter, record: record.levelname,
+    "logger": lambda formatter, record: record.name,
+    "message": lambda formatter, record: record.getMessage(),
+    "module": lambda formatter, record: record.module,
+    "function": lambda formatter, record: record.funcName,
+    "line": lambda formatter, record: record.lineno,
+    "path": lambda formatter, record: record.pathname,
+    "thread": lambda formatter, record: record.threadName,
+    "process": lambda formatter, record: record.process,
+}
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(
+        self,
+        fields: Iterable[str] = DEFAULT_FIELDS,
+        include_extra: bool = True,
+        datefmt: str = "%Y-%m-%dT%H:%M:%S",
+        utc: bool = True,
+    ) -> None:
+        """
+        Args:
+            fields (list): output keys, from FIELDS or any LogRecord attribute name
+                (e.g. "levelno", "created").
+            include_extra (bool): add the attributes passed with extra= as well.
+            datefmt (str): time.strftime format of the timestamp up to the second,
+                the milliseconds are appended.
+            utc (bool): UTC ("...Z") or local time.
+        """
+        super().__init__(datefmt=datefmt)
+        self.getters: Tuple[Tuple[str, Callable[["JsonFormatter", logging.LogRecord], Any]], ...] = tuple(
+            (field, FIELDS.get(field) or self._attribute(field)) for field in fields
+        )
+        self.include_extra = include_extra
+        self.utc = utc
+        self.suffix = "Z" if utc else ""
+        self.to_struct_time = time.gmtime if utc else time.localtime
+        # (second, formatted second), swapped as one tuple so threads never see half of it
+        self.cached_second: Tuple[int, str] = (-1, "")
+        self.encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=str)
+
+    @staticmethod
+    def _attribute(name: str) -> Callable[["JsonFormatter", logging.LogRecord], Any]:
+        if name not in RECORD_ATTRS:
+            raise ValueError(f"unknown field {name!r}")
+        getter = attrgetter(name)
+        return lambda formatter, record: getter(record)
+
+    def timestamp(self, record: logging.LogRecord) -> str:
+        second = int(record.created)
+        cached, text = self.cached_second
+        if second != cached:
+            text = time.strftime(self.datefmt, self.to_struct_time(second))
+            self.cached_second = (second, text)
+        return f"{text}.{int(record.msecs):03d}{self.suffix}"
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {key: getter(self, record) for key, getter in self.getters}
+        if self.include_extra:
+            # a set difference, done in C, tells whether there is anything to look for
+            extra = record.__dict__.keys() - RECORD_ATTRS
+            if extra:
+                for key, value in record.__dict__.items():
+                    if key in extra and key not in payload:
+                        payload[key] = value
+        if record.exc_info:
+            # cached on the record like logging.Formatter does, for the other handlers
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        if record.stack_info:
+            payload["stack"] = self.formatStack(record.stack_info)
+        return self.encoder.encode(payload)
+
+
+class Lazy:
+    """
+    A log argument computed only if the record is formatted:
+
+        logger.debug("cache state %s", Lazy(cache.dump))
+    """
+
+    __slots__ = ("fn", "args", "kwargs")
+
+    def __init__(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        return str(self.fn(*self.args, **self.kwargs))
+
+    __repr__ = __str__
+
+
+class LazyFormat:
+    """
+    A str.format() message, formatted only if the record is:
+
+        logger.info(LazyFormat("Added Student: {} from {}", name, branch))
+    """
+
+    __slots__ = ("fmt", "args", "kwargs")
+
+    def __init__(self, fmt: str, *args: Any, **kwargs: Any) -> None:
+        self.fmt = fmt
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        return self.fmt.format(*self.args, **self.kwargs)
+
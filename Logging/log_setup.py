@@ -0,0 +1,270 @@
+'''
+A non-blocking logging setup: the thread calling logger.info() only puts the record
+on a queue, and one background thread writes them out.
+
+In basics2_1.py and basics2_2.py the FileHandler is attached to the logger itself, so
+every logger.info() formats the line, writes it and flushes it to the file on the
+thread that logged, usually while handling something more important. A slow disk
+shows up directly as a slow request.
+
+Here the logger gets a BoundedQueueHandler instead, which only puts the record on a
+queue.Queue, and a BatchingQueueListener thread passes the records on to the real
+handlers (file, console):
+
+- Batched flushes: the listener takes every record waiting in the queue (up to
+  batch_size) in one go, has the handlers write all of them and then flushes each
+  handler once. BufferedFileHandler is a FileHandler that doesn't flush after every
+  record, so a batch of 200 lines is one write to the disk instead of 200.
+- Bounded buffer: the queue holds at most queue_size records. When it is full (the
+  disk can't keep up) policy decides: "drop" throws the new record away, counted per
+  level, so logging never slows the program down; "block" makes the logging thread
+  wait for room, so nothing is lost. With "drop", records at never_drop_level (ERROR)
+  and above still block: losing an error is worse than waiting for the disk. A record
+  that is going to be dropped is dropped before it is formatted (prepare()), so a full
+  queue costs the logging thread next to nothing.
+- Exceptions stay structured: QueueHandler.prepare() formats the whole line with the
+  queue handler's own formatter and folds the traceback into the message, so the real
+  handlers (JsonFormatter's "exception" field, see json_formatter.py) would never see
+  it. BoundedQueueHandler.prepare() only merges the arguments into the message and
+  turns exc_info into exc_text, the traceback text every logging.Formatter prints.
+- A failing handler (disk full, closed file) is reported through its handleError() and
+  counted, the writer thread keeps going: if it died, the queue would fill up and every
+  blocking logger.error() with it.
+- stats() reports the records queued, dropped (per level) and written (handled by at
+  least one handler), the batches and the flush errors.
+
+    pipeline = setup_logging(
+        handlers=[BufferedFileHandler("student.log")],
+        formatter=logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"),
+    )
+    logging.getLogger(__name__).info("Added Student: %s", name)
+    pipeline.stop()  # also done at exit: writes out what is still queued
+'''
+
+import atexit
+import copy
+import logging
+import queue
+import threading
+from collections import Counter
+from logging.handlers import QueueHandler
+from typing import Any, Dict, List, Optional, Sequence
+
+# only used for its formatException(), which doesn't depend on the format string
+EXCEPTION_FORMATTER = logging.Formatter()
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    A FileHandler that leaves flushing to whoever calls flush(), e.g. the
+    BatchingQueueListener after each batch. The lines collect in the file object's
+    buffer in the meantime.
+    """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.stream is None:
+            # closed, or opened with delay=True: let FileHandler (re)open it
+            super().emit(record)
+            return
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class BoundedQueueHandler(QueueHandler):
+    def __init__(
+        self,
+        queue_size: int = 10_000,
+        policy: str = "drop",
+        never_drop_level: int = logging.ERROR,
+        block_timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Args:
+            queue_size (int): records the queue holds.
+            policy (str): "drop" or "block", what happens to a record when the queue is full.
+            never_drop_level (int): with policy="drop", records at this level and above
+                block instead of being dropped.
+            block_timeout (float): seconds a blocked record waits for room before it is
+                dropped after all, None waits as long as it takes.
+        """
+        if policy not in ("drop", "block"):
+            raise ValueError(f"unknown policy {policy!r}")
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.policy = policy
+        self.never_drop_level = never_drop_level
+        self.block_timeout = block_timeout
+        self.dropped: Counter = Counter()
+        self.counter_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The args are merged on this thread, they may not be safe to format later on
+        # another one. exc_info (with the traceback's frames) is replaced by its text.
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def blocks(self, record: logging.LogRecord) -> bool:
+        return self.policy == "block" or record.levelno >= self.never_drop_level
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            # QueueHandler.emit() would prepare() (format) the record first, wasted on
+            # one that is dropped. full() can still race, enqueue() handles that.
+            if not self.blocks(record) and self.queue.full():
+                self._drop(record)
+                return
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self.blocks(record):
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self._drop(record)
+
+    def _drop(self, record: logging.LogRecord) -> None:
+        with self.counter_lock:
+            self.dropped[record.levelname] += 1
+
+
+class BatchingQueueListener:
+    """
+    Like logging.handlers.QueueListener, but takes the records in batches and flushes
+    the handlers once per batch.
+    """
+
+    def __init__(self, record_queue: "queue.Queue[Any]", handlers: Sequence[logging.Handler], batch_size: int = 256) -> None:
+        self.queue = record_queue
+        self.handlers = list(handlers)
+        self.batch_size = batch_size
+        self.thread: Optional[threading.Thread] = None
+        self.stats = {"written": 0, "batches": 0, "flush_errors": 0}
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Write out the records queued so far and stop the thread.
+        """
+        if self.thread is None:
+            return
+        self.queue.put(None)  # sentinel, like QueueListener
+        self.thread.join()
+        self.thread = None
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            written = 0
+            last: Optional[logging.LogRecord] = None
+            for record in batch:
+                if record is None:
+                    stop = True
+                    continue
+                written += self.handle(record)
+                last = record
+            for handler in self.handlers:
+                try:
+                    handler.flush()
+                except Exception:
+                    self.stats["flush_errors"] += 1
+                    if last is not None:
+                        handler.handleError(last)
+            self.stats["written"] += written
+            self.stats["batches"] += 1
+            if stop:
+                break
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        """
+        Pass record to the handlers, True if at least one of them took it (level and filters).
+        """
+        handled = False
+        for handler in self.handlers:
+            if record.levelno >= handler.level and handler.handle(record):
+                handled = True
+        return handled
+
+
+class LoggingPipeline:
+    def __init__(self, handler: BoundedQueueHandler, listener: BatchingQueueListener, logger: logging.Logger) -> None:
+        self.handler = handler
+        self.listener = listener
+        self.logger = logger
+
+    def stop(self) -> None:
+        """
+        Detach the queue handler, write out what is queued, and close the handlers.
+        """
+        atexit.unregister(self.stop)
+        self.logger.removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.handler.counter_lock:
+            dropped = dict(self.handler.dropped)
+        return {
+            "queued": self.handler.queue.qsize(),
+            "dropped": dropped,
+            "dropped_total": sum(dropped.values()),
+            **self.listener.stats,
+        }
+
+
+def setup_logging(
+    handlers: Sequence[logging.Handler],
+    logger: Optional[logging.Logger] = None,
+    level: int = logging.DEBUG,
+    formatter: Optional[logging.Formatter] = None,
+    queue_size: int = 10_000,
+    policy: str = "drop",
+    batch_size: int = 256,
+) -> LoggingPipeline:
+    """
+    Route logger (the root logger by default) through a bounded queue to handlers,
+    written by a background thread.
+
+    Args:
+        handlers (list): the handlers doing the actual output, BufferedFileHandler for files.
+        level (int): the logger's level.
+        formatter (logging.Formatter): set on every handler that has none yet.
+        queue_size (int), policy (str): see BoundedQueueHandler.
+        batch_size (int): most records written between two flushes.
+    """
+    logger = logger or logging.getLogger()
+    logger.setLevel(level)
+    handlers: List[logging.Handler] = list(handlers)
+    for handler in handlers:
+        if formatter is not None and handler.formatter is None:
+            handler.setFormatter(formatter)
+
+    queue_handler = BoundedQueueHandler(queue_size=queue_size, policy=policy)
+    listener = BatchingQueueListener(queue_handler.queue, handlers, batch_size=batch_size)
+    listener.start()
+    logger.addHandler(queue_handler)
+
+    pipeline = LoggingPipeline(queue_handler, listener, logger)
+    atexit.register(pipeline.stop)
+    return pipeline
@@ -0,0 +1,242 @@
+'''
+A rotating, compressing log file handler, so student.log and errors.log of the
+examples stop growing forever.
+
+RotatingFileSink is a BufferedFileHandler (log_setup.py) that starts a new file when
+the current one gets too big or too old:
+
+- Rotation: when writing the next line would take the file past max_bytes, or when
+  interval seconds have passed since the file was started, the file is closed and
+  renamed to <name>.<date>-<time>-<microseconds>, in UTC so that the names sort by age
+  even across a daylight saving change, and a new <name> is opened. Two rotations within
+  the clock's resolution (or after the clock went back) keep the last timestamp and add
+  a -<n> to it, so names never repeat and always sort in rotation order. Either limit
+  can be None.
+- Compression in the background: gzip is slow (tens of MB/s), too slow for the thread
+  writing the logs. Rotated files are handed to one compressor thread per sink, which
+  writes <rotated name>.gz (under a temporary name until it is complete) and removes
+  the original.
+- Retention: after every rotation the compressor thread deletes the oldest rotated
+  files (compressed or not) beyond backup_count, also when compressing failed. Only names of exactly that form
+  count, other files next to the log (app.log.1, app.log.bak) are left alone.
+- Buffered writes: the file is opened with a buffer of buffer_size bytes, and like
+  BufferedFileHandler, lines are only flushed when flush() is called (by the
+  BatchingQueueListener after each batch, see log_setup.py).
+- fsync: flush() only hands the data to the OS, a crash of the machine can still
+  lose it. fsync="flush" also forces it to the disk on every flush (safe, slow),
+  "rotate" only when a file is finished and on close, "never" leaves it to the OS.
+
+    pipeline = setup_logging([RotatingFileSink("student.log", max_bytes=50 * 2**20, backup_count=10)])
+
+Sizes are counted in characters of the formatted lines, the same as bytes for ASCII
+logs and a slight undercount for other UTF-8 text.
+'''
+
+import gzip
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from log_setup import BufferedFileHandler
+
+FSYNC_POLICIES = ("never", "rotate", "flush")
+
+
+class RotatingFileSink(BufferedFileHandler):
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: Optional[int] = 100 * 2**20,
+        interval: Optional[float] = None,
+        backup_count: int = 10,
+        compress: bool = True,
+        compress_level: int = 6,
+        buffer_size: int = 64 * 1024,
+        fsync: str = "rotate",
+        encoding: str = "utf-8",
+    ) -> None:
+        """
+        Args:
+            filename (str): the file written to, rotated files go next to it.
+            max_bytes (int): size at which the file is rotated, None for no limit.
+            interval (float): seconds after which the file is rotated, None for no limit.
+            backup_count (int): rotated files kept, the oldest beyond that are deleted.
+            compress (bool): gzip the rotated files.
+            compress_level (int): gzip level, 1 (fastest) to 9 (smallest).
+            buffer_size (int): bytes buffered before the file object writes to the OS.
+            fsync (str): "never", "rotate" or "flush", see the module docstring.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"unknown fsync policy {fsync!r}")
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self.compress = compress
+        self.compress_level = compress_level
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        self.size = 0
+        self.rotate_at: Optional[float] = None
+        # timestamp and sequence number of the last rotated name, see rotate()
+        self.last_rotated: Optional[Tuple[str, int]] = None
+        self.stats = {"rotations": 0, "compressed": 0, "deleted": 0}
+
+        self.jobs: "queue.Queue[Optional[str]]" = queue.Queue()
+        self.compressor = threading.Thread(target=self._compress_worker, name="log-compressor", daemon=True)
+        # opens the file: if that fails, there is no thread to leak yet
+        super().__init__(filename, mode="a", encoding=encoding)
+        self.rotated_name = re.compile(re.escape(os.path.basename(self.baseFilename)) + r"\.(\d{8}-\d{6}-\d{6})(?:-(\d+))?(?:\.gz)?")
+        self.compressor.start()
+
+    def _open(self):
+        stream = open(self.baseFilename, self.mode, buffering=self.buffer_size, encoding=self.encoding, errors=self.errors)
+        self.size = os.fstat(stream.fileno()).st_size
+        self.rotate_at = None
+        return stream
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self.stream is None:
+                if self._closed:
+                    # like FileHandler: no reopening after close(), the compressor is gone
+                    return
+                self.stream = self._open()
+            line = self.format(record) + self.terminator
+            if self.rotate_at is None and self.interval is not None:
+                self.rotate_at = record.created + self.interval
+            if self.size and (
+                (self.max_bytes is not None and self.size + len(line) > self.max_bytes)
+                or (self.rotate_at is not None and record.created >= self.rotate_at)
+            ):
+                self.rotate()
+                self.rotate_at = record.created + self.interval if self.interval is not None else None
+            self.stream.write(line)
+            self.size += len(line)
+        except Exception:
+            self.handleError(record)
+
+    def rotate(self) -> None:
+        """
+        Finish the current file, rename it and start a new one. Called with the handler's
+        lock held (from emit), or take it first.
+        """
+        if self.stream is not None:
+            self.stream.flush()
+            if self.fsync != "never":
+                os.fsync(self.stream.fileno())
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename):
+            stamp, sequence = f"{datetime.now(timezone.utc):%Y%m%d-%H%M%S-%f}", 0
+            if self.last_rotated is not None and stamp <= self.last_rotated[0]:
+                # counting on from the last name rather than taking the first free one:
+                # retention may have deleted an older name of this stamp by now
+                stamp, sequence = self.last_rotated[0], self.last_rotated[1] + 1
+            rotated = self._rotated_path(stamp, sequence)
+            # and never overwrite a file left by an earlier run
+            while os.path.exists(rotated) or os.path.exists(f"{rotated}.gz"):
+                sequence += 1
+                rotated = self._rotated_path(stamp, sequence)
+            os.replace(self.baseFilename, rotated)
+            self.last_rotated = (stamp, sequence)
+            self.stats["rotations"] += 1
+            self.jobs.put(rotated)
+        self.stream = self._open()
+
+    def _rotated_path(self, stamp: str, sequence: int) -> str:
+        return f"{self.baseFilename}.{stamp}-{sequence}" if sequence else f"{self.baseFilename}.{stamp}"
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.flush()
+                if self.fsync == "flush":
+                    os.fsync(self.stream.fileno())
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        """
+        Close the file and wait for the compressor thread to finish its work.
+        """
+        self.acquire()
+        try:
+            if self.stream is not None and self.fsync != "never":
+                self.stream.flush()
+                os.fsync(self.stream.fileno())
+            super().close()
+        finally:
+            self.release()
+        if self.compressor.is_alive():
+            self.jobs.put(None)
+            self.compressor.join()
+
+    # ------------------------ Compressor Thread ------------------------
+    def _compress_worker(self) -> None:
+        while True:
+            rotated = self.jobs.get()
+            if rotated is None:
+                break
+            try:
+                if self.compress:
+                    self._compress(rotated)
+                    self.stats["compressed"] += 1
+            except OSError:
+                logging.getLogger(__name__).exception("compressing %s failed", rotated)
+            finally:
+                # the uncompressed file still counts as a backup, so a failed compression
+                # (e.g. a full disk) mustn't stop old files from being deleted
+                self._delete_old_files()
+
+    def _compress(self, rotated: str) -> None:
+        # A crash or a full disk halfway leaves only the .tmp, never a truncated .gz that
+        # retention would count as a backup; the original stays until the .gz is complete.
+        partial = f"{rotated}.gz.tmp"
+        try:
+            with open(rotated, "rb") as source, gzip.open(partial, "wb", self.compress_level) as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+            os.replace(partial, f"{rotated}.gz")
+        except BaseException:
+            try:
+                os.remove(partial)
+            except FileNotFoundError:
+                pass
+            raise
+        os.remove(rotated)
+
+    def rotated_files(self) -> List[str]:
+        """
+        The rotated files, compressed or not, oldest first.
+        """
+        folder = os.path.dirname(self.baseFilename)
+        files = []
+        for entry in os.listdir(folder):
+            match = self.rotated_name.fullmatch(entry)
+            if match is not None:
+                files.append((match.group(1), int(match.group(2) or 0), entry))
+        # <name>.<date>-<time>-<microseconds>[-<n>][.gz], the UTC timestamp sorts by age,
+        # then the sequence number (as a number, so -10 comes after -9)
+        files.sort()
+        return [os.path.join(folder, entry) for _, _, entry in files]
+
+    def _delete_old_files(self) -> None:
+        # runs in the compressor thread, which has to outlive a failing listdir or remove
+        try:
+            files = self.rotated_files()
+        except OSError:
+            logging.getLogger(__name__).exception("listing the rotated files failed")
+            return
+        for path in files[: max(0, len(files) - self.backup_count)]:
+            try:
+                os.remove(path)
+                self.stats["deleted"] += 1
+            except FileNotFoundError:
+                pass
+            except OSError:
+                logging.getLogger(__name__).exception("deleting %s failed", path)
@@ -1,20 +1,65 @@
-from fastapi import FastAPI, Query, Path
+from fastapi import FastAPI, HTTPException, Query, Path, Request
+from fastapi.responses import StreamingResponse
 from typing import Union
+import json
+
+from fast_json import install_fast_json
+from posts import MAX_PAGE_SIZE, InvalidCursor, decode_cursor, encode_cursor, get_post_store
+from profiling import install_profiling
+from response_cache import ResponseCache
 
 # Initialize FastAPI app
 app = FastAPI()
 
+install_fast_json(app)
+install_profiling(app)
+
+# Posts served by /users/{user_id}/posts, see posts.py (set POSTS_DB_URL to use a database file)
+post_store = get_post_store()
+
+# Cache for the GET /items/{item_id} responses, keyed on the path and the query string
+# (see response_cache.py). Nothing here writes items, so entries only expire through the TTL.
+response_cache = ResponseCache(maxsize=1024, ttl=30)
+
+# GET endpoint exposing the cache hit/miss counters
+@app.get("/metrics/cache")
+def cache_metrics():
+    return response_cache.metrics()
+
 # GET endpoint demonstrating both path and query parameters
 @app.get("/items/{item_id}")
 def get_item(
+    request: Request,
     item_id: int = Path(..., description="The ID of the item to retrieve"),  # Path parameter with validation
     q: Union[str, None] = Query(None, max_length=50, description="Search query string")  # Optional query parameter
 ):
-    # Returns the item ID and optional query string "q" if provided
-    return {"item_id": item_id, "query": q}
+    # Returns the item ID and optional query string "q" if provided,
+    # answered from the response cache (with ETag / 304 support) when possible
+    return response_cache.respond(request, f"/items/{item_id}", lambda: {"item_id": item_id, "query": q})
 
-# GET endpoint with multiple query parameters for pagination
+# GET endpoint with cursor (keyset) pagination
+# Instead of "page", the client sends back the opaque "cursor" returned with the previous page.
+# Every page is then one index seek on (user_id, id), so page 10,000 is as fast as page 1.
+# page_size is capped with le=MAX_PAGE_SIZE, anything bigger is rejected with a 422.
+# With stream=true all remaining posts are streamed as NDJSON, one post per line,
+# fetched from the database page_size posts at a time.
 @app.get("/users/{user_id}/posts")
-def get_user_posts(user_id: int, page: int = 1, page_size: int = 10):
-    # "user_id" is a path parameter, while "page" and "page_size" are query parameters
-    return {"user_id": user_id, "page": page, "page_size": page_size}
+def get_user_posts(
+    user_id: int,
+    cursor: Union[str, None] = Query(None, description="Cursor returned by the previous page"),
+    page_size: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    stream: bool = Query(False, description="Stream every remaining post as NDJSON"),
+):
+    # "user_id" is a path parameter, while "cursor", "page_size" and "stream" are query parameters
+    try:
+        after_id = decode_cursor(cursor, user_id) if cursor else 0
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    if stream:
+        lines = (json.dumps(post) + "\n" for post in post_store.iter_after(user_id, after_id, page_size))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+
+    posts, next_after = post_store.page_after(user_id, after_id, page_size)
+    next_cursor = encode_cursor(user_id, next_after) if next_after is not None else None
+    return {"user_id": user_id, "posts": posts, "page_size": page_size, "next_cursor": next_cursor}
@@ -1,46 +1,124 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import Dict
+from typing import List, Literal, Union
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+
+from bulk import bulk_ids_body, bulk_items_body, bulk_response
+from fast_json import install_fast_json
+from models import BulkItem, Item
+from profiling import install_profiling
+from response_cache import ResponseCache, server_cache_enabled
+from storage import ItemStore, get_store
 
 # Initialize FastAPI app
 app = FastAPI()
 
-# Pydantic model to define the structure and validation of an Item
-class Item(BaseModel):
-    name: str
-    price: float
+install_fast_json(app)
+install_profiling(app)
+
+# Storage backend for the items. By default this is still an in-memory dictionary,
+# set ITEMS_BACKEND=sqlite (and optionally ITEMS_DB_URL) to persist them in SQLite instead.
+# See storage.py for the available backends.
+store: ItemStore = get_store()
+
+# Cache for the GET /items/{item_id} responses (see response_cache.py). Every handler that
+# changes an item drops its cached response through invalidate_items(). With a shared
+# backend the responses are only cached if RESPONSE_CACHE=1, see server_cache_enabled().
+response_cache = ResponseCache(maxsize=1024, ttl=30, enabled=server_cache_enabled())
+
+def invalidate_items(item_ids):
+    for item_id in item_ids:
+        response_cache.invalidate(f"/items/{item_id}")
+
+# GET endpoint exposing the cache hit/miss counters
+@app.get("/metrics/cache")
+def cache_metrics():
+    return response_cache.metrics()
+
+# ------------------------ Bulk Endpoints ------------------------
+# Ingest jobs push tens of thousands of items, and going through the single-item routes
+# means paying the HTTP, validation and commit cost once per item. The bulk routes take
+# the whole batch in one request, validate it in one pass and commit it in one transaction.
+# The response is a compact list of per-item status codes, in the same order as the input,
+# using the codes the single-item routes would have returned (201/200/204, 400, 404).
+#
+# The body is either a JSON array or NDJSON (one JSON object per line, sent with
+# Content-Type: application/x-ndjson). With ?all_or_nothing=true a single failing item
+# aborts the whole batch and the response is a 409.
+#
+# They are declared before the /items/{item_id} routes, otherwise "bulk" would be
+# matched (and rejected) as an item_id. Body parsing lives in bulk.py.
 
-# In-memory database (dictionary) to store items
-items_db: Dict[int, Item] = {}
+# POST endpoint to create many items
+@app.post("/items/bulk")
+def create_items(items: List[BulkItem] = Depends(bulk_items_body), all_or_nothing: bool = False):
+    statuses = store.bulk_create([(item.item_id, Item(name=item.name, price=item.price)) for item in items], all_or_nothing)
+    invalidate_items(item.item_id for item in items)
+    return bulk_response(statuses, 201, 400, all_or_nothing)
 
+# PUT endpoint to update many items
+@app.put("/items/bulk")
+def update_items(items: List[BulkItem] = Depends(bulk_items_body), all_or_nothing: bool = False):
+    statuses = store.bulk_update([(item.item_id, Item(name=item.name, price=item.price)) for item in items], all_or_nothing)
+    invalidate_items(item.item_id for item in items)
+    return bulk_response(statuses, 200, 404, all_or_nothing)
+
+# DELETE endpoint to delete many items, the body is a list of item ids
+@app.delete("/items/bulk")
+def delete_items(item_ids: List[int] = Depends(bulk_ids_body), all_or_nothing: bool = False):
+    statuses = store.bulk_delete(item_ids, all_or_nothing)
+    invalidate_items(item_ids)
+    return bulk_response(statuses, 204, 404, all_or_nothing)
+
+
+# ------------------------ Search Endpoint ------------------------
+# Query items by name prefix and/or price range, sorted by price ("-price" for most expensive
+# first). The store answers from secondary indexes kept up to date by every write, so this
+# costs O(log n + k) for k results instead of a scan over all items (see item_index.py).
+@app.get("/items/search")
+def search_items(
+    name_prefix: Union[str, None] = Query(None, max_length=50),
+    min_price: Union[float, None] = None,
+    max_price: Union[float, None] = None,
+    sort: Literal["price", "-price"] = "price",
+    limit: int = Query(100, ge=1, le=1000),
+):
+    results = store.search(name_prefix, min_price, max_price, sort == "-price", limit)
+    return [{"item_id": item_id, "name": item.name, "price": item.price} for item_id, item in results]
+
+
+# ------------------------ Single Item Endpoints ------------------------
 # POST endpoint to create an item
 @app.post("/items/{item_id}", status_code=201)
 def create_item(item_id: int, item: Item):
-    if item_id in items_db:
+    if not store.create(item_id, item):  # Store item in the database
         raise HTTPException(status_code=400, detail="Item already exists")
-    items_db[item_id] = item  # Store item in the in-memory database
+    invalidate_items([item_id])
     return {"item_id": item_id, "item": item}
 
 # GET endpoint to read an item
+# Served from the response cache when possible. A client that sends the ETag it got
+# back in If-None-Match receives an empty 304 if the item hasn't changed.
 @app.get("/items/{item_id}")
-def read_item(item_id: int):
-    item = items_db.get(item_id)
-    if item is None:
-        raise HTTPException(status_code=404, detail="Item not found")
-    return item
+def read_item(item_id: int, request: Request):
+    def load_item():
+        item = store.get(item_id)
+        if item is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        return item
+    return response_cache.respond(request, f"/items/{item_id}", load_item)
 
 # PUT endpoint to update an item
 @app.put("/items/{item_id}")
 def update_item(item_id: int, item: Item):
-    if item_id not in items_db:
+    if not store.update(item_id, item):  # Update item in the database
         raise HTTPException(status_code=404, detail="Item not found")
-    items_db[item_id] = item  # Update item in the database
+    invalidate_items([item_id])
     return item
 
 # DELETE endpoint to delete an item
 @app.delete("/items/{item_id}", status_code=204)
 def delete_item(item_id: int):
-    if item_id not in items_db:
+    if not store.delete(item_id):  # Remove item from the database
         raise HTTPException(status_code=404, detail="Item not found")
-    del items_db[item_id]  # Remove item from the database
+    invalidate_items([item_id])
     return {"message": "Item deleted"}
@@ -0,0 +1,139 @@
+'''
+Async version of the CRUD application in 03_crud_application.py.
+
+Every route there is a plain def, so FastAPI runs each call on its threadpool (40 threads
+by default). A request that is waiting on the database keeps its thread busy, and once all
+threads are taken new requests queue up even though the CPU is mostly idle.
+
+Here every route is an async def that awaits an async storage backend (async_storage.py).
+While one request waits on the database the event loop simply serves the next one, so the
+number of requests in flight is no longer limited by the threadpool.
+
+Run it with:
+
+    uvicorn 04_async_crud_application:app
+
+and compare it against the sync app with load_test.py.
+'''
+
+from contextlib import asynccontextmanager
+from typing import List, Literal, Union
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+
+from async_storage import AsyncItemStore, get_async_store
+from bulk import bulk_ids_body, bulk_items_body, bulk_response
+from fast_json import install_fast_json
+from models import BulkItem, Item
+from profiling import install_profiling
+from response_cache import ResponseCache, server_cache_enabled
+
+# Async storage backend for the items, configured with the same ITEMS_BACKEND and
+# ITEMS_DB_URL environment variables as the sync app.
+store: AsyncItemStore = get_async_store()
+
+# The lifespan runs once around the whole life of the app, here to close the
+# database connections on shutdown.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await store.close()
+
+# Initialize FastAPI app
+app = FastAPI(lifespan=lifespan)
+
+install_fast_json(app)
+install_profiling(app)
+
+# Cache for the GET /items/{item_id} responses (see response_cache.py). Every handler that
+# changes an item drops its cached response through invalidate_items(). With a shared
+# backend the responses are only cached if RESPONSE_CACHE=1, see server_cache_enabled().
+response_cache = ResponseCache(maxsize=1024, ttl=30, enabled=server_cache_enabled())
+
+def invalidate_items(item_ids):
+    for item_id in item_ids:
+        response_cache.invalidate(f"/items/{item_id}")
+
+# GET endpoint exposing the cache hit/miss counters
+@app.get("/metrics/cache")
+async def cache_metrics():
+    return response_cache.metrics()
+
+# ------------------------ Bulk Endpoints ------------------------
+# Same routes and status codes as in 03_crud_application.py. They are declared before the
+# /items/{item_id} routes, otherwise "bulk" would be matched (and rejected) as an item_id.
+
+# POST endpoint to create many items
+@app.post("/items/bulk")
+async def create_items(items: List[BulkItem] = Depends(bulk_items_body), all_or_nothing: bool = False):
+    statuses = await store.bulk_create([(item.item_id, Item(name=item.name, price=item.price)) for item in items], all_or_nothing)
+    invalidate_items(item.item_id for item in items)
+    return bulk_response(statuses, 201, 400, all_or_nothing)
+
+# PUT endpoint to update many items
+@app.put("/items/bulk")
+async def update_items(items: List[BulkItem] = Depends(bulk_items_body), all_or_nothing: bool = False):
+    statuses = await store.bulk_update([(item.item_id, Item(name=item.name, price=item.price)) for item in items], all_or_nothing)
+    invalidate_items(item.item_id for item in items)
+    return bulk_response(statuses, 200, 404, all_or_nothing)
+
+# DELETE endpoint to delete many items, the body is a list of item ids
+@app.delete("/items/bulk")
+async def delete_items(item_ids: List[int] = Depends(bulk_ids_body), all_or_nothing: bool = False):
+    statuses = await store.bulk_delete(item_ids, all_or_nothing)
+    invalidate_items(item_ids)
+    return bulk_response(statuses, 204, 404, all_or_nothing)
+
+
+# ------------------------ Search Endpoint ------------------------
+# Query items by name prefix and/or price range, sorted by price ("-price" for most expensive
+# first). The store answers from secondary indexes kept up to date by every write, so this
+# costs O(log n + k) for k results instead of a scan over all items (see item_index.py).
+@app.get("/items/search")
+async def search_items(
+    name_prefix: Union[str, None] = Query(None, max_length=50),
+    min_price: Union[float, None] = None,
+    max_price: Union[float, None] = None,
+    sort: Literal["price", "-price"] = "price",
+    limit: int = Query(100, ge=1, le=1000),
+):
+    results = await store.search(name_prefix, min_price, max_price, sort == "-price", limit)
+    return [{"item_id": item_id, "name": item.name, "price": item.price} for item_id, item in results]
+
+
+# ------------------------ Single Item Endpoints ------------------------
+# POST endpoint to create an item
+@app.post("/items/{item_id}", status_code=201)
+async def create_item(item_id: int, item: Item):
+    if not await store.create(item_id, item):  # Store item in the database
+        raise HTTPException(status_code=400, detail="Item already exists")
+    invalidate_items([item_id])
+    return {"item_id": item_id, "item": item}
+
+# GET endpoint to read an item
+# Served from the response cache when possible. A client that sends the ETag it got
+# back in If-None-Match receives an empty 304 if the item hasn't changed.
+@app.get("/items/{item_id}")
+async def read_item(item_id: int, request: Request):
+    async def load_item():
+        item = await store.get(item_id)
+        if item is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        return item
+    return await response_cache.respond_async(request, f"/items/{item_id}", load_item)
+
+# PUT endpoint to update an item
+@app.put("/items/{item_id}")
+async def update_item(item_id: int, item: Item):
+    if not await store.update(item_id, item):  # Update item in the database
+        raise HTTPException(status_code=404, detail="Item not found")
+    invalidate_items([item_id])
+    return item
+
+# DELETE endpoint to delete an item
+@app.delete("/items/{item_id}", status_code=204)
+async def delete_item(item_id: int):
+    if not await store.delete(item_id):  # Remove item from the database
+        raise HTTPException(status_code=404, detail="Item not found")
+    invalidate_items([item_id])
+    return {"message": "Item deleted"}
@@ -0,0 +1,360 @@
+'''
+Async storage backends for the async CRUD application (04_async_crud_application.py).
+
+These mirror the ItemStore interface from storage.py method for method, but every
+method is a coroutine. An async handler can then await the database without holding
+one of the threads in FastAPI's threadpool, so the number of requests in flight is no
+longer capped by the size of that pool.
+
+- AsyncInMemoryItemStore - wraps the dict based InMemoryItemStore (dict access never blocks)
+- AsyncSQLiteItemStore   - aiosqlite connections handed out from a small asyncio pool
+
+The backend is picked with the same ITEMS_BACKEND / ITEMS_DB_URL environment variables
+as the sync app.
+'''
+
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import List, Optional, Sequence, Tuple
+
+import aiosqlite
+
+from item_index import MAX_CHAR
+from models import Item
+from storage import ID_LOOKUP_CHUNK, InMemoryItemStore
+
+
+# ------------------------ Async Storage Interface ------------------------
+# Same contract as storage.ItemStore: writes return False instead of raising.
+class AsyncItemStore(ABC):
+    @abstractmethod
+    async def get(self, item_id: int) -> Optional[Item]:
+        """Return the item stored under item_id, or None if there is none."""
+
+    @abstractmethod
+    async def create(self, item_id: int, item: Item) -> bool:
+        """Store a new item. Returns False if item_id is already taken."""
+
+    @abstractmethod
+    async def update(self, item_id: int, item: Item) -> bool:
+        """Replace an existing item. Returns False if item_id does not exist."""
+
+    @abstractmethod
+    async def delete(self, item_id: int) -> bool:
+        """Remove an item. Returns False if item_id does not exist."""
+
+    @abstractmethod
+    async def compare_and_set(self, item_id: int, expected: Optional[Item], new: Optional[Item]) -> bool:
+        """Async version of ItemStore.compare_and_set."""
+
+    @abstractmethod
+    async def bulk_create(self, items: Sequence[Tuple[int, Item]], all_or_nothing: bool = False) -> List[bool]:
+        """Async version of ItemStore.bulk_create."""
+
+    @abstractmethod
+    async def bulk_update(self, items: Sequence[Tuple[int, Item]], all_or_nothing: bool = False) -> List[bool]:
+        """Async version of ItemStore.bulk_update."""
+
+    @abstractmethod
+    async def bulk_delete(self, item_ids: Sequence[int], all_or_nothing: bool = False) -> List[bool]:
+        """Async version of ItemStore.bulk_delete."""
+
+    @abstractmethod
+    async def search(
+        self,
+        name_prefix: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        descending: bool = False,
+        limit: int = 100,
+    ) -> List[Tuple[int, Item]]:
+        """Async version of ItemStore.search."""
+
+    async def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+# ------------------------ In-Memory Backend ------------------------
+# Nothing here ever waits, so the coroutines simply call the sync dict store.
+class AsyncInMemoryItemStore(AsyncItemStore):
+    def __init__(self) -> None:
+        self.sync_store = InMemoryItemStore()
+
+    async def get(self, item_id: int) -> Optional[Item]:
+        return self.sync_store.get(item_id)
+
+    async def create(self, item_id: int, item: Item) -> bool:
+        return self.sync_store.create(item_id, item)
+
+    async def update(self, item_id: int, item: Item) -> bool:
+        return self.sync_store.update(item_id, item)
+
+    async def delete(self, item_id: int) -> bool:
+        return self.sync_store.delete(item_id)
+
+    async def compare_and_set(self, item_id: int, expected: Optional[Item], new: Optional[Item]) -> bool:
+        return self.sync_store.compare_and_set(item_id, expected, new)
+
+    async def bulk_create(self, items: Sequence[Tuple[int, Item]], all_or_nothing: bool = False) -> List[bool]:
+        return self.sync_store.bulk_create(items, all_or_nothing)
+
+    async def bulk_update(self, items: Sequence[Tuple[int, Item]], all_or_nothing: bool = False) -> List[bool]:
+        return self.sync_store.bulk_update(items, all_or_nothing)
+
+    async def bulk_delete(self, item_ids: Sequence[int], all_or_nothing: bool = False) -> List[bool]:
+        return self.sync_store.bulk_delete(item_ids, all_or_nothing)
+
+    async def search(
+        self,
+        name_prefix: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        descending: bool = False,
+        limit: int = 100,
+    ) -> List[Tuple[int, Item]]:
+        return self.sync_store.search(name_prefix, min_price, max_price, descending, limit)
+
+
+# ------------------------ SQLite Backend ------------------------
+# Same "items" table as storage.SQLiteItemStore, so both apps can share one database file.
+CREATE_TABLE = "CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, price FLOAT NOT NULL)"
+SELECT_ITEM = "SELECT name, price FROM items WHERE id = ?"
+UPDATE_ITEM = "UPDATE items SET name = ?, price = ? WHERE id = ?"
+DELETE_ITEM = "DELETE FROM items WHERE id = ?"
+# compare-and-set variants, see storage.SQLiteItemStore.compare_and_set
+INSERT_ITEM_IF_MISSING = "INSERT INTO items (id, name, price) VALUES (?, ?, ?) ON CONFLICT (id) DO NOTHING"
+UPDATE_ITEM_IF_EQUAL = "UPDATE items SET name = ?, price = ? WHERE id = ? AND name = ? AND price = ?"
+DELETE_ITEM_IF_EQUAL = "DELETE FROM items WHERE id = ? AND name = ? AND price = ?"
+# bulk_create, see storage.insert_items_returning_ids: rows go in as multi-row INSERTs of at
+# most CREATE_CHUNK rows (3 placeholders each), a taken id is skipped by the database
+CREATE_CHUNK = ID_LOOKUP_CHUNK // 3
+# same secondary indexes as storage.items_table, used by search()
+CREATE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_items_price ON items (price)",
+    "CREATE INDEX IF NOT EXISTS ix_items_name ON items (name)",
+]
+
+
+class AsyncSQLiteItemStore(AsyncItemStore):
+    def __init__(self, path: str = "items.db", pool_size: int = 5) -> None:
+        """
+        Args:
+            path (str): SQLite database file. ":memory:" gives a private in-memory db.
+            pool_size (int): number of aiosqlite connections to keep open.
+        """
+        self.path = path
+        # every in-memory connection would see its own empty database, so only one is allowed
+        self.pool_size = 1 if path == ":memory:" else pool_size
+        self.pool: Optional[asyncio.Queue] = None
+        self.pool_lock = asyncio.Lock()
+
+    async def open(self) -> None:
+        # Connections are opened lazily on first use, so the store can be created at import
+        # time, before there is a running event loop.
+        async with self.pool_lock:
+            if self.pool is not None:
+                return
+            pool = asyncio.Queue()
+            for _ in range(self.pool_size):
+                conn = await aiosqlite.connect(self.path)
+                if self.path != ":memory:":
+                    await conn.execute("PRAGMA journal_mode=WAL")
+                    await conn.execute("PRAGMA synchronous=NORMAL")
+                await conn.execute(CREATE_TABLE)
+                for create_index in CREATE_INDEXES:
+                    await conn.execute(create_index)
+                await conn.commit()
+                pool.put_nowait(conn)
+            self.pool = pool
+
+    @asynccontextmanager
+    async def connection(self):
+        # Waiting for a free connection is an await, not a blocked thread
+        if self.pool is None:
+            await self.open()
+        conn = await self.pool.get()
+        try:
+            yield conn
+        finally:
+            self.pool.put_nowait(conn)
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self.connection() as conn:
+            try:
+                yield conn
+            except BaseException:
+                await conn.rollback()
+                raise
+            else:
+                await conn.commit()
+
+    @asynccontextmanager
+    async def immediate_transaction(self):
+        # see storage.SQLiteItemStore._begin_immediate: the write lock is taken before the
+        # ids are looked up, so they can't change before the write
+        async with self.transaction() as conn:
+            await conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
+    async def get(self, item_id: int) -> Optional[Item]:
+        async with self.connection() as conn:
+            async with conn.execute(SELECT_ITEM, (item_id,)) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return None
+        return Item(name=row[0], price=row[1])
+
+    async def create(self, item_id: int, item: Item) -> bool:
+        return (await self.bulk_create([(item_id, item)]))[0]
+
+    async def update(self, item_id: int, item: Item) -> bool:
+        async with self.transaction() as conn:
+            cursor = await conn.execute(UPDATE_ITEM, (item.name, item.price, item_id))
+        return cursor.rowcount == 1
+
+    async def delete(self, item_id: int) -> bool:
+        async with self.transaction() as conn:
+            cursor = await conn.execute(DELETE_ITEM, (item_id,))
+        return cursor.rowcount == 1
+
+    async def compare_and_set(self, item_id: int, expected: Optional[Item], new: Optional[Item]) -> bool:
+        if expected is None and new is None:
+            return await self.get(item_id) is None
+        async with self.transaction() as conn:
+            if expected is None:
+                cursor = await conn.execute(INSERT_ITEM_IF_MISSING, (item_id, new.name, new.price))
+            elif new is None:
+                cursor = await conn.execute(DELETE_ITEM_IF_EQUAL, (item_id, expected.name, expected.price))
+            else:
+                cursor = await conn.execute(
+                    UPDATE_ITEM_IF_EQUAL, (new.name, new.price, item_id, expected.name, expected.price)
+                )
+        return cursor.rowcount == 1
+
+    async def bulk_create(self, items: Sequence[Tuple[int, Item]], all_or_nothing: bool = False) -> List[bool]:
+        async with self.connection() as conn:
+            try:
+                # INSERT ... ON CONFLICT (id) DO NOTHING RETURNING id, so an id taken by
+                # another connection between a check and the insert can't raise IntegrityError
+                inserted = set()
+                for start in range(0, len(items), CREATE_CHUNK):
+                    chunk = items[start:start + CREATE_CHUNK]
+                    values = ", ".join(["(?, ?, ?)"] * len(chunk))
+                    params = [value for item_id, item in chunk for value in (item_id, item.name, item.price)]
+                    sql = f"INSERT INTO items (id, name, price) VALUES {values} ON CONFLICT (id) DO NOTHING RETURNING id"
+                    async with conn.execute(sql, params) as cursor:
+                        inserted.update(row[0] for row in await cursor.fetchall())
+
+                # rows are inserted in order, so of two equal ids in the batch the first wins
+                statuses = []
+                for item_id, _ in items:
+                    statuses.append(item_id in inserted)
+                    inserted.discard(item_id)
+            except BaseException:
+                await conn.rollback()
+                raise
+            if all_or_nothing and not all(statuses):
+                await conn.rollback()
+            else:
+                await conn.commit()
+        return statuses
+
+    async def bulk_update(self, items: Sequence[Tuple[int, Item]], all_or_nothing: bool = False) -> List[bool]:
+        async with self.immediate_transaction() as conn:
+            existing = await self._existing_ids(conn, [item_id for item_id, _ in items])
+            statuses = [item_id in existing for item_id, _ in items]
+            if all_or_nothing and not all(statuses):
+                return statuses
+
+            rows = [(item.name, item.price, item_id) for ok, (item_id, item) in zip(statuses, items) if ok]
+            if rows:
+                await conn.executemany(UPDATE_ITEM, rows)
+        return statuses
+
+    async def bulk_delete(self, item_ids: Sequence[int], all_or_nothing: bool = False) -> List[bool]:
+        async with self.immediate_transaction() as conn:
+            existing = await self._existing_ids(conn, list(item_ids))
+            statuses = []
+            for item_id in item_ids:
+                statuses.append(item_id in existing)
+                existing.discard(item_id)
+            if all_or_nothing and not all(statuses):
+                return statuses
+
+            rows = [(item_id,) for ok, item_id in zip(statuses, item_ids) if ok]
+            if rows:
+                await conn.executemany(DELETE_ITEM, rows)
+        return statuses
+
+    async def _existing_ids(self, conn, item_ids: List[int]) -> set:
+        found = set()
+        for start in range(0, len(item_ids), ID_LOOKUP_CHUNK):
+            chunk = item_ids[start:start + ID_LOOKUP_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            async with conn.execute(f"SELECT id FROM items WHERE id IN ({placeholders})", chunk) as cursor:
+                found.update(row[0] for row in await cursor.fetchall())
+        return found
+
+    async def search(
+        self,
+        name_prefix: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        descending: bool = False,
+        limit: int = 100,
+    ) -> List[Tuple[int, Item]]:
+        # same query as storage.build_search, see there for why the prefix is a range
+        conditions = []
+        params = []
+        if name_prefix is not None:
+            conditions.append("name >= ? AND name < ?")
+            params += [name_prefix, name_prefix + MAX_CHAR]
+        if min_price is not None:
+            conditions.append("price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("price <= ?")
+            params.append(max_price)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "price DESC, id DESC" if descending else "price, id"
+        sql = f"SELECT id, name, price FROM items {where} ORDER BY {order} LIMIT ?"
+
+        async with self.connection() as conn:
+            async with conn.execute(sql, params + [limit]) as cursor:
+                rows = await cursor.fetchall()
+        return [(row[0], Item(name=row[1], price=row[2])) for row in rows]
+
+    async def close(self) -> None:
+        if self.pool is None:
+            return
+        while not self.pool.empty():
+            await self.pool.get_nowait().close()
+        self.pool = None
+
+
+# ------------------------ Picking a Backend ------------------------
+def get_async_store(backend: Optional[str] = None, path: Optional[str] = None) -> AsyncItemStore:
+    """
+    Build the async store configured through the environment.
+
+    Args:
+        backend (str): "memory" or "sqlite". Defaults to $ITEMS_BACKEND, then "memory".
+        path (str): database file for the sqlite backend. Defaults to the file in $ITEMS_DB_URL.
+
+    Returns:
+        AsyncItemStore: the selected backend.
+    """
+    backend = backend or os.environ.get("ITEMS_BACKEND", "memory")
+    if backend == "memory":
+        return AsyncInMemoryItemStore()
+    if backend == "sqlite":
+        if path is None:
+            # reuse the sync app's SQLAlchemy style URL, e.g. sqlite:///items.db -> items.db
+            url = os.environ.get("ITEMS_DB_URL", "sqlite:///items.db")
+            path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else ""
+            path = path or ":memory:"
+        return AsyncSQLiteItemStore(path)
+    raise ValueError(f"Unknown items backend: {backend}")
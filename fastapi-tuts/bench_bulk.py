@@ -0,0 +1,85 @@
+'''
+Throughput benchmark: single-item routes versus the bulk routes of 03_crud_application.py.
+
+The same N items are created, updated and deleted three ways - one request per item,
+one JSON array request per batch and one NDJSON request per batch - and the items per
+second are printed for every backend.
+
+Run it from inside the fastapi-tuts folder:
+
+    python bench_bulk.py
+'''
+
+import importlib
+import json
+import os
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+from storage import InMemoryItemStore, SQLiteItemStore
+
+N_ITEMS = 5000
+BATCH_SIZE = 1000
+
+crud_app = importlib.import_module("03_crud_application")
+
+
+def batches(seq):
+    for start in range(0, len(seq), BATCH_SIZE):
+        yield seq[start:start + BATCH_SIZE]
+
+
+def single_path(client, items):
+    for item in items:
+        client.post(f"/items/{item['item_id']}", json={"name": item["name"], "price": item["price"]})
+    for item in items:
+        client.put(f"/items/{item['item_id']}", json={"name": item["name"], "price": item["price"] + 1})
+    for item in items:
+        client.delete(f"/items/{item['item_id']}")
+
+
+def bulk_json_path(client, items):
+    for batch in batches(items):
+        client.post("/items/bulk", json=batch)
+    for batch in batches(items):
+        client.put("/items/bulk", json=[dict(item, price=item["price"] + 1) for item in batch])
+    for batch in batches(items):
+        client.request("DELETE", "/items/bulk", json=[item["item_id"] for item in batch])
+
+
+def bulk_ndjson_path(client, items):
+    headers = {"content-type": "application/x-ndjson"}
+    for batch in batches(items):
+        client.post("/items/bulk", content="\n".join(json.dumps(item) for item in batch), headers=headers)
+    for batch in batches(items):
+        body = "\n".join(json.dumps(dict(item, price=item["price"] + 1)) for item in batch)
+        client.put("/items/bulk", content=body, headers=headers)
+    for batch in batches(items):
+        client.request("DELETE", "/items/bulk", content="\n".join(str(item["item_id"]) for item in batch), headers=headers)
+
+
+if __name__ == "__main__":
+    items = [{"item_id": i, "name": f"item-{i}", "price": float(i)} for i in range(N_ITEMS)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory": InMemoryItemStore,
+            "sqlite-file": lambda: SQLiteItemStore(f"sqlite:///{os.path.join(tmp, 'items.db')}"),
+        }
+        paths = {"single": single_path, "bulk-json": bulk_json_path, "bulk-ndjson": bulk_ndjson_path}
+
+        print(f"-- {N_ITEMS} items created, updated and deleted (batches of {BATCH_SIZE}) --")
+        for backend, make_store in backends.items():
+            for path, run in paths.items():
+                crud_app.store = make_store()
+                client = TestClient(crud_app.app)
+
+                start = time.perf_counter()
+                run(client, items)
+                elapsed = time.perf_counter() - start
+
+                crud_app.store.close()
+                # 3 operations per item: create, update and delete
+                print(f"{backend:<12} {path:<12} {elapsed:7.3f} s  {3 * N_ITEMS / elapsed:10.0f} ops/s")
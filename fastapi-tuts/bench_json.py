@@ -0,0 +1,59 @@
+'''
+Microbenchmark of JSON serialization throughput per response type.
+
+Compares, for the payloads the tutorial apps actually return:
+- default        FastAPI's path: jsonable_encoder + JSONResponse (json.dumps)
+- pydantic-core  pydantic_core.to_json on the raw payload, wrapped in a plain Response
+- fast           FastJSONResponse from fast_json.py (orjson, pydantic-core for models)
+
+Run it from inside the fastapi-tuts folder:
+
+    python bench_json.py
+'''
+
+import timeit
+
+import pydantic_core
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from fast_json import FastJSONResponse, orjson
+from models import Item
+
+item = Item(name="Widget", price=9.99)
+
+PAYLOADS = {
+    "Item (read_item)": item,
+    "dict (read_root)": {"message": "Welcome to FastAPI!"},
+    "dict + Item (create_item)": {"item_id": 1, "item": item},
+    "bulk statuses x10000": {"committed": True, "statuses": [201] * 10000},
+    "posts page x100": {
+        "user_id": 1,
+        "posts": [{"id": i, "title": f"post {i}"} for i in range(100)],
+        "page_size": 100,
+        "next_cursor": "eyJ1IjoxLCJhIjoxMDB9",
+    },
+}
+
+RENDERERS = {
+    "default": lambda payload: JSONResponse(jsonable_encoder(payload)).body,
+    "pydantic-core": lambda payload: Response(pydantic_core.to_json(payload), media_type="application/json").body,
+    "fast": lambda payload: FastJSONResponse(payload).body,
+}
+
+
+def per_second(render, payload):
+    # pick a repeat count so every measurement runs for roughly 0.2 seconds
+    timer = timeit.Timer(lambda: render(payload))
+    number, elapsed = timer.autorange()
+    best = min([elapsed] + timer.repeat(repeat=3, number=number))
+    return number / best
+
+
+if __name__ == "__main__":
+    print(f"orjson available: {orjson is not None}")
+    print(f"{'payload':<28}" + "".join(f"{name:>16}" for name in RENDERERS) + f"{'speedup':>10}")
+    for payload_name, payload in PAYLOADS.items():
+        rates = {name: per_second(render, payload) for name, render in RENDERERS.items()}
+        row = "".join(f"{rate:13,.0f}/s " for rate in rates.values())
+        print(f"{payload_name:<28}{row}{rates['fast'] / rates['default']:9.1f}x")
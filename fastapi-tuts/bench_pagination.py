@@ -0,0 +1,57 @@
+'''
+Benchmark: offset pagination versus keyset (cursor) pagination at page 1 and page 10,000.
+
+Loads PAGES * PAGE_SIZE posts for one user (interleaved with posts of other users, like a
+real table) and times fetching page 1 and page 10,000 both ways through the
+/users/{user_id}/posts endpoint's store.
+
+Run it from inside the fastapi-tuts folder:
+
+    python bench_pagination.py
+'''
+
+import os
+import statistics
+import tempfile
+import time
+
+from posts import PostStore
+
+PAGE_SIZE = 10
+PAGES = 10_000
+OTHER_USERS = 4
+REPEAT = 30
+
+
+def median_ms(call):
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PostStore(f"sqlite:///{os.path.join(tmp, 'posts.db')}")
+
+        # user 1 owns every (OTHER_USERS + 1)-th post, the rest belongs to other users
+        posts = [(n % (OTHER_USERS + 1) + 1, f"post {n}") for n in range((OTHER_USERS + 1) * PAGE_SIZE * PAGES)]
+        store.add_posts(posts)
+
+        # The keyset query for page N needs the last id of page N-1; a real client gets
+        # it from the cursor of the previous response.
+        def after_id_for(page):
+            if page == 1:
+                return 0
+            return store.page_offset(1, page - 1, PAGE_SIZE)[-1]["id"]
+
+        print(f"-- {len(posts)} posts, {PAGE_SIZE} per page, median of {REPEAT} runs --")
+        for page in (1, PAGES):
+            after_id = after_id_for(page)
+            offset_ms = median_ms(lambda: store.page_offset(1, page, PAGE_SIZE))
+            keyset_ms = median_ms(lambda: store.page_after(1, after_id, PAGE_SIZE))
+            print(f"page {page:>6}: offset {offset_ms:8.3f} ms   keyset {keyset_ms:8.3f} ms")
+
+        store.close()
@@ -0,0 +1,92 @@
+'''
+Latency benchmark for the storage backends of 03_crud_application.py.
+
+Every handler (create, read, update, delete) is called through FastAPI's TestClient
+for each backend and the p50/p99 latency per handler is printed. A second section
+compares inserting the same items one by one against a single bulk_create call.
+The app's response cache is switched off, otherwise read_item would time the cache and
+not the backend.
+
+Run it from inside the fastapi-tuts folder:
+
+    python bench_storage.py
+'''
+
+import importlib
+import os
+import statistics
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+from models import Item
+from storage import InMemoryItemStore, SQLiteItemStore
+
+N_REQUESTS = 2000
+N_BULK = 20000
+
+crud_app = importlib.import_module("03_crud_application")
+crud_app.response_cache.enabled = False
+
+
+def percentiles(samples):
+    # quantiles(n=100) returns the 1st..99th percentile cut points
+    cuts = statistics.quantiles(samples, n=100)
+    return cuts[49] * 1000, cuts[98] * 1000
+
+
+def timed(call):
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+
+def bench_handlers(name, store):
+    crud_app.store = store
+    client = TestClient(crud_app.app)
+    body = {"name": "Widget", "price": 9.99}
+
+    timings = {
+        "create_item": [timed(lambda: client.post(f"/items/{i}", json=body)) for i in range(N_REQUESTS)],
+        "read_item": [timed(lambda: client.get(f"/items/{i}")) for i in range(N_REQUESTS)],
+        "update_item": [timed(lambda: client.put(f"/items/{i}", json=body)) for i in range(N_REQUESTS)],
+        "delete_item": [timed(lambda: client.delete(f"/items/{i}")) for i in range(N_REQUESTS)],
+    }
+    for handler, samples in timings.items():
+        p50, p99 = percentiles(samples)
+        print(f"{name:<14} {handler:<12} p50={p50:7.3f} ms  p99={p99:7.3f} ms")
+    store.close()
+
+
+def bench_bulk(name, make_store):
+    items = [(i, Item(name=f"item-{i}", price=float(i))) for i in range(N_BULK)]
+
+    store = make_store()
+    one_by_one = timed(lambda: [store.create(item_id, item) for item_id, item in items])
+    store.close()
+
+    store = make_store()
+    bulk = timed(lambda: store.bulk_create(items))
+    store.close()
+
+    print(f"{name:<14} {N_BULK} creates: one by one {one_by_one:6.3f} s, bulk_create {bulk:6.3f} s")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        db_files = (os.path.join(tmp, f"items-{n}.db") for n in range(100))
+        backends = {
+            "memory": InMemoryItemStore,
+            "sqlite-memory": lambda: SQLiteItemStore("sqlite://"),
+            # a fresh file per store, so the bulk runs don't collide on ids
+            "sqlite-file": lambda: SQLiteItemStore(f"sqlite:///{next(db_files)}"),
+        }
+
+        print(f"-- Per handler latency ({N_REQUESTS} requests each) --")
+        for name, make_store in backends.items():
+            bench_handlers(name, make_store())
+
+        print("\n-- Bulk writes --")
+        for name, make_store in backends.items():
+            bench_bulk(name, make_store)
@@ -0,0 +1,61 @@
+'''
+Request body parsing and response building for the bulk Item endpoints.
+
+Shared by the sync (03_crud_application.py) and async (04_async_crud_application.py)
+CRUD applications. The body is either a JSON array or NDJSON (one JSON value per line,
+sent with Content-Type: application/x-ndjson).
+'''
+
+from typing import List
+
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter, ValidationError
+
+from models import BulkItem
+
+# A TypeAdapter validates the whole list straight from the raw JSON bytes in one call,
+# instead of FastAPI decoding the JSON first and then validating item by item.
+bulk_items_adapter = TypeAdapter(List[BulkItem])
+bulk_ids_adapter = TypeAdapter(List[int])
+
+
+def parse_bulk_body(body: bytes, content_type: str, adapter: TypeAdapter):
+    if content_type.startswith("application/x-ndjson"):
+        # Stitch the lines into a JSON array, so NDJSON goes through the same single validation
+        lines = [line for line in body.splitlines() if line.strip()]
+        body = b"[" + b",".join(lines) + b"]"
+    try:
+        return adapter.validate_json(body)
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors(include_url=False))
+
+
+# Reading the raw body needs an await, so it lives in an async dependency. That way the
+# handlers of the sync app can stay plain def functions.
+async def bulk_items_body(request: Request) -> List[BulkItem]:
+    return parse_bulk_body(await request.body(), request.headers.get("content-type", ""), bulk_items_adapter)
+
+
+async def bulk_ids_body(request: Request) -> List[int]:
+    return parse_bulk_body(await request.body(), request.headers.get("content-type", ""), bulk_ids_adapter)
+
+
+def bulk_response(statuses: List[bool], ok_code: int, failed_code: int, all_or_nothing: bool):
+    """
+    Turn the per-item flags returned by the store into the compact status list.
+
+    Args:
+        statuses (List[bool]): per-item flags from ItemStore.bulk_*.
+        ok_code (int): status code for items that were applied.
+        failed_code (int): status code for items that were not.
+        all_or_nothing (bool): whether a single failure aborted the whole batch.
+    """
+    committed = all(statuses) or not all_or_nothing
+    body = {"committed": committed, "statuses": [ok_code if ok else failed_code for ok in statuses]}
+    if not committed:
+        # returned as a ready made response, so the 409 survives whatever response
+        # class the route uses (see fast_json.py)
+        return JSONResponse(body, status_code=409)
+    return body
@@ -0,0 +1,119 @@
+'''
+Opt-in fast JSON serialization for the FastAPI tutorial apps.
+
+When a route returns a dict or a pydantic model, FastAPI first converts it into plain
+Python data with jsonable_encoder (a recursive walk over the whole payload) and only then
+lets JSONResponse run json.dumps over the result. For small payloads this round trip is a
+large share of the request's CPU time.
+
+FastJSONResponse renders the payload to bytes in one step instead:
+- pydantic models (Item) are dumped by pydantic-core's Rust serializer
+- dicts and lists go through orjson, with models nested inside them handed to pydantic
+
+orjson is optional. Without it everything goes through pydantic_core.to_json, which is
+still a single pass without the jsonable_encoder walk.
+
+To skip the encoder FastAPI must get a Response back from the handler, so the apps switch
+their route class to FastJSONRoute (install_fast_json), which wraps every handler's return
+value in a FastJSONResponse. It is opt-in through the FAST_JSON environment variable:
+
+    FAST_JSON=1 uvicorn 03_crud_application:app
+'''
+
+import functools
+import inspect
+import os
+from typing import Any, Callable
+
+import pydantic_core
+from fastapi import FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, see render_json()
+    orjson = None
+
+FAST_JSON_ENABLED = os.environ.get("FAST_JSON", "0").lower() in ("1", "true", "yes")
+
+
+def _orjson_default(obj: Any) -> Any:
+    # orjson calls this for every object it doesn't know natively, e.g. an Item inside a dict
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    return jsonable_encoder(obj)
+
+
+def render_json(content: Any) -> bytes:
+    """Serialize a handler's return value straight to JSON bytes."""
+    if isinstance(content, BaseModel):
+        return pydantic_core.to_json(content)
+    if orjson is not None:
+        return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+    return pydantic_core.to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return render_json(content)
+
+
+def to_fast_response(result: Any, status_code: int) -> Response:
+    if isinstance(result, Response):
+        return result  # e.g. a cached, streaming or 304 response, already final
+    if status_code < 200 or status_code in (204, 304):
+        # these status codes must not carry a body, FastAPI drops it the same way
+        return Response(status_code=status_code)
+    return FastJSONResponse(result, status_code=status_code)
+
+
+class FastJSONRoute(APIRoute):
+    """
+    Route class that hands the handler's return value to FastJSONResponse directly.
+
+    Use it before any route is declared:
+
+        app = FastAPI()
+        app.router.route_class = FastJSONRoute
+
+    The wrapper keeps the handler's signature (functools.wraps), so FastAPI still sees the
+    same parameters, and stays sync or async like the handler so threadpool behaviour is
+    unchanged. Note that a response_model is not applied to the wrapped return value.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        status_code = kwargs.get("status_code") or 200
+
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapped(*args, **kw):
+                return to_fast_response(await endpoint(*args, **kw), status_code)
+        else:
+            @functools.wraps(endpoint)
+            def wrapped(*args, **kw):
+                return to_fast_response(endpoint(*args, **kw), status_code)
+
+        super().__init__(path, wrapped, **kwargs)
+
+
+async def validation_error_response(request: Request, exc: RequestValidationError) -> Response:
+    # FastAPI's default handler echoes the rejected input back with json.dumps, which raises
+    # on NaN and infinity (e.g. an Item price of NaN), so the client got a 500 instead of a 422
+    content = {"detail": jsonable_encoder(exc.errors())}
+    return Response(pydantic_core.to_json(content, inf_nan_mode="null"), status_code=422, media_type="application/json")
+
+
+def install_fast_json(app: FastAPI, enabled: bool = FAST_JSON_ENABLED) -> None:
+    """
+    Switch app to FastJSONRoute if enabled ($FAST_JSON). Like install_profiling(), it
+    must be called before the app's own routes are declared.
+
+    Validation errors are rendered by validation_error_response either way.
+    """
+    app.add_exception_handler(RequestValidationError, validation_error_response)
+    if enabled:
+        app.router.route_class = FastJSONRoute
@@ -0,0 +1,117 @@
+'''
+Secondary indexes over the in-memory Item store, for the /items/search endpoint.
+
+Without them, a query by name or price has to look at every item in the dict, O(n).
+ItemIndex keeps two sorted lists next to the dict:
+
+- by_price: (price, item_id) pairs sorted by price
+- by_name:  (name, item_id) pairs sorted by name
+
+Because both lists are sorted, bisect finds where a price range or a name prefix starts
+and ends in O(log n), and the k matches are then read off as a slice, O(log n + k) in total.
+The lists are kept up to date on every create/update/delete with insort and a bisect
+lookup for removal, so they never need to be rebuilt.
+
+A sorted list is used for names rather than a trie: a name prefix is simply the range
+[prefix, prefix + the largest code point), which bisect can find just like a price range.
+'''
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+
+from models import Item
+
+# Sorts after every character, so prefix + MAX_CHAR is an upper bound for every name
+# that starts with prefix.
+MAX_CHAR = "\U0010ffff"
+
+
+def remove_pair(pairs: List[Tuple], pair: Tuple) -> None:
+    # (value, item_id) pairs are unique, so bisect_left lands on the pair if it is there.
+    # Checking that it did keeps an index that got out of step with the dict from
+    # silently losing a neighbour instead.
+    position = bisect_left(pairs, pair)
+    if position == len(pairs) or pairs[position] != pair:
+        raise ValueError(f"{pair!r} is not in the index")
+    del pairs[position]
+
+
+class ItemIndex:
+    def __init__(self, items: Dict[int, Item]) -> None:
+        """
+        Args:
+            items (Dict[int, Item]): the store's dict. The indexes only hold (value, item_id)
+                pairs, the dict is used to check the other filter on a candidate.
+        """
+        self.items = items
+        self.by_price: List[Tuple[float, int]] = []
+        self.by_name: List[Tuple[str, int]] = []
+
+    def add(self, item_id: int, item: Item) -> None:
+        insort(self.by_price, (item.price, item_id))
+        insort(self.by_name, (item.name, item_id))
+
+    def remove(self, item_id: int, item: Item) -> None:
+        remove_pair(self.by_price, (item.price, item_id))
+        remove_pair(self.by_name, (item.name, item_id))
+
+    def clear(self) -> None:
+        self.by_price.clear()
+        self.by_name.clear()
+
+    def price_range(self, min_price: Optional[float], max_price: Optional[float]) -> Tuple[int, int]:
+        # (price,) sorts before every (price, item_id) and (price, inf) after them,
+        # so the slice [lo:hi] holds exactly the prices in [min_price, max_price]
+        lo = 0 if min_price is None else bisect_left(self.by_price, (min_price,))
+        hi = len(self.by_price) if max_price is None else bisect_right(self.by_price, (max_price, float("inf")))
+        return lo, max(lo, hi)
+
+    def name_range(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect_left(self.by_name, (prefix,))
+        hi = bisect_left(self.by_name, (prefix + MAX_CHAR,))
+        return lo, hi
+
+    def search(
+        self,
+        name_prefix: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        descending: bool = False,
+        limit: int = 100,
+    ) -> List[int]:
+        """
+        Find the ids of the items matching every given filter, ordered by price.
+
+        Args:
+            name_prefix (str): only names starting with this prefix.
+            min_price (float): only prices >= min_price.
+            max_price (float): only prices <= max_price.
+            descending (bool): most expensive first.
+            limit (int): maximum number of ids to return.
+        """
+        price_lo, price_hi = self.price_range(min_price, max_price)
+
+        if name_prefix is not None:
+            name_lo, name_hi = self.name_range(name_prefix)
+            # With both filters, walk whichever index gives the smaller range and check
+            # the other condition on each candidate.
+            if name_hi - name_lo < price_hi - price_lo:
+                matches = []
+                for _, item_id in self.by_name[name_lo:name_hi]:
+                    price = self.items[item_id].price
+                    if (min_price is None or price >= min_price) and (max_price is None or price <= max_price):
+                        matches.append((price, item_id))
+                matches.sort(reverse=descending)
+                return [item_id for _, item_id in matches[:limit]]
+
+        # Walking the price index gives the results already sorted by price
+        positions = range(price_hi - 1, price_lo - 1, -1) if descending else range(price_lo, price_hi)
+        result = []
+        for position in positions:
+            item_id = self.by_price[position][1]
+            if name_prefix is not None and not self.items[item_id].name.startswith(name_prefix):
+                continue
+            result.append(item_id)
+            if len(result) == limit:
+                break
+        return result
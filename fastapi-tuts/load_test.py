@@ -0,0 +1,116 @@
+'''
+Load test harness comparing the sync (03) and async (04) CRUD applications.
+
+For every concurrency level the harness keeps that many requests in flight at once
+(a mix of 80% reads and 20% updates against pre-loaded items) and reports throughput
+and tail latency. Sync routes go through FastAPI's threadpool, async routes run on the
+event loop, so the interesting numbers are how p99 grows as concurrency goes past the
+threadpool size (40 by default).
+
+By default both apps are driven in-process through httpx's ASGI transport, each on its
+own SQLite file. Like any app on the sqlite backend they don't cache responses then (see
+response_cache.py), so the reads really hit the store; run with RESPONSE_CACHE=1 to
+measure the cached reads instead. To load test real servers, start them with uvicorn
+(with RESPONSE_CACHE=0 for the same uncached numbers) and pass their URLs:
+
+    python load_test.py
+    RESPONSE_CACHE=1 python load_test.py
+    RESPONSE_CACHE=0 uvicorn ...
+    python load_test.py --sync-url http://127.0.0.1:8000 --async-url http://127.0.0.1:8001
+'''
+
+import argparse
+import asyncio
+import importlib
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from async_storage import AsyncSQLiteItemStore
+from response_cache import server_cache_enabled
+from storage import SQLiteItemStore
+
+N_ITEMS = 1000
+REQUESTS_PER_LEVEL = 2000
+CONCURRENCY_LEVELS = [1, 10, 50, 200]
+WRITE_RATIO = 0.2
+
+
+async def one_request(client, latencies):
+    item_id = random.randrange(N_ITEMS)
+    start = time.perf_counter()
+    if random.random() < WRITE_RATIO:
+        response = await client.put(f"/items/{item_id}", json={"name": f"item-{item_id}", "price": random.random()})
+    else:
+        response = await client.get(f"/items/{item_id}")
+    latencies.append(time.perf_counter() - start)
+    response.raise_for_status()
+
+
+async def run_level(client, concurrency):
+    latencies = []
+    # A semaphore keeps exactly "concurrency" requests in flight at any moment
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded():
+        async with semaphore:
+            await one_request(client, latencies)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(bounded() for _ in range(REQUESTS_PER_LEVEL)))
+    elapsed = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100)
+    return REQUESTS_PER_LEVEL / elapsed, cuts[49] * 1000, cuts[98] * 1000, max(latencies) * 1000
+
+
+async def load_test(mode, client):
+    # pre-load the items through the bulk endpoint
+    items = [{"item_id": i, "name": f"item-{i}", "price": float(i)} for i in range(N_ITEMS)]
+    await client.post("/items/bulk", json=items)
+
+    for concurrency in CONCURRENCY_LEVELS:
+        rps, p50, p99, worst = await run_level(client, concurrency)
+        print(f"{mode:<6} concurrency={concurrency:<4} {rps:8.0f} req/s  p50={p50:8.2f} ms  p99={p99:8.2f} ms  max={worst:8.2f} ms")
+
+
+def in_process_client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver")
+
+
+async def main(sync_url, async_url):
+    if sync_url and async_url:
+        async with httpx.AsyncClient(base_url=sync_url) as client:
+            await load_test("sync", client)
+        async with httpx.AsyncClient(base_url=async_url) as client:
+            await load_test("async", client)
+        return
+
+    print(f"response cache: {'on' if server_cache_enabled('sqlite') else 'off'}")
+    with tempfile.TemporaryDirectory() as tmp:
+        sync_app = importlib.import_module("03_crud_application")
+        sync_app.store = SQLiteItemStore(f"sqlite:///{os.path.join(tmp, 'sync.db')}")
+        # the apps decided at import time, for their default memory backend
+        sync_app.response_cache.enabled = server_cache_enabled("sqlite")
+        async with in_process_client(sync_app.app) as client:
+            await load_test("sync", client)
+        sync_app.store.close()
+
+        async_app = importlib.import_module("04_async_crud_application")
+        async_app.store = AsyncSQLiteItemStore(os.path.join(tmp, "async.db"))
+        async_app.response_cache.enabled = server_cache_enabled("sqlite")
+        async with in_process_client(async_app.app) as client:
+            await load_test("async", client)
+        await async_app.store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync-url", help="base URL of a running 03_crud_application server")
+    parser.add_argument("--async-url", help="base URL of a running 04_async_crud_application server")
+    args = parser.parse_args()
+    asyncio.run(main(args.sync_url, args.async_url))
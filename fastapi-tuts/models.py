@@ -0,0 +1,22 @@
+'''
+Pydantic models shared between the CRUD application and its storage backends.
+
+Keeping the model in its own module lets storage.py (and anything else that
+works with Items) import it without importing the FastAPI app itself.
+'''
+
+from pydantic import BaseModel, ConfigDict
+
+# Pydantic model to define the structure and validation of an Item
+class Item(BaseModel):
+    # NaN and infinity are valid floats but not prices: NaN isn't even equal to itself,
+    # so it can't be found again in the sorted price index (see item_index.py)
+    model_config = ConfigDict(allow_inf_nan=False)
+
+    name: str
+    price: float
+
+# An Item together with the id it should be stored under, used by the bulk endpoints
+# where the id can't come from the URL path.
+class BulkItem(Item):
+    item_id: int
@@ -0,0 +1,175 @@
+'''
+SQLite backed posts store with keyset (cursor) pagination, used by
+/users/{user_id}/posts in 02_path_and_query_params.py.
+
+------------ Offset vs Keyset pagination -----------------
+
+Offset pagination ("page=N&page_size=M") turns into LIMIT M OFFSET (N-1)*M. The database
+still has to walk past every skipped row, so page 10,000 costs 10,000 times more than page 1.
+
+Keyset pagination remembers the last id that was returned and asks for the rows after it:
+
+    SELECT ... WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?
+
+With an index on (user_id, id) this is a single index seek followed by reading just the
+rows of the page, so every page costs the same no matter how deep it is. The last id is
+handed to the client as an opaque cursor token, to be sent back to get the next page.
+'''
+
+import base64
+import json
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table
+from sqlalchemy import bindparam, create_engine, insert, select
+from sqlalchemy.pool import StaticPool
+
+from storage import create_tables
+
+# Upper bound for page_size, whatever the client asks for
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+# ------------------------ Cursor Tokens ------------------------
+# The token is base64 of a tiny JSON document. It is "opaque" in the sense that clients
+# should just pass it back, which leaves us free to change what is inside later.
+# The user id is part of it, so a cursor from one user's listing can't be replayed on another's.
+def encode_cursor(user_id: int, last_id: int) -> str:
+    raw = json.dumps({"u": user_id, "a": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, user_id: int) -> int:
+    """Return the last seen post id stored in cursor, or raise InvalidCursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        last_id = data["a"]
+        cursor_user = data["u"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor(f"Malformed cursor: {cursor!r}")
+    # type() rather than isinstance(): bool is an int, and True == 1
+    if type(cursor_user) is not int or cursor_user != user_id or type(last_id) is not int:
+        raise InvalidCursor("Cursor does not belong to this listing")
+    return last_id
+
+
+# ------------------------ Schema and Statements ------------------------
+metadata = MetaData()
+
+posts_table = Table(
+    "posts",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, nullable=False),
+    Column("title", String, nullable=False),
+    # The composite index that makes the keyset query an index range scan:
+    # all posts of one user sit next to each other, already sorted by id.
+    Index("ix_posts_user_id_id", "user_id", "id"),
+)
+
+select_page_after = (
+    select(posts_table.c.id, posts_table.c.title)
+    .where(posts_table.c.user_id == bindparam("user_id"), posts_table.c.id > bindparam("after_id"))
+    .order_by(posts_table.c.id)
+    .limit(bindparam("limit"))
+)
+
+# Only kept around so bench_pagination.py can show what the old approach costs
+select_page_offset = (
+    select(posts_table.c.id, posts_table.c.title)
+    .where(posts_table.c.user_id == bindparam("user_id"))
+    .order_by(posts_table.c.id)
+    .limit(bindparam("limit"))
+    .offset(bindparam("offset"))
+)
+
+insert_post = insert(posts_table)
+
+
+class PostStore:
+    def __init__(self, url: str = "sqlite://") -> None:
+        """
+        Args:
+            url (str): SQLAlchemy URL of the database. "sqlite://" gives a private in-memory db.
+        """
+        connect_args = {"check_same_thread": False}
+        if url in ("sqlite://", "sqlite:///:memory:"):
+            # One shared connection, see storage.SQLiteItemStore: the threadpool threads
+            # (and StreamingResponse iterating iter_after) take turns using it.
+            self.engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+            self.connection_lock: Optional[threading.Lock] = threading.Lock()
+        else:
+            self.engine = create_engine(url, connect_args=connect_args)
+            self.connection_lock = None
+        create_tables(self.engine, metadata)
+
+    @contextmanager
+    def _connect(self) -> Iterator:
+        with self.connection_lock or nullcontext(), self.engine.connect() as conn:
+            yield conn
+
+    @contextmanager
+    def _begin(self) -> Iterator:
+        with self.connection_lock or nullcontext(), self.engine.begin() as conn:
+            yield conn
+
+    def add_posts(self, posts: Sequence[Tuple[int, str]]) -> None:
+        """Insert (user_id, title) pairs in one transaction."""
+        with self._begin() as conn:
+            conn.execute(insert_post, [{"user_id": user_id, "title": title} for user_id, title in posts])
+
+    def page_after(self, user_id: int, after_id: int, page_size: int) -> Tuple[List[dict], Optional[int]]:
+        """
+        Fetch one keyset page.
+
+        Args:
+            user_id (int): owner of the posts.
+            after_id (int): only posts with a larger id are returned (0 for the first page).
+            page_size (int): number of posts per page.
+
+        Returns:
+            Tuple[List[dict], Optional[int]]: the posts, and the id to continue after
+            (None when this was the last page).
+        """
+        # Asking for one row more than needed tells us whether a next page exists
+        # without a separate COUNT query.
+        with self._connect() as conn:
+            rows = conn.execute(
+                select_page_after, {"user_id": user_id, "after_id": after_id, "limit": page_size + 1}
+            ).all()
+        has_more = len(rows) > page_size
+        posts = [{"id": row.id, "title": row.title} for row in rows[:page_size]]
+        return posts, posts[-1]["id"] if has_more else None
+
+    def page_offset(self, user_id: int, page: int, page_size: int) -> List[dict]:
+        """Fetch a page the old LIMIT/OFFSET way. Only used for benchmarking."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                select_page_offset, {"user_id": user_id, "limit": page_size, "offset": (page - 1) * page_size}
+            ).all()
+        return [{"id": row.id, "title": row.title} for row in rows]
+
+    def iter_after(self, user_id: int, after_id: int, chunk_size: int) -> Iterator[dict]:
+        """Yield every post after after_id, fetched one keyset page at a time."""
+        while True:
+            posts, next_after = self.page_after(user_id, after_id, chunk_size)
+            yield from posts
+            if next_after is None:
+                return
+            after_id = next_after
+
+    def close(self) -> None:
+        self.engine.dispose()
+
+
+def get_post_store(url: Optional[str] = None) -> PostStore:
+    """Build the store for $POSTS_DB_URL (an empty in-memory database by default)."""
+    return PostStore(url or os.environ.get("POSTS_DB_URL", "sqlite://"))
@@ -0,0 +1,314 @@
+'''
+Request profiling for the FastAPI tutorial apps.
+
+install_profiling(app) adds three things:
+
+1. Per-route latency histograms, split into phases:
+   - validation     from the route picking up the request until the handler starts
+                    (body parsing, parameter validation, dependencies, threadpool hand-off)
+   - handler        the handler function itself
+   - serialization  from the handler returning until the response object is ready
+   - total          the whole request as seen by the ASGI middleware, sending included
+2. GET /metrics, the histograms in the Prometheus text format, ready to be scraped.
+3. Opt-in sampling (PROFILE_SLOWEST=N): requests are run under cProfile and the profiles
+   of the N slowest requests are kept, readable as text on GET /debug/profiles.
+
+How the phases are measured: the middleware puts a RequestTimings record into a
+ContextVar, ProfilingRoute stamps it when the route starts and finishes, and a thin wrapper
+around the handler stamps it when the handler starts and returns. Sync handlers run on the
+threadpool, but the threadpool copies the context, so they stamp the same record.
+
+Note on sampling: only one request is profiled at a time (a second cProfile would replace
+the first one's hook), and on the event loop thread the profile may also contain work of
+other requests that ran while this one was waiting.
+'''
+
+import cProfile
+import functools
+import heapq
+import inspect
+import io
+import itertools
+import os
+import pstats
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+
+PROFILE_SLOWEST = int(os.environ.get("PROFILE_SLOWEST", "0"))
+
+# Upper bounds (seconds) of the histogram buckets, Prometheus style (each bucket counts
+# every observation <= its bound, the last one is +Inf)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float("inf"))
+
+
+class RequestTimings:
+    __slots__ = ("route", "route_start", "handler_start", "handler_end", "route_end", "profiles")
+
+    def __init__(self) -> None:
+        self.route: Optional[str] = None
+        self.route_start = self.handler_start = self.handler_end = self.route_end = 0.0
+        # cProfile objects of a sampled request (one per thread it ran on), else None
+        self.profiles: Optional[List[cProfile.Profile]] = None
+
+
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+# ------------------------ Histograms ------------------------
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * len(BUCKETS)  # per bucket, not cumulative
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += seconds
+        self.count += 1
+
+
+class RouteMetrics:
+    # Only ever touched from the event loop thread (middleware and the async /metrics
+    # handler), so no lock is needed.
+    def __init__(self) -> None:
+        self.histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self.responses: Dict[Tuple[str, str, int], int] = {}
+
+    def observe(self, method: str, route: str, phase: str, seconds: float) -> None:
+        key = (method, route, phase)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    def count_response(self, method: str, route: str, status: int) -> None:
+        key = (method, route, status)
+        self.responses[key] = self.responses.get(key, 0) + 1
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_request_phase_seconds Time spent in each phase of a request.",
+            "# TYPE http_request_phase_seconds histogram",
+        ]
+        for (method, route, phase), histogram in sorted(self.histograms.items()):
+            labels = f'method="{method}",route="{route}",phase="{phase}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'http_request_phase_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"http_request_phase_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"http_request_phase_seconds_count{{{labels}}} {histogram.count}")
+
+        lines.append("# HELP http_responses_total Responses sent, by status code.")
+        lines.append("# TYPE http_responses_total counter")
+        for (method, route, status), count in sorted(self.responses.items()):
+            lines.append(f'http_responses_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+# ------------------------ Slowest Request Profiles ------------------------
+class SlowestProfiles:
+    def __init__(self, keep: int) -> None:
+        self.keep = keep
+        # min-heap on latency, so the fastest of the kept profiles is the one to drop
+        self.heap: List[Tuple[float, int, str, pstats.Stats]] = []
+        self.sequence = itertools.count()  # tie breaker, Stats objects don't compare
+        self.active = False
+
+    def offer(self, seconds: float, label: str, profiles: List[cProfile.Profile]) -> None:
+        if len(self.heap) >= self.keep and seconds <= self.heap[0][0]:
+            return  # not among the slowest, skip building the stats
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        entry = (seconds, next(self.sequence), label, stats)
+        if len(self.heap) < self.keep:
+            heapq.heappush(self.heap, entry)
+        else:
+            heapq.heapreplace(self.heap, entry)
+
+    def render(self, top_functions: int = 25) -> str:
+        out = io.StringIO()
+        for seconds, _, label, stats in sorted(self.heap, reverse=True):
+            out.write(f"===== {label} took {seconds * 1000:.2f} ms =====\n")
+            stats.stream = out
+            stats.sort_stats("cumulative").print_stats(top_functions)
+        return out.getvalue()
+
+
+# ------------------------ Middleware ------------------------
+class ProfilingMiddleware:
+    # A plain ASGI middleware rather than BaseHTTPMiddleware, which would add its own
+    # overhead (an extra task and stream per request) to every measurement.
+    def __init__(self, app, metrics: RouteMetrics, slowest: Optional[SlowestProfiles] = None) -> None:
+        self.app = app
+        self.metrics = metrics
+        self.slowest = slowest
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        status = 500
+
+        async def send_and_record_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        profile = None
+        if self.slowest is not None and not self.slowest.active:
+            self.slowest.active = True
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # another profiler is already active (an outer one, or on Python 3.12+
+                # any other), so this request is only timed, like the sync path does
+                profile = None
+                self.slowest.active = False
+            else:
+                timings.profiles = [profile]
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_record_status)
+        finally:
+            end = time.perf_counter()
+            if profile is not None:
+                profile.disable()
+                self.slowest.active = False
+            current_timings.reset(token)
+            self.record(scope["method"], timings, end - start, status)
+
+    def record(self, method: str, timings: RequestTimings, total: float, status: int) -> None:
+        route = timings.route or "<unmatched>"
+        self.metrics.observe(method, route, "total", total)
+        self.metrics.count_response(method, route, status)
+        # the phases are only known if the request reached a handler that returned
+        if timings.route is not None and timings.route_end:
+            self.metrics.observe(method, route, "validation", timings.handler_start - timings.route_start)
+            self.metrics.observe(method, route, "handler", timings.handler_end - timings.handler_start)
+            self.metrics.observe(method, route, "serialization", timings.route_end - timings.handler_end)
+        if timings.profiles is not None:
+            self.slowest.offer(total, f"{method} {route}", timings.profiles)
+
+
+# ------------------------ Route Class ------------------------
+def _stamp_handler(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    # Same sync/async preserving wrapper as fast_json.FastJSONRoute
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapped(*args, **kw):
+            timings = current_timings.get()
+            if timings is None:
+                return await endpoint(*args, **kw)
+            timings.handler_start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kw)
+            finally:
+                timings.handler_end = time.perf_counter()
+    else:
+        @functools.wraps(endpoint)
+        def wrapped(*args, **kw):
+            timings = current_timings.get()
+            if timings is None:
+                return endpoint(*args, **kw)
+            # A sync handler runs on a worker thread the event loop's profiler can't see,
+            # so a sampled request gets a second profiler for this thread. On Python 3.12+
+            # only one profiler may be active at all, then the handler just isn't profiled.
+            profile = None
+            if timings.profiles is not None:
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError:
+                    profile = None
+            timings.handler_start = time.perf_counter()
+            try:
+                return endpoint(*args, **kw)
+            finally:
+                timings.handler_end = time.perf_counter()
+                if profile is not None:
+                    profile.disable()
+                    timings.profiles.append(profile)
+    return wrapped
+
+
+class ProfilingRoute(APIRoute):
+    """
+    Route class that stamps the phase boundaries into the current RequestTimings.
+
+    It is combined with whatever route class the app already uses (see install_profiling),
+    and wraps the bare handler before that class does, so the time FastJSONRoute spends
+    rendering the response counts as serialization, not as handler time.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, _stamp_handler(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route = self.path
+
+        async def stamped_handler(request):
+            timings = current_timings.get()
+            if timings is None:
+                return await handler(request)
+            timings.route = route
+            timings.route_start = time.perf_counter()
+            response = await handler(request)
+            timings.route_end = time.perf_counter()
+            return response
+
+        return stamped_handler
+
+
+# ------------------------ Wiring it into an App ------------------------
+def install_profiling(app: FastAPI, profile_slowest: int = PROFILE_SLOWEST) -> RouteMetrics:
+    """
+    Add the profiling middleware, route class and endpoints to app.
+
+    Must be called before the app's own routes are declared (the route class only
+    applies to routes added after it is set), and after any other route class change.
+
+    Args:
+        app (FastAPI): the application.
+        profile_slowest (int): keep cProfile profiles of this many slowest requests,
+            0 (the default, or $PROFILE_SLOWEST) disables sampling.
+    """
+    metrics = RouteMetrics()
+    slowest = SlowestProfiles(profile_slowest) if profile_slowest > 0 else None
+
+    base = app.router.route_class
+    if not issubclass(base, ProfilingRoute):
+        app.router.route_class = type(f"Profiling{base.__name__}", (ProfilingRoute, base), {})
+    app.add_middleware(ProfilingMiddleware, metrics=metrics, slowest=slowest)
+
+    # async def, so rendering happens on the event loop thread like every observe()
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/debug/profiles", response_class=PlainTextResponse)
+    async def slowest_profiles():
+        if slowest is None:
+            return PlainTextResponse("Profiling is off, start the app with PROFILE_SLOWEST=N\n")
+        return PlainTextResponse(slowest.render())
+
+    return metrics
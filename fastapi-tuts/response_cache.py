@@ -0,0 +1,204 @@
+'''
+Response cache with ETag / conditional GET support for the read endpoints.
+
+A GET handler hands its payload builder to ResponseCache.respond(). The first call builds
+and serializes the payload and keeps the JSON bytes together with an ETag (a hash of those
+bytes). Later calls for the same path and query string are answered straight from the
+cache, and a client that sends the ETag back in If-None-Match gets an empty 304 instead
+of the body.
+
+- Bounded: at most maxsize entries, the least recently used one is evicted first (LRU)
+- TTL: entries older than ttl seconds are treated as missing
+- Invalidation: write handlers call invalidate(path) for every path they change
+- Stats: hits, misses, evictions, expirations and 304s, for a metrics endpoint
+
+The cache lives in the process. With the memory backend every uvicorn worker has its own
+items anyway, but with a shared backend (ITEMS_BACKEND=sqlite) and several workers, a PUT
+only invalidates the worker that handled it, and the others would keep serving the old
+item until the TTL runs out. So by default the responses are only cached for the memory
+backend; set RESPONSE_CACHE=1 to cache them with a shared backend too (safe with a single
+worker), or RESPONSE_CACHE=0 to never cache them. Either way the responses carry an ETag
+and "Cache-Control: no-cache": clients and proxies may keep a copy but have to revalidate
+it (If-None-Match, answered with a 304) every time, so nobody serves an old item.
+'''
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Set
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from fast_json import FAST_JSON_ENABLED, render_json
+
+
+class CacheEntry(NamedTuple):
+    path: str
+    body: bytes
+    etag: str
+    expires_at: float
+
+
+def cache_key(path: str, request: Request) -> str:
+    # Sorting the query params makes "?a=1&b=2" and "?b=2&a=1" share one entry
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{path}?{query}"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match may be "*" or a comma separated list of (possibly weak, W/"...") tags
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def server_cache_enabled(backend: Optional[str] = None) -> bool:
+    """
+    Whether responses may be cached in the process, see the module docstring.
+
+    Args:
+        backend (str): the items backend, defaults to $ITEMS_BACKEND, then "memory".
+    """
+    setting = os.environ.get("RESPONSE_CACHE")
+    if setting is not None:
+        return setting == "1"
+    return (backend or os.environ.get("ITEMS_BACKEND", "memory")) == "memory"
+
+
+class ResponseCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0, enabled: bool = True) -> None:
+        """
+        Args:
+            maxsize (int): maximum number of cached responses.
+            ttl (float): seconds a cached response stays valid.
+            enabled (bool): keep responses in the cache. If False every GET is built
+                again, but still gets an ETag and can be answered with a 304.
+        """
+        self.enabled = enabled
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        # path -> cache keys for that path (one per distinct query string), for invalidate()
+        self.keys_by_path: Dict[str, Set[str]] = {}
+        # bumped by every invalidation, see put()
+        self.generation = 0
+        # sync handlers run on FastAPI's threadpool, so the dicts are shared between threads
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "not_modified": 0}
+
+    # ------------------------ Entry Management ------------------------
+    def get(self, key: str) -> Optional[CacheEntry]:
+        if not self.enabled:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)  # mark as most recently used
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, key: str, path: str, body: bytes, generation: int) -> CacheEntry:
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        entry = CacheEntry(path, body, etag, time.monotonic() + self.ttl)
+        with self.lock:
+            # If anything was invalidated while the payload was being built, the payload
+            # may already be stale, so it is returned to this caller but not cached.
+            if not self.enabled or self.generation != generation:
+                return entry
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            self.keys_by_path.setdefault(path, set()).add(key)
+            while len(self.entries) > self.maxsize:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.stats["evictions"] += 1
+        return entry
+
+    def invalidate(self, path: str) -> None:
+        """Drop every cached response for path, whatever its query string."""
+        with self.lock:
+            self.generation += 1
+            for key in self.keys_by_path.pop(path, ()):
+                self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.keys_by_path.clear()
+
+    def _remove(self, key: str) -> None:
+        # caller holds the lock
+        entry = self.entries.pop(key)
+        keys = self.keys_by_path.get(entry.path)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.keys_by_path[entry.path]
+
+    # ------------------------ Building Responses ------------------------
+    def respond(self, request: Request, path: str, build: Callable[[], Any]) -> Response:
+        """
+        Answer a GET from the cache, or build, cache and answer it.
+
+        Args:
+            request (Request): the incoming request (query params and If-None-Match).
+            path (str): canonical path of the resource, e.g. f"/items/{item_id}". Built by the
+                handler from the parsed params, so "/items/05" and "/items/5" share an entry,
+                and it is the same string the write handlers pass to invalidate().
+            build (Callable): returns the payload on a miss. Exceptions such as an
+                HTTPException for a 404 propagate and nothing is cached.
+        """
+        key = cache_key(path, request)
+        entry = self.get(key)
+        if entry is None:
+            generation = self.generation
+            entry = self.put(key, path, self.render(build()), generation)
+        return self.to_response(request, entry)
+
+    async def respond_async(self, request: Request, path: str, build: Callable[[], Awaitable[Any]]) -> Response:
+        """Same as respond(), for async handlers whose payload builder is a coroutine."""
+        key = cache_key(path, request)
+        entry = self.get(key)
+        if entry is None:
+            generation = self.generation
+            entry = self.put(key, path, self.render(await build()), generation)
+        return self.to_response(request, entry)
+
+    def render(self, payload: Any) -> bytes:
+        # the same bytes the handler's return value would have been rendered to
+        if FAST_JSON_ENABLED:
+            return render_json(payload)
+        return JSONResponse(jsonable_encoder(payload)).body
+
+    def to_response(self, request: Request, entry: CacheEntry) -> Response:
+        # no-cache: a client may store the response but must revalidate it before reuse
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            with self.lock:
+                self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self.entries)
+        stats["enabled"] = self.enabled
+        stats["maxsize"] = self.maxsize
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,541 @@
+'''
+Pluggable storage backends for the Items CRUD application (03_crud_application.py).
+
+The handlers used to read and write a module level dict directly, which means the data
+is lost on restart and every uvicorn worker has its own private copy. Here the storage
+is hidden behind a small ItemStore interface with two implementations:
+
+- InMemoryItemStore - the original dict, handy for tests and for the tutorial
+- SQLiteItemStore   - a SQLAlchemy Core engine over SQLite, durable and shareable between
+                      workers when pointed at a file
+
+The backend is picked with the ITEMS_BACKEND environment variable ("memory" or "sqlite")
+and the database location with ITEMS_DB_URL, e.g.
+
+    ITEMS_BACKEND=sqlite ITEMS_DB_URL=sqlite:///items.db uvicorn 03_crud_application:app
+'''
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Column, Float, Index, Integer, MetaData, String, Table
+from sqlalchemy import bindparam, create_engine, delete, event, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.pool import StaticPool
+
+from item_index import MAX_CHAR, ItemIndex
+from models import Item
+from striped_lock import StripedLock
+
+
+# ------------------------ Storage Interface ------------------------
+# Every backend answers the same questions the handlers used to ask the dict.
+# Writes return a bool instead of raising, so that the handlers stay in charge of
+# turning a missing/duplicate item into the right HTTPException.
+class ItemStore(ABC):
+    @abstractmethod
+    def get(self, item_id: int) -> Optional[Item]:
+        """Return the item stored under item_id, or None if there is none."""
+
+    @abstractmethod
+    def create(self, item_id: int, item: Item) -> bool:
+        """Store a new item. Returns False if item_id is already taken."""
+
+    @abstractmethod
+    def update(self, item_id: int, item: Item) -> bool:
+        """Replace an existing item. Returns False if item_id does not exist."""
+
+    @abstractmethod
+    def delete(self, item_id: int) -> bool:
+        """Remove an item. Returns False if item_id does not exist."""
+
+    @abstractmethod
+    def compare_and_set(self, item_id: int, expected: Optional[Item], new: Optional[Item]) -> bool:
+        """
+        Atomically replace the item under item_id, but only if it still is expected.
+
+        Args:
+            item_id (int): id of the item.
+            expected (Item): the value the caller last saw, None meaning "does not exist".
+            new (Item): the value to store, None meaning "delete it".
+
+        Returns:
+            bool: False (and nothing changed) if the stored value was not expected.
+        """
+
+    @abstractmethod
+    def bulk_create(self, items: Sequence[Tuple[int, Item]], all_or_nothing: bool = False) -> List[bool]:
+        """
+        Store many new items in one transaction.
+
+        Args:
+            items (Sequence[Tuple[int, Item]]): (item_id, item) pairs to insert.
+            all_or_nothing (bool): if any pair fails, write none of them.
+
+        Returns:
+            List[bool]: one flag per pair, False where the id was already taken
+            (either in the store or earlier in the same batch).
+        """
+
+    @abstractmethod
+    def bulk_update(self, items: Sequence[Tuple[int, Item]], all_or_nothing: bool = False) -> List[bool]:
+        """
+        Replace many existing items in one transaction.
+
+        Returns:
+            List[bool]: one flag per pair, False where the id does not exist.
+        """
+
+    @abstractmethod
+    def bulk_delete(self, item_ids: Sequence[int], all_or_nothing: bool = False) -> List[bool]:
+        """
+        Remove many items in one transaction.
+
+        Returns:
+            List[bool]: one flag per id, False where the id does not exist
+            (or was already deleted earlier in the same batch).
+        """
+
+    @abstractmethod
+    def search(
+        self,
+        name_prefix: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        descending: bool = False,
+        limit: int = 100,
+    ) -> List[Tuple[int, Item]]:
+        """
+        Find items by name prefix and/or price range, ordered by price, using indexes
+        rather than a scan over every item.
+
+        Args:
+            name_prefix (str): only names starting with this prefix.
+            min_price (float): only prices >= min_price.
+            max_price (float): only prices <= max_price.
+            descending (bool): most expensive first.
+            limit (int): maximum number of items to return.
+
+        Returns:
+            List[Tuple[int, Item]]: (item_id, item) pairs.
+        """
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+# ------------------------ In-Memory Backend ------------------------
+# This is the dictionary the tutorial started with, just moved behind the interface.
+#
+# The sync app calls it from FastAPI's threadpool, so two requests can run "if item_id in
+# items ... items[item_id] = item" at the same time and both believe they created the item.
+# Every check-then-act below therefore runs under the lock of the item's stripe (see
+# striped_lock.py), so writers of the same item take turns.
+#
+# The dict and the secondary indexes used by search() (see item_index.py) are changed
+# together in _put/_pop under index_lock, so search() never sees one without the other.
+# The indexes are sorted over all items and can't be split up by stripe, so every write
+# takes this one lock for its update: writers of different items still take turns there,
+# the stripes only keep them from waiting for each other during the check.
+# Plain reads need no lock, a dict lookup is atomic.
+class InMemoryItemStore(ItemStore):
+    def __init__(self, stripes: int = 64) -> None:
+        """
+        Args:
+            stripes (int): number of write locks, 1 gives a single global lock.
+        """
+        self.items: Dict[int, Item] = {}
+        self.index = ItemIndex(self.items)
+        self.locks = StripedLock(stripes)
+        self.index_lock = threading.Lock()
+
+    # caller holds the item's stripe lock
+    def _put(self, item_id: int, item: Item) -> None:
+        with self.index_lock:
+            old = self.items.get(item_id)
+            if old is not None:
+                self.index.remove(item_id, old)
+            self.items[item_id] = item
+            self.index.add(item_id, item)
+
+    # caller holds the item's stripe lock
+    def _pop(self, item_id: int) -> None:
+        with self.index_lock:
+            self.index.remove(item_id, self.items.pop(item_id))
+
+    def get(self, item_id: int) -> Optional[Item]:
+        return self.items.get(item_id)
+
+    def create(self, item_id: int, item: Item) -> bool:
+        return self.compare_and_set(item_id, None, item)
+
+    def update(self, item_id: int, item: Item) -> bool:
+        with self.locks.lock_for(item_id):
+            if item_id not in self.items:
+                return False
+            self._put(item_id, item)
+            return True
+
+    def delete(self, item_id: int) -> bool:
+        with self.locks.lock_for(item_id):
+            if item_id not in self.items:
+                return False
+            self._pop(item_id)
+            return True
+
+    def compare_and_set(self, item_id: int, expected: Optional[Item], new: Optional[Item]) -> bool:
+        with self.locks.lock_for(item_id):
+            if self.items.get(item_id) != expected:
+                return False
+            if new is None:
+                if expected is not None:
+                    self._pop(item_id)
+            else:
+                self._put(item_id, new)
+            return True
+
+    # The bulk methods hold the locks of every item in the batch, first work out every
+    # status and only then touch the dict, which is what makes all_or_nothing possible
+    # without an undo log.
+    def bulk_create(self, items: Sequence[Tuple[int, Item]], all_or_nothing: bool = False) -> List[bool]:
+        with self.locks.lock_many(item_id for item_id, _ in items):
+            taken = set()
+            statuses = []
+            for item_id, _ in items:
+                statuses.append(item_id not in self.items and item_id not in taken)
+                taken.add(item_id)
+            if all_or_nothing and not all(statuses):
+                return statuses
+            for ok, (item_id, item) in zip(statuses, items):
+                if ok:
+                    self._put(item_id, item)
+            return statuses
+
+    def bulk_update(self, items: Sequence[Tuple[int, Item]], all_or_nothing: bool = False) -> List[bool]:
+        with self.locks.lock_many(item_id for item_id, _ in items):
+            statuses = [item_id in self.items for item_id, _ in items]
+            if all_or_nothing and not all(statuses):
+                return statuses
+            for ok, (item_id, item) in zip(statuses, items):
+                if ok:
+                    self._put(item_id, item)
+            return statuses
+
+    def bulk_delete(self, item_ids: Sequence[int], all_or_nothing: bool = False) -> List[bool]:
+        with self.locks.lock_many(item_ids):
+            deleted = set()
+            statuses = []
+            for item_id in item_ids:
+                statuses.append(item_id in self.items and item_id not in deleted)
+                deleted.add(item_id)
+            if all_or_nothing and not all(statuses):
+                return statuses
+            for ok, item_id in zip(statuses, item_ids):
+                if ok:
+                    self._pop(item_id)
+            return statuses
+
+    def search(
+        self,
+        name_prefix: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        descending: bool = False,
+        limit: int = 100,
+    ) -> List[Tuple[int, Item]]:
+        with self.index_lock:
+            item_ids = self.index.search(name_prefix, min_price, max_price, descending, limit)
+            return [(item_id, self.items[item_id]) for item_id in item_ids]
+
+
+# ------------------------ SQLite Backend ------------------------
+metadata = MetaData()
+
+# "id" is declared as INTEGER PRIMARY KEY, which SQLite turns into the rowid itself.
+# The table is therefore stored as a B-tree ordered by id, so a lookup by item_id is a
+# single index seek and no separate index has to be maintained.
+items_table = Table(
+    "items",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("price", Float, nullable=False),
+    # Secondary indexes for search(): a price range and a name prefix each become an
+    # index range scan instead of a full table scan.
+    Index("ix_items_price", "price"),
+    Index("ix_items_name", "name"),
+)
+
+# The statements are built once at import time and only ever executed with different
+# bind parameters. That way SQLAlchemy compiles each of them once (compiled cache hit on
+# every later call) and the sqlite3 driver reuses its prepared statement for the same SQL text.
+select_item = select(items_table.c.name, items_table.c.price).where(
+    items_table.c.id == bindparam("item_id")
+)
+select_existing_ids = select(items_table.c.id).where(
+    items_table.c.id.in_(bindparam("item_ids", expanding=True))
+)
+update_item = (
+    update(items_table)
+    .where(items_table.c.id == bindparam("item_id"))
+    .values(name=bindparam("new_name"), price=bindparam("new_price"))
+)
+delete_item = delete(items_table).where(items_table.c.id == bindparam("item_id"))
+
+# compare-and-set variants: the write only happens if the row still holds the expected values
+insert_item_if_missing = sqlite_insert(items_table).on_conflict_do_nothing(index_elements=["id"])
+# bulk_create: the ids that were really inserted come back, a taken id is skipped by the
+# database itself, so there is no gap between checking for an id and inserting it
+insert_items_returning_ids = insert_item_if_missing.returning(items_table.c.id)
+update_item_if_equal = (
+    update(items_table)
+    .where(
+        items_table.c.id == bindparam("item_id"),
+        items_table.c.name == bindparam("old_name"),
+        items_table.c.price == bindparam("old_price"),
+    )
+    .values(name=bindparam("new_name"), price=bindparam("new_price"))
+)
+delete_item_if_equal = delete(items_table).where(
+    items_table.c.id == bindparam("item_id"),
+    items_table.c.name == bindparam("old_name"),
+    items_table.c.price == bindparam("old_price"),
+)
+
+
+def build_search(
+    name_prefix: Optional[str], min_price: Optional[float], max_price: Optional[float], descending: bool, limit: int
+):
+    # The prefix is written as a range (name >= prefix AND name < prefix + MAX_CHAR)
+    # rather than LIKE 'prefix%', which SQLite can only serve from an index under
+    # special collation settings. SQLite's planner picks ix_items_name or ix_items_price
+    # depending on which filter it expects to be more selective.
+    statement = select(items_table.c.id, items_table.c.name, items_table.c.price)
+    if name_prefix is not None:
+        statement = statement.where(items_table.c.name >= name_prefix, items_table.c.name < name_prefix + MAX_CHAR)
+    if min_price is not None:
+        statement = statement.where(items_table.c.price >= min_price)
+    if max_price is not None:
+        statement = statement.where(items_table.c.price <= max_price)
+    if descending:
+        statement = statement.order_by(items_table.c.price.desc(), items_table.c.id.desc())
+    else:
+        statement = statement.order_by(items_table.c.price, items_table.c.id)
+    return statement.limit(limit)
+
+# SQLite limits the number of "?" placeholders per statement, so id lookups for big
+# batches are done in chunks of this size.
+ID_LOOKUP_CHUNK = 500
+
+
+def create_tables(engine, metadata: MetaData) -> None:
+    """
+    create_all(), plus the declared indexes of tables that already existed: create_all
+    skips those, so a database created before an index was added wouldn't get it.
+    """
+    metadata.create_all(engine)
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # WAL lets readers keep going while another worker is writing, and NORMAL sync
+    # is still crash safe in WAL mode while avoiding an fsync on every commit.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+class SQLiteItemStore(ItemStore):
+    def __init__(self, url: str = "sqlite:///items.db", pool_size: int = 5, max_overflow: int = 10) -> None:
+        """
+        Create the engine and the items table.
+
+        Args:
+            url (str): SQLAlchemy URL of the database. "sqlite://" gives a private in-memory db.
+            pool_size (int): connections kept open in the pool (file databases only).
+            max_overflow (int): extra connections allowed above pool_size under load.
+        """
+        # check_same_thread=False because FastAPI runs sync handlers on a threadpool and
+        # a pooled connection may be checked out by a different thread each time.
+        # cached_statements is the size of the sqlite3 prepared statement cache per connection.
+        connect_args = {"check_same_thread": False, "cached_statements": 256}
+
+        if url in ("sqlite://", "sqlite:///:memory:"):
+            # An in-memory database only exists inside the connection that created it,
+            # so every checkout must get that very same connection. The threadpool threads
+            # then share one sqlite3 connection, so they have to take turns using it.
+            self.engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+            self.connection_lock: Optional[threading.Lock] = threading.Lock()
+        else:
+            # File databases get a regular QueuePool, so connections (and the prepared
+            # statements cached on them) are reused instead of reopened per request.
+            self.engine = create_engine(
+                url,
+                connect_args=connect_args,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+            )
+            event.listen(self.engine, "connect", _set_sqlite_pragmas)
+            self.connection_lock = None
+
+        create_tables(self.engine, metadata)
+
+    @contextmanager
+    def _connect(self) -> Iterator:
+        with self.connection_lock or nullcontext(), self.engine.connect() as conn:
+            yield conn
+
+    @contextmanager
+    def _begin(self) -> Iterator:
+        with self.connection_lock or nullcontext(), self.engine.begin() as conn:
+            yield conn
+
+    @contextmanager
+    def _begin_immediate(self) -> Iterator:
+        # sqlite3 only sends BEGIN before the first write, so a SELECT ahead of it would
+        # read outside the transaction. BEGIN IMMEDIATE takes the write lock up front:
+        # no other connection can add or delete an id between the lookup and the write.
+        with self._begin() as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            yield conn
+
+    def get(self, item_id: int) -> Optional[Item]:
+        with self._connect() as conn:
+            row = conn.execute(select_item, {"item_id": item_id}).first()
+        if row is None:
+            return None
+        return Item(name=row.name, price=row.price)
+
+    def create(self, item_id: int, item: Item) -> bool:
+        return self.bulk_create([(item_id, item)])[0]
+
+    def update(self, item_id: int, item: Item) -> bool:
+        with self._begin() as conn:
+            result = conn.execute(
+                update_item, {"item_id": item_id, "new_name": item.name, "new_price": item.price}
+            )
+        return result.rowcount == 1
+
+    def delete(self, item_id: int) -> bool:
+        with self._begin() as conn:
+            result = conn.execute(delete_item, {"item_id": item_id})
+        return result.rowcount == 1
+
+    def compare_and_set(self, item_id: int, expected: Optional[Item], new: Optional[Item]) -> bool:
+        # The comparison is part of the statement's WHERE clause, so the database does the
+        # check and the write as one atomic step, even across uvicorn workers.
+        with self._begin() as conn:
+            if expected is None:
+                if new is None:
+                    return conn.execute(select_item, {"item_id": item_id}).first() is None
+                result = conn.execute(insert_item_if_missing, {"id": item_id, "name": new.name, "price": new.price})
+            elif new is None:
+                result = conn.execute(
+                    delete_item_if_equal, {"item_id": item_id, "old_name": expected.name, "old_price": expected.price}
+                )
+            else:
+                result = conn.execute(update_item_if_equal, {
+                    "item_id": item_id, "old_name": expected.name, "old_price": expected.price,
+                    "new_name": new.name, "new_price": new.price,
+                })
+        return result.rowcount == 1
+
+    def bulk_create(self, items: Sequence[Tuple[int, Item]], all_or_nothing: bool = False) -> List[bool]:
+        if not items:
+            return []
+        rows = [{"id": item_id, "name": item.name, "price": item.price} for item_id, item in items]
+        with self._connect() as conn, conn.begin() as transaction:
+            # INSERT ... ON CONFLICT(id) DO NOTHING RETURNING id: a taken id (in the table,
+            # earlier in this batch, or inserted by another worker a moment ago) is skipped
+            # instead of raising IntegrityError. SQLAlchemy sends the rows as multi-row
+            # INSERTs ("insertmanyvalues"), in order, so the first of two equal ids wins.
+            inserted = set(conn.execute(insert_items_returning_ids, rows).scalars())
+
+            statuses = []
+            for item_id, _ in items:
+                statuses.append(item_id in inserted)
+                inserted.discard(item_id)
+
+            if all_or_nothing and not all(statuses):
+                transaction.rollback()
+        return statuses
+
+    def bulk_update(self, items: Sequence[Tuple[int, Item]], all_or_nothing: bool = False) -> List[bool]:
+        with self._begin_immediate() as conn:
+            existing = self._existing_ids(conn, [item_id for item_id, _ in items])
+            statuses = [item_id in existing for item_id, _ in items]
+            if all_or_nothing and not all(statuses):
+                return statuses
+
+            rows = [
+                {"item_id": item_id, "new_name": item.name, "new_price": item.price}
+                for ok, (item_id, item) in zip(statuses, items)
+                if ok
+            ]
+            if rows:
+                conn.execute(update_item, rows)
+        return statuses
+
+    def bulk_delete(self, item_ids: Sequence[int], all_or_nothing: bool = False) -> List[bool]:
+        with self._begin_immediate() as conn:
+            existing = self._existing_ids(conn, list(item_ids))
+            statuses = []
+            for item_id in item_ids:
+                statuses.append(item_id in existing)
+                existing.discard(item_id)
+            if all_or_nothing and not all(statuses):
+                return statuses
+
+            rows = [{"item_id": item_id} for ok, item_id in zip(statuses, item_ids) if ok]
+            if rows:
+                conn.execute(delete_item, rows)
+        return statuses
+
+    def _existing_ids(self, conn, item_ids: List[int]) -> set:
+        found = set()
+        for start in range(0, len(item_ids), ID_LOOKUP_CHUNK):
+            chunk = item_ids[start:start + ID_LOOKUP_CHUNK]
+            found.update(conn.execute(select_existing_ids, {"item_ids": chunk}).scalars())
+        return found
+
+    def search(
+        self,
+        name_prefix: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        descending: bool = False,
+        limit: int = 100,
+    ) -> List[Tuple[int, Item]]:
+        statement = build_search(name_prefix, min_price, max_price, descending, limit)
+        with self._connect() as conn:
+            rows = conn.execute(statement).all()
+        return [(row.id, Item(name=row.name, price=row.price)) for row in rows]
+
+    def close(self) -> None:
+        self.engine.dispose()
+
+
+# ------------------------ Picking a Backend ------------------------
+def get_store(backend: Optional[str] = None, url: Optional[str] = None) -> ItemStore:
+    """
+    Build the store configured through the environment.
+
+    Args:
+        backend (str): "memory" or "sqlite". Defaults to $ITEMS_BACKEND, then "memory".
+        url (str): database URL for the sqlite backend. Defaults to $ITEMS_DB_URL.
+
+    Returns:
+        ItemStore: the selected backend.
+    """
+    backend = backend or os.environ.get("ITEMS_BACKEND", "memory")
+    if backend == "memory":
+        return InMemoryItemStore()
+    if backend == "sqlite":
+        return SQLiteItemStore(url or os.environ.get("ITEMS_DB_URL", "sqlite:///items.db"))
+    raise ValueError(f"Unknown items backend: {backend}")
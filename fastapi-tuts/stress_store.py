@@ -0,0 +1,120 @@
+'''
+Stress test for the thread-safe InMemoryItemStore.
+
+Hammers one store from many threads at once, then checks that nothing was lost or
+duplicated, and prints the throughput for a single global lock (stripes=1) next to
+lock striping (stripes=64):
+
+1. CAS counters  - every thread keeps incrementing the price of random hot items with a
+                   read / compare_and_set / retry loop. The final prices must add up to
+                   exactly the number of increments, a lost update would show as a shortfall.
+2. Create race   - every thread tries to create the same ids; each id must have exactly one winner.
+3. Mixed writes  - creates, updates, deletes and bulk writes from all threads; afterwards
+                   the secondary indexes must match the dict exactly.
+
+Run it from inside the fastapi-tuts folder, it exits with an error if a check fails:
+
+    python stress_store.py
+'''
+
+import random
+import sys
+import threading
+import time
+
+from models import Item
+from storage import InMemoryItemStore
+
+THREAD_COUNTS = [1, 4, 16, 64]
+STRIPES = [1, 64]
+OPS_PER_THREAD = 2000
+HOT_ITEMS = 256
+
+
+def run_threads(n_threads, work):
+    # the barrier releases all threads at once, so they really overlap
+    barrier = threading.Barrier(n_threads)
+    results = [None] * n_threads
+
+    def target(n):
+        barrier.wait()
+        results[n] = work(n)
+
+    threads = [threading.Thread(target=target, args=(n,)) for n in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def cas_counters(store, n_threads):
+    store.bulk_create([(i, Item(name=f"counter-{i}", price=0)) for i in range(HOT_ITEMS)])
+
+    def work(n):
+        rng = random.Random(n)
+        retries = 0
+        for _ in range(OPS_PER_THREAD):
+            item_id = rng.randrange(HOT_ITEMS)
+            while True:
+                current = store.get(item_id)
+                if store.compare_and_set(item_id, current, Item(name=current.name, price=current.price + 1)):
+                    break
+                retries += 1
+        return retries
+
+    retries, elapsed = run_threads(n_threads, work)
+    total = sum(store.get(i).price for i in range(HOT_ITEMS))
+    assert total == n_threads * OPS_PER_THREAD, f"lost updates: {total} != {n_threads * OPS_PER_THREAD}"
+    return n_threads * OPS_PER_THREAD / elapsed, sum(retries)
+
+
+def create_race(store, n_threads):
+    def work(n):
+        return [item_id for item_id in range(OPS_PER_THREAD) if store.create(item_id, Item(name=f"t{n}", price=n))]
+
+    winners, elapsed = run_threads(n_threads, work)
+    created = [item_id for ids in winners for item_id in ids]
+    assert sorted(created) == list(range(OPS_PER_THREAD)), "an id was created twice or not at all"
+    return n_threads * OPS_PER_THREAD / elapsed
+
+
+def mixed_writes(store, n_threads):
+    def work(n):
+        rng = random.Random(n)
+        for _ in range(OPS_PER_THREAD):
+            item_id = rng.randrange(HOT_ITEMS * 4)
+            item = Item(name=rng.choice("abcde") * 3, price=rng.randrange(1000))
+            op = rng.random()
+            if op < 0.3:
+                store.create(item_id, item)
+            elif op < 0.6:
+                store.update(item_id, item)
+            elif op < 0.8:
+                store.delete(item_id)
+            elif op < 0.9:
+                store.bulk_update([(rng.randrange(HOT_ITEMS * 4), item) for _ in range(8)])
+            else:
+                store.search(name_prefix="a", max_price=500, limit=10)
+
+    _, elapsed = run_threads(n_threads, work)
+    assert store.index.by_price == sorted((item.price, item_id) for item_id, item in store.items.items()), \
+        "price index out of sync"
+    assert store.index.by_name == sorted((item.name, item_id) for item_id, item in store.items.items()), \
+        "name index out of sync"
+    return n_threads * OPS_PER_THREAD / elapsed
+
+
+if __name__ == "__main__":
+    # Switch threads far more often than the default 5 ms, so that races get a chance to show
+    sys.setswitchinterval(1e-5)
+
+    print(f"{'threads':>7} {'stripes':>7} {'cas ops/s':>12} {'cas retries':>12} {'create ops/s':>13} {'mixed ops/s':>12}")
+    for n_threads in THREAD_COUNTS:
+        for stripes in STRIPES:
+            cas_rate, retries = cas_counters(InMemoryItemStore(stripes), n_threads)
+            create_rate = create_race(InMemoryItemStore(stripes), n_threads)
+            mixed_rate = mixed_writes(InMemoryItemStore(stripes), n_threads)
+            print(f"{n_threads:>7} {stripes:>7} {cas_rate:>12,.0f} {retries:>12} {create_rate:>13,.0f} {mixed_rate:>12,.0f}")
+    print("all consistency checks passed")
@@ -0,0 +1,45 @@
+'''
+Lock striping: a fixed set of locks shared out between keys by hash.
+
+One global lock would make every writer wait for every other writer, even when they
+touch different items. One lock per key would need a lock per item, plus a lock to
+create and clean up those locks. Striping sits in between: key -> locks[hash(key) % n].
+Two writers only wait for each other when their keys land on the same stripe, so with
+enough stripes unrelated writes almost never contend.
+'''
+
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterable
+
+
+class StripedLock:
+    def __init__(self, stripes: int = 64) -> None:
+        """
+        Args:
+            stripes (int): number of locks. stripes=1 behaves like a single global lock.
+        """
+        self.locks = [threading.Lock() for _ in range(stripes)]
+
+    def stripe(self, key: Hashable) -> int:
+        return hash(key) % len(self.locks)
+
+    def lock_for(self, key: Hashable) -> threading.Lock:
+        return self.locks[self.stripe(key)]
+
+    @contextmanager
+    def lock_many(self, keys: Iterable[Hashable]):
+        """
+        Hold the locks of several keys at once, e.g. for an atomic bulk write.
+
+        The stripes are always taken in ascending order, so two threads locking
+        overlapping key sets can't deadlock by each waiting for a lock the other holds.
+        """
+        stripes = sorted({self.stripe(key) for key in keys})
+        for stripe in stripes:
+            self.locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self.locks[stripe].release()
@@ -2,6 +2,7 @@ from typing import List
 from typing import Optional
 
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import String
 
 from sqlalchemy.orm import DeclarativeBase
@@ -29,7 +30,9 @@ class Base(DeclarativeBase):
 class User(Base):
     __tablename__ = "user_account" 
     id: Mapped[int] = mapped_column(primary_key=True)
-    name: Mapped[str] = mapped_column(String(30))
+    # index=True creates an index on the column (ix_user_account_name), so looking a user up
+    # by name is a search in the index instead of a scan of the whole table
+    name: Mapped[str] = mapped_column(String(30), index=True)
     fullname: Mapped[Optional[str]]
 
     # In contrast to the column-based attributes, relationship() denotes a linkage between two ORM classes
@@ -43,6 +46,11 @@ class User(Base):
 
 class Address(Base):
     __tablename__ = "address"
+    # Indexes over several columns are declared in __table_args__. This one serves the
+    # "addresses of a user" queries (the join/lazy load of User.addresses and WHERE user_id = ?
+    # ORDER BY id): the index finds the user's rows and already has them in id order.
+    # SQLite doesn't index foreign keys by itself, without it they scan the whole table.
+    __table_args__ = (Index("ix_address_user_id_id", "user_id", "id"),)
     id: Mapped[int] = mapped_column(primary_key=True)
     email_address: Mapped[str]
     user_id: Mapped[int] = mapped_column(ForeignKey("user_account.id"))
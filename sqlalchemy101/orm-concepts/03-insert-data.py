@@ -0,0 +1,51 @@
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from bulk_load import UserRecord, load_users
+from orm_models import Address, Base, User
+
+# The User and Address models declared in 01-declaring-models.py, see orm_models.py
+engine = create_engine("sqlite://", echo=True)
+Base.metadata.create_all(engine)
+
+# ------------- Inserting with the Session -------------
+# The usual ORM way: build the objects and add them to a Session. Nothing is sent to the
+# database until the session flushes (commit() flushes first). On flush the unit of work
+# inserts the users, reads back their new primary keys, and only then inserts the
+# addresses with those keys as user_id. The relationship takes care of that for us.
+with Session(engine) as session:
+    spongebob = User(
+        name="spongebob",
+        fullname="Spongebob Squarepants",
+        addresses=[Address(email_address="spongebob@sqlalchemy.org")],
+    )
+    sandy = User(
+        name="sandy",
+        fullname="Sandy Cheeks",
+        addresses=[
+            Address(email_address="sandy@sqlalchemy.org"),
+            Address(email_address="sandy@squirrelpower.org"),
+        ],
+    )
+    patrick = User(name="patrick", fullname="Patrick Star")
+
+    session.add_all([spongebob, sandy, patrick])
+    session.commit()
+
+# ------------- Inserting in Bulk -------------
+# Every object above is tracked by the session, which is a lot of work per row. To load
+# millions of rows, bulk_load.load_users skips the objects: it sends each chunk of users
+# as one executemany INSERT ... RETURNING id, pairs the returned ids with the records,
+# and inserts all the addresses of the chunk in a second executemany.
+# Turn echo off first, it would print every batch of parameters.
+engine.echo = False
+load_users(
+    engine,
+    (UserRecord(f"user{i}", None, [f"user{i}@example.com"]) for i in range(10_000)),
+    chunk_size=2_000,
+)
+
+with Session(engine) as session:
+    print(session.scalars(select(User).where(User.name == "user9999")).one().addresses)
+
+# see bench_bulk_load.py for how much faster that is than session.add()
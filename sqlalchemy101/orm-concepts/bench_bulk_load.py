@@ -0,0 +1,94 @@
+'''
+Benchmark of bulk_load.load_users against inserting through the ORM session.
+
+Every strategy loads the same users (2 addresses each) into a fresh SQLite file:
+
+- add + commit per row   session.add(user); session.commit() for every user
+- add, one commit        session.add(user) for every user, one commit at the end
+                         (the unit of work already batches the INSERTs on flush)
+- load_users             chunked Core executemany with RETURNING, see bulk_load.py
+
+The per-row commit is so slow that it only gets N_PER_ROW users, the rates are per second
+so they still compare. Run it from inside the orm-concepts folder:
+
+    python bench_bulk_load.py
+'''
+
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from bulk_load import UserRecord, load_users
+from orm_models import Address, Base, User
+
+N_USERS = 50_000
+N_PER_ROW = 2_000
+
+
+def records(n):
+    for i in range(n):
+        yield UserRecord(f"user{i}", f"User Number {i}", (f"user{i}@example.com", f"user{i}@work.example.com"))
+
+
+def to_user(record):
+    return User(
+        name=record.name,
+        fullname=record.fullname,
+        addresses=[Address(email_address=email) for email in record.emails],
+    )
+
+
+def add_commit_per_row(engine, n):
+    with Session(engine) as session:
+        for record in records(n):
+            session.add(to_user(record))
+            session.commit()
+
+
+def add_one_commit(engine, n):
+    with Session(engine) as session:
+        for record in records(n):
+            session.add(to_user(record))
+        session.commit()
+
+
+def bulk(engine, n):
+    load_users(engine, records(n))
+
+
+STRATEGIES = [
+    ("add + commit per row", add_commit_per_row, N_PER_ROW),
+    ("add, one commit", add_one_commit, N_USERS),
+    ("load_users", bulk, N_USERS),
+]
+
+
+def run(load, n):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+
+        start = time.perf_counter()
+        load(engine, n)
+        elapsed = time.perf_counter() - start
+
+        # check that every user got in, with its addresses pointing at the right user
+        with engine.connect() as conn:
+            users = conn.scalar(select(func.count()).select_from(User))
+            linked = conn.scalar(
+                select(func.count()).select_from(Address).join(User, Address.user_id == User.id)
+                .where(Address.email_address.startswith(User.name + "@"))
+            )
+        assert users == n and linked == 2 * n, f"loaded {users} users and {linked} linked addresses"
+        engine.dispose()
+    return elapsed
+
+
+if __name__ == "__main__":
+    print(f"{'strategy':<22} {'users':>8} {'seconds':>9} {'users/s':>10}")
+    for name, load, n in STRATEGIES:
+        elapsed = run(load, n)
+        print(f"{name:<22} {n:>8} {elapsed:>9.2f} {n / elapsed:>10,.0f}")
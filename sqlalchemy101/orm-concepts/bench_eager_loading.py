@@ -0,0 +1,100 @@
+'''
+Benchmark of the loading strategies for User.addresses and Address.user.
+
+Loads N_USERS users with ADDRESSES_PER_USER addresses each (with bulk_load.load_users),
+then for every access pattern and strategy runs the query in a fresh session, touches
+every relationship, and prints the number of SQL statements, the lazy loads counted by
+NPlusOneDetector and the time taken:
+
+- all users -> addresses      lazy / joined / selectin / eager_options
+- one user -> addresses       lazy / joined / selectin / eager_options
+- all addresses -> user       lazy / joined / selectin / eager_options
+
+Run it from inside the orm-concepts folder:
+
+    python bench_eager_loading.py
+'''
+
+import os
+import tempfile
+import time
+import warnings
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from bulk_load import UserRecord, load_users
+from eager_loading import NPlusOneDetector, NPlusOneWarning, addresses_with_user, users_with_addresses
+from orm_models import Address, Base, User
+
+N_USERS = 5_000
+ADDRESSES_PER_USER = 3
+REPEAT = 3
+
+
+def touch_addresses(users):
+    return sum(len(user.addresses) for user in users)
+
+
+def touch_user(addresses):
+    return sum(len(address.user.name) for address in addresses)
+
+
+PATTERNS = {
+    "all users -> addresses": (touch_addresses, {
+        "lazy": select(User).order_by(User.id),
+        "joined": select(User).order_by(User.id).options(joinedload(User.addresses)),
+        "selectin": select(User).order_by(User.id).options(selectinload(User.addresses)),
+        "eager_options": users_with_addresses(),
+    }),
+    "one user -> addresses": (touch_addresses, {
+        "lazy": select(User).where(User.id.in_([42])),
+        "joined": select(User).where(User.id.in_([42])).options(joinedload(User.addresses)),
+        "selectin": select(User).where(User.id.in_([42])).options(selectinload(User.addresses)),
+        "eager_options": users_with_addresses(42),
+    }),
+    "all addresses -> user": (touch_user, {
+        "lazy": select(Address).order_by(Address.id),
+        "joined": select(Address).order_by(Address.id).options(joinedload(Address.user)),
+        "selectin": select(Address).order_by(Address.id).options(selectinload(Address.user)),
+        "eager_options": addresses_with_user(),
+    }),
+}
+
+
+def run(engine, query, touch):
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    with Session(engine) as session, NPlusOneDetector(session) as detector:
+        start = time.perf_counter()
+        touch(session.scalars(query).unique())
+        elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+    return statements, detector.total, elapsed
+
+
+if __name__ == "__main__":
+    # the lazy strategy is meant to trip the detector, that's shown in the table instead
+    warnings.simplefilter("ignore", NPlusOneWarning)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        load_users(engine, (
+            UserRecord(f"user{i}", None, [f"user{i}.{n}@example.com" for n in range(ADDRESSES_PER_USER)])
+            for i in range(N_USERS)
+        ))
+
+        print(f"{'pattern':<24} {'strategy':<14} {'queries':>8} {'lazy loads':>11} {'ms':>9}")
+        for pattern, (touch, strategies) in PATTERNS.items():
+            for strategy, query in strategies.items():
+                results = [run(engine, query, touch) for _ in range(REPEAT)]
+                statements, lazy_loads, _ = results[0]
+                best = min(elapsed for _, _, elapsed in results)
+                print(f"{pattern:<24} {strategy:<14} {statements:>8} {lazy_loads:>11} {best * 1000:>9.2f}")
+        engine.dispose()
@@ -0,0 +1,109 @@
+'''
+Before/after benchmark of engine_factory.make_engine against plain create_engine.
+
+Every engine gets a fresh SQLite file and runs the same workloads:
+
+- insert 1 row / txn   N_SMALL_TXNS users, one transaction each, like a web app's writes
+- bulk insert          N_USERS users with 2 addresses via bulk_load.load_users
+- read by id           N_READS point lookups, each on its own pooled connection checkout
+- threaded reads       READ_THREADS threads doing the point lookups at once, with the
+                       pool's checkout wait times from pool_wait_stats()
+
+Engines:
+
+- echo=True    create_engine(url, echo=True), as in the tutorial files (the log goes to
+               /dev/null here, but it still has to be formatted)
+- default      create_engine(url)
+- make_engine  make_engine(url): WAL, synchronous=NORMAL, mmap, cache_size, timed QueuePool
+
+Run it from inside the orm-concepts folder:
+
+    python bench_engine.py
+'''
+
+import contextlib
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, insert, select
+
+from bulk_load import UserRecord, load_users
+from engine_factory import make_engine, pool_wait_stats
+from orm_models import Base, User
+
+N_SMALL_TXNS = 2_000
+N_USERS = 50_000
+N_READS = 5_000
+READ_THREADS = 32
+
+
+def small_transactions(engine):
+    for i in range(N_SMALL_TXNS):
+        with engine.begin() as conn:
+            conn.execute(insert(User), {"name": f"single{i}", "fullname": None})
+
+
+def bulk_insert(engine):
+    load_users(engine, (UserRecord(f"user{i}", None, [f"a{i}@example.com", f"b{i}@example.com"]) for i in range(N_USERS)))
+
+
+def read_by_id(engine, n=N_READS, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        with engine.connect() as conn:
+            conn.execute(select(User.name).where(User.id == rng.randint(1, N_USERS))).scalar_one()
+
+
+def threaded_reads(engine):
+    threads = [
+        threading.Thread(target=read_by_id, args=(engine, N_READS // READ_THREADS, n))
+        for n in range(READ_THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+WORKLOADS = [
+    ("insert 1 row / txn", small_transactions, N_SMALL_TXNS),
+    ("bulk insert", bulk_insert, N_USERS),
+    ("read by id", read_by_id, N_READS),
+    ("threaded reads", threaded_reads, N_READS // READ_THREADS * READ_THREADS),
+]
+
+ENGINES = {
+    "echo=True": lambda url: create_engine(url, echo=True),
+    "default": lambda url: create_engine(url),
+    "make_engine": lambda url: make_engine(url),
+}
+
+
+def bench(make):
+    rates = []
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        # echo=True logs to the sys.stdout of the moment the engine is created
+        engine = make(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        for _, workload, n in WORKLOADS:
+            start = time.perf_counter()
+            workload(engine)
+            rates.append(n / (time.perf_counter() - start))
+        waits = pool_wait_stats(engine)
+        engine.dispose()
+    return rates, waits
+
+
+if __name__ == "__main__":
+    print(f"{'engine':<12}" + "".join(f"{name:>22}" for name, _, _ in WORKLOADS))
+    for name, make in ENGINES.items():
+        rates, waits = bench(make)
+        print(f"{name:<12}" + "".join(f"{rate:>18,.0f}/s  " for rate in rates))
+        if waits is not None:
+            print(
+                f"{'':<12}pool checkout wait over {waits['checkouts']:,} checkouts: mean={waits['mean_ms']:.3f} ms "
+                f"p50={waits['p50_ms']:.3f} ms p99={waits['p99_ms']:.3f} ms max={waits['max_ms']:.3f} ms"
+            )
@@ -0,0 +1,67 @@
+'''
+Benchmark of EntityCache against session.get, one fresh session per lookup (as per request).
+
+Lookups follow a skewed distribution: most of them go to a small set of hot users, like
+real traffic does. Every WRITE_EVERY lookups the user is renamed and committed, so the
+invalidation path is part of the measurement. Prints lookups/s and the cache statistics.
+
+Run it from inside the orm-concepts folder:
+
+    python bench_entity_cache.py
+'''
+
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy.orm import Session
+
+from bulk_load import UserRecord, load_users
+from engine_factory import make_engine
+from entity_cache import EntityCache, LocalLRUCache
+from orm_models import Base, User
+
+N_USERS = 100_000
+N_LOOKUPS = 20_000
+HOT_USERS = 1_000
+HOT_SHARE = 0.9
+WRITE_EVERY = 100
+
+
+def lookup_ids(seed=0):
+    rng = random.Random(seed)
+    return [
+        rng.randint(1, HOT_USERS) if rng.random() < HOT_SHARE else rng.randint(1, N_USERS)
+        for _ in range(N_LOOKUPS)
+    ]
+
+
+def run(engine, get):
+    start = time.perf_counter()
+    for n, user_id in enumerate(lookup_ids()):
+        with Session(engine) as session:
+            user = get(session, user_id)
+            if n % WRITE_EVERY == 0:
+                user.fullname = f"renamed {n}"
+                session.commit()
+    return N_LOOKUPS / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        load_users(engine, (UserRecord(f"user{i}", None, ()) for i in range(N_USERS)))
+
+        rate = run(engine, lambda session, user_id: session.get(User, user_id))
+        print(f"{'session.get':<24} {rate:>10,.0f} lookups/s")
+
+        for maxsize in (500, 5_000):
+            cache = EntityCache(LocalLRUCache(maxsize=maxsize, ttl=60))
+            cache.attach(Session)
+            rate = run(engine, lambda session, user_id: cache.get(session, User, user_id))
+            print(f"{f'EntityCache({maxsize})':<24} {rate:>10,.0f} lookups/s  {cache.stats()}")
+            # detach, so the next cache doesn't get invalidations from this one's events
+            cache.detach(Session)
+        engine.dispose()
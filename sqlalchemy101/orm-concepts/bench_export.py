@@ -0,0 +1,75 @@
+'''
+Memory and speed of export.py against exporting through ORM objects.
+
+Loads N_USERS users with 2 addresses each, then exports user_account three ways and
+prints the time and the peak memory allocated by Python (tracemalloc, measured in a
+second run) during the export:
+
+- orm .all()    session.scalars(select(User)).all(), then write every object as CSV
+- csv stream    export.export_csv(users_export)
+- ndjson stream export.export_ndjson(users_export)
+
+Then both streaming writers export the (bigger) users joined with addresses, to show the
+peak stays the same for a table twice as large. Run it from inside the orm-concepts folder:
+
+    python bench_export.py
+'''
+
+import csv
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from bulk_load import UserRecord, load_users
+from engine_factory import make_engine
+from export import export_csv, export_ndjson, users_export, users_with_addresses_export
+from orm_models import Base, User
+
+N_USERS = 100_000
+
+
+def orm_all(engine, file):
+    writer = csv.writer(file)
+    writer.writerow(["id", "name", "fullname"])
+    with Session(engine) as session:
+        users = session.scalars(select(User).order_by(User.id)).all()
+        writer.writerows((user.id, user.name, user.fullname) for user in users)
+    return len(users)
+
+
+EXPORTS = [
+    ("orm .all()", "user_account", orm_all),
+    ("csv stream", "user_account", lambda engine, file: export_csv(engine, users_export, file)),
+    ("ndjson stream", "user_account", lambda engine, file: export_ndjson(engine, users_export, file)),
+    ("csv stream", "users+addresses", lambda engine, file: export_csv(engine, users_with_addresses_export, file)),
+    ("ndjson stream", "users+addresses", lambda engine, file: export_ndjson(engine, users_with_addresses_export, file)),
+]
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        load_users(engine, (
+            UserRecord(f"user{i}", f"User Number {i}", [f"user{i}@example.com", f"user{i}@work.example.com"])
+            for i in range(N_USERS)
+        ))
+
+        print(f"{'export':<15} {'table':<16} {'rows':>8} {'seconds':>8} {'peak MiB':>9}")
+        for name, table, export in EXPORTS:
+            with open(os.path.join(tmp, "out"), "w", newline="") as file:
+                start = time.perf_counter()
+                rows = export(engine, file)
+                elapsed = time.perf_counter() - start
+            # a second run for the memory, tracemalloc slows every allocation down a lot
+            with open(os.path.join(tmp, "out"), "w", newline="") as file:
+                tracemalloc.start()
+                export(engine, file)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            print(f"{name:<15} {table:<16} {rows:>8} {elapsed:>8.2f} {peak / 2**20:>9.1f}")
+        engine.dispose()
@@ -0,0 +1,88 @@
+'''
+Benchmark of the lookup paths in repository.py.
+
+Looks up N_LOOKUPS random users by id and by name, each through a fresh session (as a
+web request would), and prints lookups/s plus the compiled cache hit rate:
+
+- inline select     session.scalars(select(User).where(User.id == x)), built per call
+- inline, no cache  the same with compiled_cache=None: compiled on every call
+- prebuilt ORM      UserRepository.by_id / by_name, prebuilt statements + bindparam
+- session.get       UserRepository.get (by id only)
+- Core rows         UserRepository.row_by_id / rows_by_name, named tuples, no ORM
+
+Run it from inside the orm-concepts folder:
+
+    python bench_repository.py
+'''
+
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from bulk_load import UserRecord, load_users
+from engine_factory import make_engine
+from orm_models import Base, User
+from repository import CompiledCacheStats, UserRepository
+
+N_USERS = 10_000
+N_LOOKUPS = 5_000
+
+
+def inline_by_id(session, user_id):
+    return session.scalars(select(User).where(User.id == user_id)).one_or_none()
+
+
+def inline_by_name(session, name):
+    return list(session.scalars(select(User).where(User.name == name).order_by(User.id)))
+
+
+def uncached(lookup):
+    def run(session, value):
+        session.connection(execution_options={"compiled_cache": None})
+        return lookup(session, value)
+    return run
+
+
+PATHS = {
+    "inline select": (inline_by_id, inline_by_name),
+    "inline, no cache": (uncached(inline_by_id), uncached(inline_by_name)),
+    "prebuilt ORM": (lambda s, v: UserRepository(s).by_id(v), lambda s, v: UserRepository(s).by_name(v)),
+    "session.get": (lambda s, v: UserRepository(s).get(v), None),
+    "Core rows": (lambda s, v: UserRepository(s).row_by_id(v), lambda s, v: UserRepository(s).rows_by_name(v)),
+}
+
+
+def bench(engine, stats, lookup, values):
+    stats.reset()
+    start = time.perf_counter()
+    for value in values:
+        with Session(engine) as session:
+            lookup(session, value)
+    return len(values) / (time.perf_counter() - start), stats.hit_rate
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        load_users(engine, (UserRecord(f"user{i}", None, [f"user{i}@example.com"]) for i in range(N_USERS)))
+        stats = CompiledCacheStats(engine)
+
+        rng = random.Random(0)
+        ids = [rng.randint(1, N_USERS) for _ in range(N_LOOKUPS)]
+        names = [f"user{user_id - 1}" for user_id in ids]
+
+        print(f"{'path':<18} {'by id/s':>10} {'cache hits':>11} {'by name/s':>10} {'cache hits':>11}")
+        for name, (by_id, by_name) in PATHS.items():
+            id_rate, id_hits = bench(engine, stats, by_id, ids)
+            line = f"{name:<18} {id_rate:>10,.0f} {id_hits:>10.0%}"
+            if by_name is not None:
+                name_rate, name_hits = bench(engine, stats, by_name, names)
+                line += f" {name_rate:>10,.0f} {name_hits:>10.0%}"
+            print(line)
+        stats.close()
+        engine.dispose()
@@ -0,0 +1,90 @@
+'''
+Bulk loading of User rows with their Address children.
+
+The naive way, session.add(User(..., addresses=[Address(...)])) for every row, makes the
+ORM build an object per row and track it in the identity map. It also has to flush each
+user before its addresses can be inserted, because the addresses need the user's id.
+That is fine for a handful of rows and far too slow for millions.
+
+load_users() keeps the ORM models for the table definitions and does the inserts itself,
+in Core:
+
+1. The input records are read in chunks (so the input can be a generator over a huge file).
+2. All users of a chunk go into ONE insert() executed with a list of parameter dicts
+   (executemany). SQLAlchemy's "insertmanyvalues" batching turns that into a few
+   INSERT ... VALUES (...), (...), ... RETURNING id statements, so the new ids come back
+   from the same round trip as the insert.
+3. sort_by_parameter_order=True makes the returned ids come back in the same order as the
+   parameter dicts, so zip(records, ids) pairs every record with its user id. That is how
+   the foreign keys are wired up, no flush or SELECT per user.
+4. All addresses of the chunk go into a second executemany insert with those user ids.
+
+Each chunk is its own transaction, so memory use stays flat and a failure only rolls
+back the chunk it happened in.
+'''
+
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import Engine, insert
+
+from orm_models import Address, User
+
+# Rows per transaction, and rows per INSERT statement inside it. 1000 rows x 2 columns
+# stays well below SQLite's limit of 32766 bound parameters per statement.
+CHUNK_SIZE = 10_000
+INSERT_PAGE_SIZE = 1000
+
+
+class UserRecord(NamedTuple):
+    name: str
+    fullname: Optional[str]
+    emails: Sequence[str] = ()
+
+
+def chunked(records: Iterable[UserRecord], size: int) -> Iterator[List[UserRecord]]:
+    records = iter(records)
+    while chunk := list(islice(records, size)):
+        yield chunk
+
+
+insert_users = insert(User).returning(User.id, sort_by_parameter_order=True)
+insert_addresses = insert(Address)
+
+
+def load_users(
+    engine: Engine,
+    records: Iterable[UserRecord],
+    chunk_size: int = CHUNK_SIZE,
+    page_size: int = INSERT_PAGE_SIZE,
+) -> int:
+    """
+    Insert users and their addresses, chunk_size users per transaction.
+
+    Args:
+        engine (Engine): engine of a database with the User and Address tables.
+        records (Iterable[UserRecord]): the users to insert, read lazily.
+        chunk_size (int): users per transaction.
+        page_size (int): rows per INSERT statement (insertmanyvalues_page_size).
+
+    Returns:
+        int: the number of users inserted.
+    """
+    loaded = 0
+    for chunk in chunked(records, chunk_size):
+        with engine.begin() as conn:
+            conn = conn.execution_options(insertmanyvalues_page_size=page_size)
+            user_ids = conn.execute(
+                insert_users,
+                [{"name": record.name, "fullname": record.fullname} for record in chunk],
+            ).scalars().all()
+
+            addresses = [
+                {"user_id": user_id, "email_address": email}
+                for record, user_id in zip(chunk, user_ids)
+                for email in record.emails
+            ]
+            if addresses:
+                conn.execute(insert_addresses, addresses)
+        loaded += len(chunk)
+    return loaded
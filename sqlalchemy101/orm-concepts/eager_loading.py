@@ -0,0 +1,131 @@
+'''
+Eager loading for the User.addresses / Address.user relationships, and an N+1 detector.
+
+Both relationships use the default lazy="select": the related rows are loaded the first
+time the attribute is touched, with one SELECT per object. Looping over 1000 users and
+reading user.addresses therefore runs 1 + 1000 queries, the "N+1 problem".
+
+Eager loading fetches the related rows up front instead. Which loader is best depends on
+how the relationship is used:
+
+- joinedload   adds a LEFT OUTER JOIN to the main query, one query in total. Cheap for a
+               many-to-one (Address.user, one extra column set per row) or for a single
+               parent, but for a collection over many parents every parent row is repeated
+               once per child, so the result set grows with parents x children.
+- selectinload runs a second query, SELECT ... WHERE user_id IN (...), for the whole
+               collection of all loaded parents. Two queries in total, and no duplicated
+               rows, which is best for collections over many parents.
+
+eager_options() makes that choice, and NPlusOneDetector catches the loops that still lazy load.
+'''
+
+import warnings
+from collections import Counter
+from typing import Dict, List, Optional
+
+from sqlalchemy import Select, event, select
+from sqlalchemy.orm import ORMExecuteState, QueryableAttribute, Session, joinedload, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from orm_models import Address, User
+
+# A collection is joined only if at most this many parents are expected, above that
+# the repeated parent rows cost more than selectinload's second query.
+JOINED_COLLECTION_MAX_PARENTS = 1
+
+
+def eager_options(*relationships: QueryableAttribute, expected_parents: Optional[int] = None) -> List[LoaderOption]:
+    """
+    Pick a loader option for each relationship from the expected access pattern.
+
+    Args:
+        relationships (QueryableAttribute): e.g. User.addresses, Address.user.
+        expected_parents (int): how many parent rows the query returns, if known.
+            None means "many".
+
+    Returns:
+        List[LoaderOption]: options for Select.options().
+    """
+    options = []
+    for relationship in relationships:
+        is_collection = relationship.property.uselist
+        few_parents = expected_parents is not None and expected_parents <= JOINED_COLLECTION_MAX_PARENTS
+        if not is_collection or few_parents:
+            options.append(joinedload(relationship))
+        else:
+            options.append(selectinload(relationship))
+    return options
+
+
+def users_with_addresses(*user_ids: int) -> Select:
+    """
+    SELECT users with their addresses loaded, either every user or only the given ids.
+    """
+    query = select(User).order_by(User.id)
+    if user_ids:
+        query = query.where(User.id.in_(user_ids))
+    return query.options(*eager_options(User.addresses, expected_parents=len(user_ids) or None))
+
+
+def addresses_with_user() -> Select:
+    """
+    SELECT addresses with the user of each one loaded.
+    """
+    return select(Address).order_by(Address.id).options(*eager_options(Address.user))
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+class NPlusOneDetector:
+    """
+    Counts the lazy loads a Session runs, per relationship, and warns above a threshold.
+
+    Use one per unit of work, e.g. per web request:
+
+        with Session(engine) as session, NPlusOneDetector(session, threshold=10):
+            ...
+
+    Only loads that actually run SQL are counted: a many-to-one that is found in the
+    session's identity map doesn't query and is fine. Eager loads are not counted either.
+    """
+
+    def __init__(self, session: Session, threshold: int = 10, raise_error: bool = False) -> None:
+        """
+        Args:
+            session (Session): the session to watch.
+            threshold (int): lazy loads of the same relationship allowed before warning.
+            raise_error (bool): raise NPlusOneWarning as an exception instead, e.g. in tests.
+        """
+        self.session = session
+        self.threshold = threshold
+        self.raise_error = raise_error
+        self.lazy_loads: Dict[str, int] = Counter()
+
+    def __enter__(self) -> "NPlusOneDetector":
+        event.listen(self.session, "do_orm_execute", self.on_execute)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.session, "do_orm_execute", self.on_execute)
+
+    def on_execute(self, state: ORMExecuteState) -> None:
+        # lazy_loaded_from is only set for a lazy load, eager loaders leave it None
+        if state.lazy_loaded_from is None:
+            return
+        relationship = str(state.loader_strategy_path[-1])  # e.g. "User.addresses"
+        self.lazy_loads[relationship] += 1
+        # warn once per relationship, when the threshold is crossed
+        if self.lazy_loads[relationship] == self.threshold + 1:
+            message = (
+                f"{relationship} was lazy loaded more than {self.threshold} times, "
+                f"load it eagerly (see eager_options)"
+            )
+            if self.raise_error:
+                raise NPlusOneWarning(message)
+            warnings.warn(message, NPlusOneWarning)
+
+    @property
+    def total(self) -> int:
+        return sum(self.lazy_loads.values())
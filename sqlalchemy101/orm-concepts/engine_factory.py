@@ -0,0 +1,192 @@
+'''
+One place to create tuned SQLite engines, instead of create_engine("sqlite://", echo=True).
+
+What make_engine() changes compared to the defaults:
+
+- echo is off. echo=True logs every statement and its parameters to stdout, which costs
+  more than many of the statements themselves; it's for learning and debugging.
+- The pool is picked for the kind of database:
+  - in-memory ("sqlite://"): StaticPool, ONE connection shared by everyone. Every new
+    connection to ":memory:" would otherwise be a new, empty database. Nothing would stop
+    two threads from interleaving statements on that connection, so the engine is
+    single-threaded: a checkout from any thread but the first one raises (see
+    SingleThreadStaticPool). Use a file database for multi-threaded code.
+  - a file: QueuePool, pool_size connections kept open plus up to max_overflow extra
+    ones under load, so requests don't pay for opening the file every time.
+- Pragmas are set on every new connection (file databases only, except cache_size):
+  - journal_mode=WAL     readers don't block the writer and the writer doesn't block
+                         readers; a commit appends to the log instead of rewriting pages.
+  - synchronous=NORMAL   in WAL mode fsync only at checkpoints, not on every commit.
+                         A power cut can lose the last commits, it can't corrupt the file.
+  - mmap_size            read the file through memory mapping instead of read() calls.
+  - cache_size           page cache per connection, negative means KiB (-65536 = 64 MiB).
+- The time every checkout waits for a pooled connection is recorded (including opening
+  a new one while the pool grows), see pool_wait_stats(). Long waits mean
+  pool_size + max_overflow is too small for the load.
+'''
+
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Union
+
+from sqlalchemy import Engine, create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+
+FILE_PRAGMAS: Dict[str, Union[int, str]] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+}
+MEMORY_PRAGMAS: Dict[str, Union[int, str]] = {
+    "cache_size": -64 * 1024,
+}
+
+
+class PoolWaitStats:
+    """
+    Wait times of pool checkouts. Keeps the last `keep` samples for the percentiles,
+    and a count/total/max over all checkouts.
+    """
+
+    def __init__(self, keep: int = 10_000) -> None:
+        self.lock = threading.Lock()
+        self.samples: Deque[float] = deque(maxlen=keep)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def summary(self) -> Dict[str, float]:
+        with self.lock:
+            samples = list(self.samples)
+            count, total, longest = self.count, self.total, self.max
+        if len(samples) >= 2:
+            cuts = statistics.quantiles(samples, n=100)
+            p50, p99 = cuts[49], cuts[98]
+        else:
+            p50 = p99 = samples[0] if samples else 0.0
+        return {
+            "checkouts": count,
+            "mean_ms": total / count * 1000 if count else 0.0,
+            "p50_ms": p50 * 1000,
+            "p99_ms": p99 * 1000,
+            "max_ms": longest * 1000,
+        }
+
+
+class TimedQueuePool(QueuePool):
+    # _do_get is where QueuePool takes a connection from the queue, waiting up to
+    # pool_timeout when all of them are checked out.
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_stats.record(time.perf_counter() - start)
+
+    def recreate(self) -> "TimedQueuePool":
+        # engine.dispose() swaps in a new pool, keep the numbers collected so far
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+class SingleThreadStaticPool(StaticPool):
+    # The check is in _do_get, so a checkout from another thread fails before it touches
+    # the connection. sqlite3's own check_same_thread would only fail on first use, and
+    # SQLAlchemy then invalidates the connection, i.e. throws the in-memory database away.
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.owner_lock = threading.Lock()
+        self.owner: Optional[int] = None
+
+    def _do_get(self):
+        with self.owner_lock:
+            if self.owner is None:
+                self.owner = threading.get_ident()
+        if self.owner != threading.get_ident():
+            raise exc.InvalidRequestError(
+                "An in-memory engine is single-threaded, use a file database to share it between threads"
+            )
+        return super()._do_get()
+
+
+def is_memory_url(url: str) -> bool:
+    database = make_url(url).database
+    return database in (None, "", ":memory:")
+
+
+def make_engine(
+    url: str = "sqlite://",
+    echo: bool = False,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_timeout: float = 30.0,
+    pragmas: Optional[Dict[str, Union[int, str]]] = None,
+) -> Engine:
+    """
+    Create a SQLite engine with a pool and pragmas suited to the database.
+
+    Args:
+        url (str): a sqlite URL, "sqlite://" for an in-memory database (single-threaded).
+        echo (bool): log every statement, for debugging only.
+        pool_size (int): connections kept open (file databases).
+        max_overflow (int): extra connections allowed under load (file databases).
+        pool_timeout (float): seconds a checkout may wait for a free connection.
+        pragmas (Dict[str, Union[int, str]]): replaces FILE_PRAGMAS / MEMORY_PRAGMAS.
+
+    Returns:
+        Engine: the engine. pool_wait_stats(engine) reports the checkout wait times.
+    """
+    if is_memory_url(url):
+        engine = create_engine(
+            url,
+            echo=echo,
+            poolclass=SingleThreadStaticPool,
+            # the pool checks the thread on checkout; sqlite3 must not check it again when
+            # a connection dropped in another thread is rolled back there by the GC
+            connect_args={"check_same_thread": False},
+        )
+        pragmas = MEMORY_PRAGMAS if pragmas is None else pragmas
+    else:
+        engine = create_engine(
+            url,
+            echo=echo,
+            poolclass=TimedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+        )
+        pragmas = FILE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+
+def pool_wait_stats(engine: Engine) -> Optional[Dict[str, float]]:
+    """
+    Checkout wait times of an engine made by make_engine, None for an in-memory engine
+    (it has one connection and never waits in the pool).
+    """
+    stats = getattr(engine.pool, "wait_stats", None)
+    return stats.summary() if stats is not None else None
@@ -0,0 +1,256 @@
+'''
+Read-through second-level cache for the User and Address entities, keyed by primary key.
+
+The session's identity map already avoids querying the same row twice, but only within
+that one session; the next request's session starts empty and queries again. The
+EntityCache sits behind the identity map and is shared by all sessions:
+
+    session identity map  ->  EntityCache backend  ->  database
+
+What is cached is the row's column values as a plain dict, not the ORM object: an
+object belongs to one session. On a hit the values are turned back into a persistent
+object in the asking session (make_transient_to_detached + merge(load=False), which does
+not query). Relationships are not cached, user.addresses still loads as usual.
+
+Invalidation is done with session events, so no code that writes has to remember it:
+
+- after_flush     every flushed new/changed/deleted User or Address is dropped from the
+                  cache right away, and remembered as written by the session's transaction.
+- do_orm_execute  an ORM-enabled bulk UPDATE / DELETE (session.execute(update(User)...))
+                  can touch any row, so it clears the whole cache, and marks the
+                  transaction as having run one.
+- after_commit    the written keys are dropped again, or after a bulk statement the whole
+                  cache is cleared again: between the write and the commit another
+                  session may have read and cached the old, still committed row.
+- after_transaction_end   the marks are forgotten, whether the transaction committed,
+                  rolled back, or the session was just closed.
+
+The cache only ever holds committed values: a session whose transaction has written
+(flushed, or ran a bulk statement) or has unflushed changes doesn't fill it, since what it
+reads may still be rolled back, and it doesn't take the rows it wrote from the cache either.
+
+Writes that bypass the Session (raw Core on a connection, other processes) are not
+seen, the TTL bounds how long such a change can stay invisible.
+
+The backend is pluggable: anything implementing CacheBackend works, e.g. one backed by
+Redis or memcached so that several processes share the cache. LocalLRUCache is the
+in-process one.
+'''
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple, Type
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import ORMExecuteState, Session, make_transient_to_detached
+
+from orm_models import Address, User
+
+CacheKey = Tuple[str, Hashable]
+
+# session.info keys: the cache keys written in the session's current transaction, and
+# whether that transaction ran a bulk UPDATE / DELETE
+WRITTEN = "entity_cache_written"
+BULK_WRITE = "entity_cache_bulk_write"
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached column values, or None on a miss (or if they expired).
+        """
+
+    @abstractmethod
+    def set(self, key: CacheKey, values: Dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, key: CacheKey) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        pass
+
+
+class LocalLRUCache(CacheBackend):
+    """
+    In-process LRU cache with a TTL, safe to share between threads.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300) -> None:
+        """
+        Args:
+            maxsize (int): entries kept, the least recently used one is evicted beyond that.
+            ttl (float): seconds an entry stays valid.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: "OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, values = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return values
+
+    def set(self, key: CacheKey, values: Dict[str, Any]) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, values)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: CacheKey) -> None:
+        with self.lock:
+            if self.entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class EntityCache:
+    """
+    Usage:
+
+        cache = EntityCache(LocalLRUCache(maxsize=10_000, ttl=60))
+        cache.attach(Session)   # or a sessionmaker, or one session
+
+        with Session(engine) as session:
+            user = cache.get(session, User, 42)
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, classes: Tuple[Type, ...] = (User, Address)) -> None:
+        self.backend = backend if backend is not None else LocalLRUCache()
+        self.classes = classes
+
+    def key(self, cls: Type, pk: Hashable) -> CacheKey:
+        return (cls.__name__, pk)
+
+    def get(self, session: Session, cls: Type, pk: Hashable):
+        """
+        Get the cls object with primary key pk, from the session, the cache or the
+        database, in that order. Returns None if there's no such row.
+        """
+        identity_key = session.identity_key(cls, pk)
+        obj = session.identity_map.get(identity_key)
+        if obj is not None:
+            return obj
+
+        key = self.key(cls, pk)
+        # rows this transaction wrote (or may have written) are read from the database,
+        # which has the uncommitted version, never from the cache
+        written = session.info.get(BULK_WRITE) or key in session.info.get(WRITTEN, ())
+        if not written:
+            values = self.backend.get(key)
+            if values is not None:
+                obj = cls(**values)
+                make_transient_to_detached(obj)  # as if it had been loaded by a query
+                return session.merge(obj, load=False)
+
+        obj = session.get(cls, pk)
+        if obj is not None and self.reads_committed(session):
+            self.backend.set(key, self.column_values(obj))
+        return obj
+
+    def reads_committed(self, session: Session) -> bool:
+        # False if the session's transaction has written anything, flushed or not: what it
+        # reads may never be committed, so it must not end up in the shared cache
+        return not (
+            session.info.get(WRITTEN)
+            or session.info.get(BULK_WRITE)
+            or session.new
+            or session.dirty
+            or session.deleted
+        )
+
+    def column_values(self, obj) -> Dict[str, Any]:
+        return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+    def stats(self) -> Dict[str, int]:
+        return self.backend.stats()
+
+    # ------------------------ Invalidation ------------------------
+    def attach(self, target) -> None:
+        """
+        Listen to the events of target: the Session class, a sessionmaker or one session.
+        """
+        event.listen(target, "after_flush", self.after_flush)
+        event.listen(target, "after_commit", self.after_commit)
+        event.listen(target, "after_transaction_end", self.after_transaction_end)
+        event.listen(target, "do_orm_execute", self.on_execute)
+
+    def detach(self, target) -> None:
+        event.remove(target, "after_flush", self.after_flush)
+        event.remove(target, "after_commit", self.after_commit)
+        event.remove(target, "after_transaction_end", self.after_transaction_end)
+        event.remove(target, "do_orm_execute", self.on_execute)
+
+    def after_flush(self, session: Session, flush_context) -> None:
+        # new, dirty and deleted still hold the pre-flush state here
+        keys = set()
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, self.classes):
+                identity = inspect(obj).identity
+                if identity is not None:
+                    keys.add(self.key(type(obj), identity[0] if len(identity) == 1 else identity))
+        for key in keys:
+            self.backend.delete(key)
+        session.info.setdefault(WRITTEN, set()).update(keys)
+
+    def after_commit(self, session: Session) -> None:
+        if session.info.get(BULK_WRITE):
+            self.backend.clear()
+            return
+        for key in session.info.get(WRITTEN, ()):
+            self.backend.delete(key)
+
+    def after_transaction_end(self, session: Session, transaction) -> None:
+        # only the outermost transaction, a savepoint ending doesn't end the writes
+        if transaction.parent is None:
+            session.info.pop(WRITTEN, None)
+            session.info.pop(BULK_WRITE, None)
+
+    def on_execute(self, state: ORMExecuteState) -> None:
+        if (state.is_update or state.is_delete) and self.touches_cached_class(state):
+            self.backend.clear()
+            state.session.info[BULK_WRITE] = True
+
+    def touches_cached_class(self, state: ORMExecuteState) -> bool:
+        mapper = state.bind_mapper
+        return mapper is None or issubclass(mapper.class_, self.classes)
+
@@ -0,0 +1,94 @@
+'''
+Streaming export of the user_account and address tables to CSV or NDJSON.
+
+session.scalars(select(User)).all() builds a User object for every row, registers each
+one in the session's identity map and keeps them all in memory until the end; for a big
+table that's gigabytes before the first line is written.
+
+The export here avoids all three:
+
+- It selects columns (select(User.id, User.name, ...)) rather than entities, so the
+  rows come back as light Row tuples. No ORM objects, no identity map.
+- yield_per=n on the connection (which also turns on stream_results, a server-side
+  cursor where the driver supports it) makes the result fetch n rows at a time from the
+  cursor instead of all rows up front.
+- result.partitions() hands those rows over one batch at a time, and every batch is
+  written out before the next one is fetched.
+
+So at most chunk_size rows are in memory at once, whatever the size of the table.
+'''
+
+import csv
+import json
+from typing import IO, Iterator, List, Sequence
+
+from sqlalchemy import Engine, Row, Select, select
+
+from orm_models import Address, User
+
+CHUNK_SIZE = 5_000
+
+users_export = select(User.id, User.name, User.fullname).order_by(User.id)
+addresses_export = select(Address.id, Address.user_id, Address.email_address).order_by(Address.id)
+# one row per address, with the user's columns repeated
+users_with_addresses_export = (
+    select(User.id.label("user_id"), User.name, User.fullname, Address.email_address)
+    .join(Address, Address.user_id == User.id)
+    .order_by(User.id, Address.id)
+)
+
+
+def stream_partitions(engine: Engine, query: Select, chunk_size: int = CHUNK_SIZE) -> Iterator[Sequence[Row]]:
+    """
+    Run query and yield its rows in lists of at most chunk_size rows.
+
+    The first partition is the column names (as a list of str), so writers don't need a
+    second query to get them.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=chunk_size).execute(query)
+        yield list(result.keys())
+        yield from result.partitions()
+
+
+def export_csv(engine: Engine, query: Select, file: IO[str], chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Write the rows of query to file as CSV with a header line.
+
+    Args:
+        engine (Engine): the database.
+        query (Select): a select of columns, e.g. users_export.
+        file (IO[str]): opened with newline="", as the csv module wants.
+        chunk_size (int): rows fetched and written at a time.
+
+    Returns:
+        int: the number of rows written.
+    """
+    writer = csv.writer(file)
+    partitions = stream_partitions(engine, query, chunk_size)
+    writer.writerow(next(partitions))
+    written = 0
+    for partition in partitions:
+        writer.writerows(partition)
+        written += len(partition)
+    return written
+
+
+def export_ndjson(engine: Engine, query: Select, file: IO[str], chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Write the rows of query to file as NDJSON, one object per line.
+
+    Args are the same as export_csv.
+
+    Returns:
+        int: the number of rows written.
+    """
+    partitions = stream_partitions(engine, query, chunk_size)
+    keys: List[str] = next(partitions)
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    written = 0
+    for partition in partitions:
+        # one write per partition instead of one per row
+        file.write("".join(dumps(dict(zip(keys, row))) + "\n" for row in partition))
+        written += len(partition)
+    return written
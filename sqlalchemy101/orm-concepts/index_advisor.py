@@ -0,0 +1,238 @@
+'''
+Index advisor: finds the queries of a workload that scan a whole table, and the index
+that would fix each one.
+
+1. WorkloadRecorder records every distinct SELECT/UPDATE/DELETE an engine runs, with the
+   parameters of its first run and the SQLAlchemy statement it was compiled from.
+2. advise() runs EXPLAIN QUERY PLAN for each of them. In SQLite's plan:
+   - "SEARCH address USING INDEX ix_... (user_id=?)"  the index is used, fine
+   - "SCAN address"                                   every row of the table is read
+   - "USE TEMP B-TREE FOR ORDER BY"                   the rows are sorted after reading
+   For a SCAN, the columns of the scanned table that the statement filters on (WHERE and
+   JOIN ... ON) become the suggested index, equality comparisons first, then ranges.
+   A SCAN with no filter on the table (an export, a count) is reported but can't be fixed
+   by an index.
+3. missing_indexes() compares the indexes declared on the models with the ones in the
+   database. create_all() doesn't add indexes to tables that already exist, so a database
+   created before an index was declared doesn't have it until it is migrated.
+
+Run it from inside the orm-concepts folder to see a report on a sample workload, first
+against tables without the indexes and then after create_missing_indexes() added them:
+
+    python index_advisor.py
+'''
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Engine, MetaData, event, inspect
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, ClauseElement
+from sqlalchemy.sql.schema import Column
+
+SCAN = re.compile(r"^SCAN (\w+)(?: AS (\w+))?(?: USING (COVERING )?INDEX (\w+))?")
+EQUALITY = {operators.eq, operators.in_op}
+RANGE = {operators.lt, operators.le, operators.gt, operators.ge, operators.between_op}
+
+
+@dataclass
+class RecordedQuery:
+    sql: str
+    parameters: Any
+    statement: Optional[ClauseElement]
+    count: int = 1
+
+
+class WorkloadRecorder:
+    """
+    Records the distinct queries run on an engine while the recorder is active:
+
+        with WorkloadRecorder(engine) as workload:
+            ...run the application code...
+        print(format_report(advise(engine, workload.queries)))
+    """
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        self.queries: Dict[str, RecordedQuery] = {}
+
+    def __enter__(self) -> "WorkloadRecorder":
+        event.listen(self.engine, "before_cursor_execute", self.on_execute)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.engine, "before_cursor_execute", self.on_execute)
+
+    def on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            return
+        recorded = self.queries.get(statement)
+        if recorded is not None:
+            recorded.count += 1
+            return
+        compiled = context.compiled if context is not None else None
+        element = None
+        if compiled is not None:
+            # For an ORM select the Core statement (with the relationship joins spelled
+            # out as JOIN ... ON) only exists in the compile state.
+            compile_state = getattr(compiled, "compile_state", None)
+            element = getattr(compile_state, "statement", None)
+            if element is None:
+                element = compiled.statement
+        self.queries[statement] = RecordedQuery(
+            sql=statement,
+            parameters=parameters[0] if executemany else parameters,
+            statement=element,
+        )
+
+
+@dataclass
+class Finding:
+    sql: str
+    count: int
+    plan: List[str]
+    scans: List[str] = field(default_factory=list)
+    suggestions: List[str] = field(default_factory=list)
+    temp_sort: bool = False
+
+
+def filter_columns(statement: Optional[ClauseElement]) -> Dict[str, List[Tuple[int, str]]]:
+    """
+    The columns each table is filtered on, as (rank, column) pairs: rank 0 for equality
+    comparisons, 1 for ranges, 2 for anything else (LIKE, IS NULL, ...).
+    """
+    columns: Dict[str, List[Tuple[int, str]]] = {}
+    if statement is None:
+        return columns
+    for element in visitors.iterate(statement):
+        if not isinstance(element, BinaryExpression):
+            continue
+        rank = 0 if element.operator in EQUALITY else 1 if element.operator in RANGE else 2
+        for side in (element.left, element.right):
+            if isinstance(side, Column) and side.table is not None:
+                entry = (rank, side.name)
+                if entry not in columns.setdefault(side.table.name, []):
+                    columns[side.table.name].append(entry)
+    return columns
+
+
+def suggest_index(table: str, columns: List[Tuple[int, str]]) -> Optional[str]:
+    ordered = []
+    for _, name in sorted(columns):
+        if name not in ordered:
+            ordered.append(name)
+    if not ordered:
+        return None
+    return f"CREATE INDEX ix_{table}_{'_'.join(ordered)} ON {table} ({', '.join(ordered)})"
+
+
+def advise(engine: Engine, queries: Dict[str, RecordedQuery]) -> List[Finding]:
+    """
+    EXPLAIN QUERY PLAN every recorded query and return the ones that scan or sort.
+    """
+    findings = []
+    with engine.connect() as conn:
+        for query in queries.values():
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {query.sql}", query.parameters).all()
+            plan = [row[3] for row in rows]
+            finding = Finding(sql=query.sql, count=query.count, plan=plan)
+            filters = filter_columns(query.statement)
+            for detail in plan:
+                if detail.startswith("USE TEMP B-TREE"):
+                    finding.temp_sort = True
+                match = SCAN.match(detail)
+                if match is None:
+                    continue
+                table = match.group(1)
+                finding.scans.append(detail)
+                suggestion = suggest_index(table, filters.get(table, []))
+                if suggestion is not None and suggestion not in finding.suggestions:
+                    finding.suggestions.append(suggestion)
+            if finding.scans or finding.temp_sort:
+                findings.append(finding)
+    return findings
+
+
+def missing_indexes(engine: Engine, metadata: MetaData) -> List[str]:
+    """
+    Names of the indexes declared in metadata that the database doesn't have.
+    """
+    inspector = inspect(engine)
+    missing = []
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        missing.extend(index.name for index in table.indexes if index.name not in existing)
+    return missing
+
+
+def create_missing_indexes(engine: Engine, metadata: MetaData) -> List[str]:
+    """
+    Create the declared indexes the database doesn't have yet, returns their names.
+    """
+    missing = set(missing_indexes(engine, metadata))
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in missing:
+                # missing_indexes() already asked the database, no checkfirst needed
+                index.create(engine)
+    return sorted(missing)
+
+
+def format_report(findings: List[Finding]) -> str:
+    if not findings:
+        return "no full table scans or temporary sorts in the workload\n"
+    lines = []
+    for finding in sorted(findings, key=lambda f: -f.count):
+        lines.append(f"-- run {finding.count}x: {' '.join(finding.sql.split())}")
+        lines.extend(f"     plan: {detail}" for detail in finding.plan)
+        if finding.suggestions:
+            lines.extend(f"     fix:  {suggestion}" for suggestion in finding.suggestions)
+        elif finding.scans:
+            lines.append("     fix:  none, the statement doesn't filter the scanned table")
+        lines.append("")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from sqlalchemy import select
+    from sqlalchemy.orm import Session
+
+    from bulk_load import UserRecord, load_users
+    from engine_factory import make_engine
+    from orm_models import Address, Base, User
+    from repository import UserRepository
+
+    def sample_workload(engine):
+        with Session(engine) as session:
+            repository = UserRepository(session)
+            for user_id in (1, 2, 3):
+                repository.by_id(user_id)
+                repository.addresses_of(user_id)
+                repository.address_rows_of(user_id)
+            repository.by_name("user7")
+            repository.rows_by_name("user8")
+            # lazy loads of User.addresses
+            for user in session.scalars(select(User).where(User.id < 5)):
+                user.addresses
+            session.execute(select(Address).join(User).where(User.name == "user3")).all()
+
+    engine = make_engine()
+    Base.metadata.create_all(engine)
+    # a database from before the indexes were declared
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.drop(engine)
+    load_users(engine, (UserRecord(f"user{i}", None, [f"user{i}@example.com"]) for i in range(100)))
+    print("=== without the declared indexes, missing:", missing_indexes(engine, Base.metadata))
+    with WorkloadRecorder(engine) as workload:
+        sample_workload(engine)
+    print(format_report(advise(engine, workload.queries)))
+
+    print("=== after create_missing_indexes(), created:", create_missing_indexes(engine, Base.metadata))
+    with WorkloadRecorder(engine) as workload:
+        sample_workload(engine)
+    print(format_report(advise(engine, workload.queries)))
+    engine.dispose()
@@ -0,0 +1,26 @@
+'''
+The User and Address models of the tutorial, for the other scripts of this folder to import.
+
+They are declared, and explained, in 01-declaring-models.py. A file name starting with a
+digit or containing "-" can't be imported with an import statement, so this module loads
+that file by its path and hands out its classes: there is one definition, and every script
+works on the same tables and indexes.
+
+    from orm_models import Address, Base, User
+'''
+
+import importlib.util
+import os
+import sys
+
+_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "01-declaring-models.py")
+_spec = importlib.util.spec_from_file_location("declaring_models", _PATH)
+_module = importlib.util.module_from_spec(_spec)
+# registered before it runs: the declarative mapping resolves the Mapped["Address"] style
+# annotations through the module the classes are defined in
+sys.modules[_spec.name] = _module
+_spec.loader.exec_module(_module)
+
+Base = _module.Base
+User = _module.User
+Address = _module.Address
@@ -0,0 +1,131 @@
+'''
+Repository for the User/Address models, built for hot lookups.
+
+A lookup written inline, session.scalars(select(User).where(User.id == user_id)), does
+a lot of work before any SQL is sent:
+
+1. select(...).where(...) builds a new statement object, and the value is baked into it.
+2. SQLAlchemy computes the statement's cache key, to find its compiled SQL string in
+   the engine's compiled cache (a miss means compiling it, the expensive part).
+3. The ORM sets up the load of User objects: identity map lookups, object creation,
+   attribute state for every row.
+
+The repository cuts down each step:
+
+1. Every statement is built once, at import time, with bindparam() placeholders; a
+   lookup only passes the parameter values. The statement object, and with it its cache
+   key, is the same on every call.
+2. CompiledCacheStats reports how many executions found their SQL in the compiled cache.
+   With prebuilt statements that rate should be ~100% after the first call of each query.
+3. The *_row methods are a Core fast path: they select table columns on the session's
+   connection, skipping the ORM entirely, and return plain named tuples. Use them when
+   the caller only reads the values and doesn't need to change and flush the objects.
+'''
+
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import Engine, bindparam, event, select
+from sqlalchemy.engine.interfaces import CacheStats
+from sqlalchemy.orm import Session
+
+from orm_models import Address, User
+
+user_table = User.__table__
+address_table = Address.__table__
+
+
+class UserRow(NamedTuple):
+    id: int
+    name: str
+    fullname: Optional[str]
+
+
+class AddressRow(NamedTuple):
+    id: int
+    user_id: int
+    email_address: str
+
+
+# ORM statements, return User / Address objects
+user_by_id = select(User).where(User.id == bindparam("user_id"))
+users_by_name = select(User).where(User.name == bindparam("name")).order_by(User.id)
+addresses_by_user = select(Address).where(Address.user_id == bindparam("user_id")).order_by(Address.id)
+
+# Core statements on the tables, return rows
+user_row_by_id = select(user_table.c.id, user_table.c.name, user_table.c.fullname).where(
+    user_table.c.id == bindparam("user_id")
+)
+user_rows_by_name = (
+    select(user_table.c.id, user_table.c.name, user_table.c.fullname)
+    .where(user_table.c.name == bindparam("name"))
+    .order_by(user_table.c.id)
+)
+address_rows_by_user = (
+    select(address_table.c.id, address_table.c.user_id, address_table.c.email_address)
+    .where(address_table.c.user_id == bindparam("user_id"))
+    .order_by(address_table.c.id)
+)
+
+
+class UserRepository:
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    # ------------------------ ORM ------------------------
+    def get(self, user_id: int) -> Optional[User]:
+        # session.get checks the identity map first and only queries on a miss
+        return self.session.get(User, user_id)
+
+    def by_id(self, user_id: int) -> Optional[User]:
+        return self.session.scalars(user_by_id, {"user_id": user_id}).one_or_none()
+
+    def by_name(self, name: str) -> List[User]:
+        return list(self.session.scalars(users_by_name, {"name": name}))
+
+    def addresses_of(self, user_id: int) -> List[Address]:
+        return list(self.session.scalars(addresses_by_user, {"user_id": user_id}))
+
+    # ------------------------ Core Fast Path ------------------------
+    def row_by_id(self, user_id: int) -> Optional[UserRow]:
+        row = self.session.connection().execute(user_row_by_id, {"user_id": user_id}).first()
+        return UserRow._make(row) if row is not None else None
+
+    def rows_by_name(self, name: str) -> List[UserRow]:
+        result = self.session.connection().execute(user_rows_by_name, {"name": name})
+        return [UserRow._make(row) for row in result]
+
+    def address_rows_of(self, user_id: int) -> List[AddressRow]:
+        result = self.session.connection().execute(address_rows_by_user, {"user_id": user_id})
+        return [AddressRow._make(row) for row in result]
+
+
+class CompiledCacheStats:
+    """
+    Counts how every statement on an engine got its compiled SQL:
+    CACHE_HIT, CACHE_MISS (compiled now), CACHING_DISABLED, NO_CACHE_KEY, ...
+
+        stats = CompiledCacheStats(engine)
+        ...
+        stats.hit_rate
+    """
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        self.counts: Dict[str, int] = Counter()
+        event.listen(engine, "after_cursor_execute", self.on_execute)
+
+    def on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None and context.compiled is not None:  # raw SQL strings aren't compiled
+            self.counts[context.cache_hit.name] += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = sum(self.counts.values())
+        return self.counts[CacheStats.CACHE_HIT.name] / total if total else 0.0
+
+    def reset(self) -> None:
+        self.counts.clear()
+
+    def close(self) -> None:
+        event.remove(self.engine, "after_cursor_execute", self.on_execute)
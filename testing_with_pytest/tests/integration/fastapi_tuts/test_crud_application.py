@@ -0,0 +1,79 @@
+import importlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+# The app module's name starts with a digit, so it can't be imported with an import statement.
+# Its store and response cache live as long as the module, so every test uses its own item ids.
+crud_application = importlib.import_module("03_crud_application")
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(crud_application.app) as client:
+        yield client
+
+
+class TestDuplicateIds:
+    def test_create_duplicate_is_400(self, client):
+        assert client.post("/items/100", json={"name": "a", "price": 1}).status_code == 201
+        assert client.post("/items/100", json={"name": "b", "price": 2}).status_code == 400
+        assert client.get("/items/100").json() == {"name": "a", "price": 1}
+
+    def test_bulk_create_duplicate_statuses(self, client):
+        client.post("/items/110", json={"name": "a", "price": 1})
+        items = [{"item_id": 110, "name": "b", "price": 2}, {"item_id": 111, "name": "c", "price": 3}]
+
+        response = client.post("/items/bulk", json=items)
+        assert response.status_code == 200
+        assert response.json() == {"committed": True, "statuses": [400, 201]}
+
+    def test_bulk_create_all_or_nothing_is_409(self, client):
+        client.post("/items/120", json={"name": "a", "price": 1})
+        items = [{"item_id": 121, "name": "b", "price": 2}, {"item_id": 120, "name": "c", "price": 3}]
+
+        response = client.post("/items/bulk?all_or_nothing=true", json=items)
+        assert response.status_code == 409
+        assert response.json() == {"committed": False, "statuses": [201, 400]}
+        assert client.get("/items/121").status_code == 404
+
+
+class TestResponseCache:
+    def test_put_invalidates_the_cached_item(self, client):
+        client.post("/items/200", json={"name": "old", "price": 1})
+        first = client.get("/items/200")
+        assert first.json()["name"] == "old"
+        # clients have to revalidate, they may not reuse it on their own
+        assert first.headers["Cache-Control"] == "no-cache"
+
+        assert client.put("/items/200", json={"name": "new", "price": 2}).status_code == 200
+        second = client.get("/items/200", headers={"If-None-Match": first.headers["ETag"]})
+        assert second.status_code == 200
+        assert second.json() == {"name": "new", "price": 2}
+        assert second.headers["ETag"] != first.headers["ETag"]
+
+    def test_unchanged_item_is_304(self, client):
+        client.post("/items/210", json={"name": "a", "price": 1})
+        etag = client.get("/items/210").headers["ETag"]
+
+        response = client.get("/items/210", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_delete_invalidates_the_cached_item(self, client):
+        client.post("/items/220", json={"name": "a", "price": 1})
+        client.get("/items/220")
+
+        assert client.delete("/items/220").status_code == 204
+        assert client.get("/items/220").status_code == 404
+
+
+class TestPrices:
+    # Python's json accepts these, the Item model doesn't
+    @pytest.mark.parametrize("price", ["NaN", "Infinity", "-Infinity"])
+    def test_non_finite_price_is_422(self, client, price: str):
+        body = '{"name": "a", "price": %s}' % price
+        response = client.post("/items/300", content=body, headers={"Content-Type": "application/json"})
+        assert response.status_code == 422
+        assert client.get("/items/300").status_code == 404
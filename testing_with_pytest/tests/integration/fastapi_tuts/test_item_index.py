@@ -0,0 +1,33 @@
+import pytest
+from item_index import ItemIndex
+from models import Item
+
+
+@pytest.fixture
+def index():
+    items = {1: Item(name="apple", price=2), 2: Item(name="apricot", price=2), 3: Item(name="banana", price=1)}
+    index = ItemIndex(items)
+    for item_id, item in items.items():
+        index.add(item_id, item)
+    return index
+
+
+class TestRemove:
+    def test_remove_only_drops_that_item(self, index):
+        index.remove(1, index.items.pop(1))
+
+        assert index.by_price == [(1, 3), (2, 2)]
+        assert index.by_name == [("apricot", 2), ("banana", 3)]
+
+    def test_remove_missing_pair_raises(self, index):
+        # an item the index doesn't hold must not take its neighbour with it
+        with pytest.raises(ValueError):
+            index.remove(4, Item(name="apple", price=2))
+        assert len(index.by_price) == len(index.by_name) == 3
+
+
+class TestSearch:
+    def test_name_prefix_and_price_range(self, index):
+        assert index.search(name_prefix="ap") == [1, 2]
+        assert index.search(max_price=1) == [3]
+        assert index.search(descending=True, limit=1) == [2]
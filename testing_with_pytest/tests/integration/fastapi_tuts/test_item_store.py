@@ -0,0 +1,124 @@
+import threading
+
+import pytest
+from models import Item
+from storage import InMemoryItemStore, SQLiteItemStore
+
+THREADS = 8
+INCREMENTS = 25
+
+
+# Every test runs against each backend: the in-memory dict, SQLite in memory (one shared
+# connection) and a SQLite file (a pool of connections)
+@pytest.fixture(params=["memory", "sqlite-memory", "sqlite-file"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = InMemoryItemStore()
+    elif request.param == "sqlite-memory":
+        store = SQLiteItemStore("sqlite://")
+    else:
+        store = SQLiteItemStore(f"sqlite:///{tmp_path / 'items.db'}")
+    yield store
+    store.close()
+
+
+def run_threads(target, count=THREADS):
+    # start them all at once, so they really overlap
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(n):
+        barrier.wait()
+        results[n] = target(n)
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestConcurrentWrites:
+    def test_compare_and_set_loses_no_update(self, store):
+        store.create(1, Item(name="counter", price=0))
+
+        # the read-modify-write loop compare_and_set is made for: retry until nobody
+        # changed the item between the read and the write
+        def increment(_):
+            for _ in range(INCREMENTS):
+                while True:
+                    current = store.get(1)
+                    if store.compare_and_set(1, current, Item(name="counter", price=current.price + 1)):
+                        break
+
+        run_threads(increment)
+        assert store.get(1).price == THREADS * INCREMENTS
+
+    def test_compare_and_set_only_one_winner(self, store):
+        store.create(1, Item(name="old", price=1))
+        old = store.get(1)
+
+        results = run_threads(lambda n: store.compare_and_set(1, old, Item(name=f"new-{n}", price=2)))
+        assert results.count(True) == 1
+        assert store.get(1).name == f"new-{results.index(True)}"
+
+    def test_concurrent_updates_all_succeed(self, store):
+        store.create(1, Item(name="old", price=1))
+
+        results = run_threads(lambda n: store.update(1, Item(name=f"new-{n}", price=n)))
+        assert results == [True] * THREADS
+        # the last writer wins, whoever that was, but it is one whole item
+        item = store.get(1)
+        assert item.name == f"new-{int(item.price)}"
+
+
+class TestDuplicateIds:
+    def test_concurrent_duplicate_create(self, store):
+        # one create wins, the others get False and not an IntegrityError
+        results = run_threads(lambda n: store.create(7, Item(name=f"item-{n}", price=n)))
+        assert results.count(True) == 1
+
+    def test_bulk_create_reports_duplicates(self, store):
+        store.create(1, Item(name="existing", price=1))
+        items = [(1, Item(name="a", price=1)), (2, Item(name="b", price=2)), (2, Item(name="c", price=3))]
+
+        assert store.bulk_create(items) == [False, True, False]
+        assert store.get(2).name == "b"
+
+    def test_bulk_create_all_or_nothing(self, store):
+        store.create(1, Item(name="existing", price=1))
+        items = [(2, Item(name="b", price=2)), (1, Item(name="a", price=1))]
+
+        assert store.bulk_create(items, all_or_nothing=True) == [True, False]
+        assert store.get(2) is None
+
+
+class TestBulkWrites:
+    def test_bulk_update_statuses(self, store):
+        store.create(1, Item(name="old", price=1))
+        items = [(1, Item(name="new", price=2)), (2, Item(name="missing", price=3))]
+
+        assert store.bulk_update(items) == [True, False]
+        assert store.get(1).name == "new"
+        assert store.get(2) is None
+
+    def test_bulk_update_all_or_nothing(self, store):
+        store.create(1, Item(name="old", price=1))
+        items = [(1, Item(name="new", price=2)), (2, Item(name="missing", price=3))]
+
+        assert store.bulk_update(items, all_or_nothing=True) == [True, False]
+        assert store.get(1).name == "old"
+
+    def test_bulk_delete_statuses(self, store):
+        store.create(1, Item(name="a", price=1))
+
+        # the second 1 is already gone by the time it comes up
+        assert store.bulk_delete([1, 1, 2]) == [True, False, False]
+        assert store.get(1) is None
+
+    def test_bulk_delete_all_or_nothing(self, store):
+        store.create(1, Item(name="a", price=1))
+
+        assert store.bulk_delete([1, 2], all_or_nothing=True) == [True, False]
+        assert store.get(1) is not None
@@ -0,0 +1,64 @@
+import base64
+import json
+
+import pytest
+from posts import InvalidCursor, PostStore, decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def store():
+    store = PostStore("sqlite://")
+    yield store
+    store.close()
+
+
+def raw_cursor(data) -> str:
+    # a cursor built by hand, the way a client could tamper with one
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+class TestCursor:
+    @pytest.mark.parametrize("user_id, last_id", [(1, 0), (1, 42), (7, 2**40)])
+    def test_round_trip(self, user_id: int, last_id: int):
+        assert decode_cursor(encode_cursor(user_id, last_id), user_id) == last_id
+
+    def test_other_users_cursor(self):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(encode_cursor(1, 42), 2)
+
+    # a bool would pass as an int, and True == 1
+    @pytest.mark.parametrize("data", [
+        {"u": 1, "a": True},
+        {"u": True, "a": 5},
+        {"u": 1, "a": 4.5},
+        {"u": 1, "a": "5"},
+        {"u": 1},
+    ])
+    def test_tampered_cursor(self, data):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(raw_cursor(data), 1)
+
+    @pytest.mark.parametrize("cursor", ["", "not base64!", raw_cursor([1, 2])])
+    def test_malformed_cursor(self, cursor: str):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor, 1)
+
+
+class TestPages:
+    def test_pages_follow_the_cursor(self, store):
+        store.add_posts([(1, f"post {n}") for n in range(25)] + [(2, "someone else's")])
+
+        titles, after_id = [], 0
+        while True:
+            posts, next_after = store.page_after(1, after_id, 10)
+            titles.extend(post["title"] for post in posts)
+            if next_after is None:
+                break
+            # what the client sends back, decoded again
+            after_id = decode_cursor(encode_cursor(1, next_after), 1)
+        assert titles == [f"post {n}" for n in range(25)]
+
+    def test_iter_after_reads_every_page(self, store):
+        store.add_posts([(1, f"post {n}") for n in range(25)])
+
+        assert [post["title"] for post in store.iter_after(1, 0, 10)] == [f"post {n}" for n in range(25)]
@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+from engine_factory import make_engine, pool_wait_stats
+from sqlalchemy import exc, text
+
+
+@pytest.fixture
+def memory_engine():
+    engine = make_engine()
+    yield engine
+    engine.dispose()
+
+
+class TestMemoryEngine:
+    def test_other_thread_is_refused(self, memory_engine):
+        with memory_engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (x INTEGER)"))
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+
+        errors = []
+
+        def other_thread():
+            try:
+                with memory_engine.connect():
+                    pass
+            except exc.InvalidRequestError as error:
+                errors.append(error)
+
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        assert len(errors) == 1
+
+        # and the refused checkout didn't cost the owner its database
+        with memory_engine.connect() as conn:
+            assert conn.execute(text("SELECT x FROM t")).scalars().all() == [1]
+
+    def test_no_wait_stats(self, memory_engine):
+        assert pool_wait_stats(memory_engine) is None
+
+
+class TestFileEngine:
+    def test_threads_share_the_pool(self, tmp_path):
+        engine = make_engine(f"sqlite:///{tmp_path / 'test.db'}")
+        results = []
+
+        def read():
+            with engine.connect() as conn:
+                results.append(conn.execute(text("SELECT 1")).scalar())
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [1] * 4
+        assert pool_wait_stats(engine)["checkouts"] >= 4
+        engine.dispose()
@@ -0,0 +1,72 @@
+import pytest
+from entity_cache import EntityCache
+from orm_models import Base, User
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+
+# A database file, so that every session has a connection of its own and one session's
+# uncommitted writes are invisible to the others, as with a real server database
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(engine)
+    with Session.begin() as session:
+        session.add_all([User(id=1, name="old"), User(id=2, name="other")])
+    yield Session
+    engine.dispose()
+
+
+@pytest.fixture
+def cache(sessions):
+    cache = EntityCache()
+    cache.attach(sessions)
+    yield cache
+    cache.detach(sessions)
+
+
+def cached_name(cache, Session, user_id=1):
+    # what a fresh session gets through the cache
+    with Session() as session:
+        return cache.get(session, User, user_id).name
+
+
+class TestEntityCacheCoherence:
+    def test_hit_after_first_read(self, cache, sessions):
+        assert cached_name(cache, sessions) == "old"
+        assert cached_name(cache, sessions) == "old"
+        assert cache.stats()["hits"] == 1
+
+    def test_orm_update_visible_after_commit(self, cache, sessions):
+        assert cached_name(cache, sessions) == "old"
+        with sessions.begin() as session:
+            session.get(User, 1).name = "new"
+        assert cached_name(cache, sessions) == "new"
+
+    def test_bulk_update_visible_after_commit(self, cache, sessions):
+        assert cached_name(cache, sessions) == "old"
+        with sessions() as writer:
+            writer.execute(update(User).values(name="new"))
+            # another session reads (and caches) the old, still committed row in between
+            assert cached_name(cache, sessions) == "old"
+            writer.commit()
+        assert cached_name(cache, sessions) == "new"
+
+    def test_bulk_update_rolled_back(self, cache, sessions):
+        with sessions() as writer:
+            writer.execute(update(User).values(name="ghost"))
+            # the writer sees its own change, but it must not reach the shared cache
+            assert cache.get(writer, User, 1).name == "ghost"
+            writer.rollback()
+        assert cached_name(cache, sessions) == "old"
+
+    def test_flushed_change_rolled_back(self, cache, sessions):
+        with sessions() as writer:
+            writer.get(User, 1).name = "ghost"
+            writer.flush()
+            # a session with uncommitted writes doesn't fill the cache, not even with other rows
+            assert cache.get(writer, User, 2).name == "other"
+            assert cache.stats()["size"] == 0
+            writer.rollback()
+        assert cached_name(cache, sessions) == "old"
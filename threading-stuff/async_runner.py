@@ -0,0 +1,142 @@
+'''
+The concurrent I/O of basics01.py with asyncio instead of threads.
+
+basics01.py runs two sleeping functions at the same time with two threads. A coroutine
+can do the same on a single thread: at every await (asyncio.sleep, a network read) it
+hands control back to the event loop, which runs whichever other coroutine is ready.
+A waiting coroutine costs a few KB, a thread costs its own stack and an OS thread, so
+the event loop goes much further when thousands of things are waiting at once.
+
+TaskRunner adds what a real program needs around asyncio.create_task():
+
+- Bounded concurrency: at most `limit` tasks run at once (an asyncio.Semaphore), the
+  others wait for a slot, so 10,000 URLs don't become 10,000 open connections.
+- Fan-out: map() runs a coroutine function over many inputs in an asyncio.TaskGroup,
+  which waits for all of them and, if one fails, cancels the rest.
+- Cancellation and timeouts: run(..., timeout=s) cancels a task that takes longer and
+  raises TimeoutError; a cancelled task (CancelledError) is counted and passed on.
+- Blocking code: run_blocking() runs a plain function (a library without async support)
+  on a thread with asyncio.to_thread(), so it doesn't freeze the event loop. A thread
+  can't be cancelled: on a timeout the await stops, but the function runs to its end.
+
+    async def main():
+        runner = TaskRunner(limit=100)
+        pages = await runner.map(fetch, urls, timeout=5, return_exceptions=True)
+        size = await runner.run_blocking(os.path.getsize, "big.file")
+
+    asyncio.run(main())
+'''
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+
+class TaskRunner:
+    def __init__(self, limit: int = 100, blocking_limit: Optional[int] = None, timeout: Optional[float] = None) -> None:
+        """
+        Args:
+            limit (int): tasks running at once.
+            blocking_limit (int): run_blocking() calls running at once, defaults to limit.
+                asyncio.to_thread() uses the loop's default executor, min(32, CPUs + 4)
+                threads, so more than that wait for a thread anyway.
+            timeout (float): default per-task timeout in seconds, None for no limit.
+        """
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.blocking_semaphore = asyncio.Semaphore(blocking_limit or limit)
+        self.timeout = timeout
+        self.running = 0
+        self.waiting = 0
+        self.stats = {"completed": 0, "failed": 0, "timed_out": 0, "cancelled": 0}
+
+    @asynccontextmanager
+    async def _slot(self, semaphore: asyncio.Semaphore) -> AsyncIterator[None]:
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            semaphore.release()
+
+    async def run(self, fn: Callable[..., Awaitable[Any]], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        await fn(*args, **kwargs) once a slot is free.
+
+        Args:
+            timeout (float): seconds the task may run (not counting the wait for a
+                slot), defaults to the runner's timeout.
+
+        Raises:
+            TimeoutError: the task ran longer than timeout and was cancelled.
+        """
+        async with self._slot(self.semaphore):
+            return await self._watch(fn(*args, **kwargs), timeout)
+
+    async def run_blocking(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """
+        Call the blocking fn(*args, **kwargs) on a worker thread and await its result.
+        """
+        async with self._slot(self.blocking_semaphore):
+            return await self._watch(asyncio.to_thread(fn, *args, **kwargs), timeout)
+
+    async def _watch(self, awaitable: Awaitable[Any], timeout: Optional[float]) -> Any:
+        timeout = timeout if timeout is not None else self.timeout
+        try:
+            async with asyncio.timeout(timeout):
+                result = await awaitable
+        except TimeoutError:
+            self.stats["timed_out"] += 1
+            raise
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            raise
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        self.stats["completed"] += 1
+        return result
+
+    async def map(
+        self,
+        fn: Callable[[Any], Awaitable[Any]],
+        items: Iterable[Any],
+        timeout: Optional[float] = None,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """
+        run(fn, item) for every item, at most limit at a time, and return the results
+        in the order of items.
+
+        Args:
+            timeout (float): per-task timeout, defaults to the runner's timeout.
+            return_exceptions (bool): put a failed task's exception in its place in the
+                results and carry on. If False, the first failure cancels every other
+                task and is raised (inside an ExceptionGroup, as TaskGroup does).
+        """
+        items = list(items)
+        results: List[Any] = [None] * len(items)
+
+        async def one(index: int, item: Any) -> None:
+            try:
+                results[index] = await self.run(fn, item, timeout=timeout)
+            except Exception as exc:
+                if not return_exceptions:
+                    raise
+                results[index] = exc
+
+        async with asyncio.TaskGroup() as group:
+            for index, item in enumerate(items):
+                group.create_task(one(index, item))
+        return results
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Tasks running and waiting for a slot right now, plus the counters.
+        """
+        return {"running": self.running, "waiting": self.waiting, **self.stats}
@@ -0,0 +1,99 @@
+'''
+Threads against the event loop at 10, 1,000 and 10,000 concurrent I/O waits.
+
+Every wait is a sleep of WAIT seconds standing in for a network call, all started at
+once, so ideally every run takes WAIT seconds whatever the count; what it takes on top
+of that is the cost of the concurrency itself.
+
+- threads      one threading.Thread per wait (time.sleep), like basics01.py
+- asyncio      one task per wait (asyncio.sleep) through TaskRunner.map, limit = count
+- to_thread    TaskRunner.run_blocking(time.sleep), i.e. the blocking call bridged onto
+               the default executor's threads, min(32, CPUs + 4) at a time, so it needs
+               count / threads rounds of WAIT (only run while that is at most MAX_ROUNDS)
+
+Memory is the peak resident set size growth, read from /proc/self/status where there
+is one (Linux), measured by running each variant in its own child process.
+
+Run it from inside the threading-stuff folder:
+
+    python bench_async_runner.py
+'''
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+
+from async_runner import TaskRunner
+
+COUNTS = [10, 1_000, 10_000]
+WAIT = 0.5
+MAX_ROUNDS = 10
+EXECUTOR_THREADS = min(32, (os.cpu_count() or 1) + 4)  # ThreadPoolExecutor's default
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def with_threads(count):
+    threads = [threading.Thread(target=time.sleep, args=(WAIT,)) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def with_asyncio(count):
+    async def main():
+        await TaskRunner(limit=count).map(asyncio.sleep, [WAIT] * count)
+
+    asyncio.run(main())
+
+
+def with_to_thread(count):
+    async def main():
+        runner = TaskRunner(limit=count)
+        async with asyncio.TaskGroup() as group:
+            for _ in range(count):
+                group.create_task(runner.run_blocking(time.sleep, WAIT))
+
+    asyncio.run(main())
+
+
+def measure(variant, count, results):
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    variant(count)
+    results.put((time.perf_counter() - start, peak_rss_mb() - before))
+
+
+def run(variant, count):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure, args=(variant, count, results))
+    process.start()
+    elapsed, memory = results.get()
+    process.join()
+    return elapsed, memory
+
+
+if __name__ == "__main__":
+    print(f"each wait sleeps {WAIT} s, to_thread has {EXECUTOR_THREADS} threads; wall time in s, peak memory growth in MB")
+    print(f"{'waits':>7} {'threads':>16} {'asyncio':>16} {'to_thread':>16}")
+    for count in COUNTS:
+        cells = []
+        for variant in (with_threads, with_asyncio, with_to_thread):
+            if variant is with_to_thread and count / EXECUTOR_THREADS > MAX_ROUNDS:
+                cells.append(f"{'(skipped)':>16}")
+                continue
+            elapsed, memory = run(variant, count)
+            cells.append(f"{elapsed:>7.2f}s {memory:>6.1f}MB")
+        print(f"{count:>7,} " + " ".join(cells))
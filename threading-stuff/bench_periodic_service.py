@@ -0,0 +1,99 @@
+'''
+PeriodicService (periodic_service.py) against the sleep loop of basics03_daemon_threads.py.
+
+1. Drift: RUN_FOR seconds of a tick that works WORK seconds every INTERVAL. The sleep
+   loop runs one tick per INTERVAL + WORK; the service keeps to one per INTERVAL.
+2. Coalescing: every tenth tick takes 3.5 intervals. The service skips the due times
+   it overran (counted as missed) instead of running them back to back afterwards.
+3. Impact on other threads: a "request" thread handles small CPU-bound requests while
+   the service ticks in the background; its latency is compared to a run without the
+   service, next to the cpu share the service reports.
+
+Run it from inside the threading-stuff folder:
+
+    python bench_periodic_service.py
+'''
+
+import itertools
+import statistics
+import threading
+import time
+
+from periodic_service import PeriodicService
+
+RUN_FOR = 3.0
+INTERVAL = 0.05
+WORK = 0.01
+REQUESTS = 2000
+
+
+def busy(seconds):
+    # CPU work, holds the GIL, unlike time.sleep
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def sleep_loop(stop, ticks):
+    while not stop.is_set():
+        busy(WORK)
+        ticks.append(time.monotonic())
+        time.sleep(INTERVAL)
+
+
+def drift():
+    stop, ticks = threading.Event(), []
+    thread = threading.Thread(target=sleep_loop, args=(stop, ticks), daemon=True)
+    thread.start()
+    time.sleep(RUN_FOR)
+    stop.set()
+    thread.join()
+
+    with PeriodicService(lambda: busy(WORK), INTERVAL) as service:
+        time.sleep(RUN_FOR)
+    return len(ticks), service.snapshot()
+
+
+def coalescing():
+    counter = itertools.count()
+
+    def tick():
+        if next(counter) % 10 == 9:
+            time.sleep(3.5 * INTERVAL)
+
+    with PeriodicService(tick, INTERVAL) as service:
+        time.sleep(RUN_FOR)
+    return service.snapshot()
+
+
+def request_latencies():
+    latencies = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        busy(0.0005)
+        latencies.append(time.perf_counter() - start)
+    cuts = statistics.quantiles(latencies, n=100)
+    return cuts[49] * 1000, cuts[98] * 1000
+
+
+if __name__ == "__main__":
+    ideal = int(RUN_FOR / INTERVAL)
+    loop_ticks, snapshot = drift()
+    print(f"drift, {RUN_FOR:.0f} s of {WORK * 1000:.0f} ms ticks every {INTERVAL * 1000:.0f} ms, {ideal} due")
+    print(f"  sleep loop       {loop_ticks} ticks")
+    print(f"  PeriodicService  {snapshot['ticks']} ticks, max lag {snapshot['max_lag_ms']:.1f} ms")
+
+    snapshot = coalescing()
+    print(f"\ncoalescing, every tenth tick takes {3.5 * INTERVAL * 1000:.0f} ms")
+    print(f"  {snapshot['ticks']} ticks, {snapshot['missed']} missed, {snapshot['ticks'] + snapshot['missed']} due")
+
+    print("\nrequest latency (0.5 ms CPU each), ms")
+    p50, p99 = request_latencies()
+    print(f"  no service                                           p50 {p50:.2f}  p99 {p99:.2f}")
+    with PeriodicService(lambda: busy(WORK), INTERVAL, run_immediately=True) as service:
+        p50, p99 = request_latencies()
+    snapshot = service.snapshot()
+    print(
+        f"  service ticking, cpu {snapshot['cpu']:.0%} busy {snapshot['busy']:.0%}, tick p99 {snapshot['p99_ms']:.1f} ms"
+        f"  p50 {p50:.2f}  p99 {p99:.2f}"
+    )
@@ -0,0 +1,78 @@
+'''
+Core scaling of the two worker pool backends on a CPU-bound task.
+
+1. CPU_TASKS tasks that each count the primes below PRIME_LIMIT (pure Python, tens of ms),
+   run through the thread backend and the process backend with 1, 2, 4, ... workers, up
+   to the number of CPUs. Threads stay at the speed of one core (the GIL); processes
+   should scale close to linearly until they run out of cores.
+2. Tiny tasks through the process backend with chunk_size 1 and 64, to show what the
+   batching saves when the per-task overhead (pickling, pipe) dominates.
+
+Run it from inside the threading-stuff folder:
+
+    python bench_process_pool.py
+'''
+
+import os
+import time
+
+from process_pool import make_pool
+
+CPU_TASKS = 200
+PRIME_LIMIT = 20_000
+TINY_TASKS = 20_000
+
+
+def count_primes(limit):
+    count = 0
+    for n in range(2, limit):
+        for d in range(2, int(n ** 0.5) + 1):
+            if n % d == 0:
+                break
+        else:
+            count += 1
+    return count
+
+
+def square(x):
+    return x * x
+
+
+def run(backend, workers, fn, arg, n_tasks, **options):
+    if backend == "thread":
+        options.update(min_workers=workers, max_workers=workers)
+    else:
+        options.update(workers=workers)
+    with make_pool(backend, **options) as pool:
+        start = time.perf_counter()
+        futures = [pool.put(fn, arg) for _ in range(n_tasks)]
+        pool.join()
+        elapsed = time.perf_counter() - start
+    assert all(future.exception() is None for future in futures)
+    return n_tasks / elapsed
+
+
+if __name__ == "__main__":
+    cpus = os.cpu_count() or 1
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= cpus:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != cpus:
+        worker_counts.append(cpus)
+
+    start = time.perf_counter()
+    count_primes(PRIME_LIMIT)
+    print(f"{cpus} CPUs, one task takes {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    print(f"{'workers':>7} {'threads tasks/s':>16} {'processes tasks/s':>18} {'process speedup':>16}")
+    base = None
+    for workers in worker_counts:
+        threads = run("thread", workers, count_primes, PRIME_LIMIT, CPU_TASKS)
+        processes = run("process", workers, count_primes, PRIME_LIMIT, CPU_TASKS)
+        base = base or processes
+        print(f"{workers:>7} {threads:>16,.1f} {processes:>18,.1f} {processes / base:>15.1f}x")
+
+    print(f"\ntiny tasks, {cpus} processes")
+    for chunk_size in (1, 64):
+        rate = run("process", cpus, square, 3, TINY_TASKS, chunk_size=chunk_size)
+        print(f"chunk_size={chunk_size:<3} {rate:>10,.0f} tasks/s")
@@ -0,0 +1,64 @@
+'''
+Queue wait per priority under the three dispatch policies of scheduler.py.
+
+The same workload runs through a Scheduler with policy "fifo" (the order of
+basics04_queue_threads.py), "priority" and "edf":
+
+- batch tasks, priority 10: BATCH_WORK seconds each, arriving in bursts of BURST every
+  BURST_EVERY seconds, with a deadline of BATCH_DEADLINE.
+- urgent tasks, priority 0: URGENT_WORK seconds each, one every URGENT_EVERY seconds,
+  with a deadline of URGENT_DEADLINE.
+
+Together they keep the workers about 85% busy. With FIFO an urgent task arriving just
+after a burst waits for the whole burst, and misses its deadline; with priority or EDF
+it only waits for a worker to finish its current task.
+
+Run it from inside the threading-stuff folder:
+
+    python bench_scheduler.py
+'''
+
+import time
+
+from scheduler import POLICIES, Scheduler, expired
+
+WORKERS = 4
+DURATION = 3.0
+BATCH_WORK = 0.02
+BURST = 16
+BURST_EVERY = 0.1
+BATCH_DEADLINE = 1.0
+URGENT_WORK = 0.001
+URGENT_EVERY = 0.005
+URGENT_DEADLINE = 0.05
+
+
+def produce(scheduler):
+    futures = {0: [], 10: []}
+    start = time.monotonic()
+    next_burst = next_urgent = start
+    while (now := time.monotonic()) - start < DURATION:
+        if now >= next_burst:
+            for _ in range(BURST):
+                futures[10].append(scheduler.put(time.sleep, BATCH_WORK, priority=10, deadline=BATCH_DEADLINE))
+            next_burst += BURST_EVERY
+        if now >= next_urgent:
+            futures[0].append(scheduler.put(time.sleep, URGENT_WORK, priority=0, deadline=URGENT_DEADLINE))
+            next_urgent += URGENT_EVERY
+        time.sleep(max(0.0, min(next_burst, next_urgent) - time.monotonic()))
+    return futures
+
+
+if __name__ == "__main__":
+    print(f"{WORKERS} workers, {DURATION:.0f} s, queue wait in ms")
+    print(f"{'policy':>8} {'priority':>8} {'run':>6} {'dropped':>8} {'p50':>8} {'p99':>8} {'max':>8}")
+    for policy in POLICIES[::-1]:
+        with Scheduler(workers=WORKERS, policy=policy) as scheduler:
+            futures = produce(scheduler)
+            scheduler.join()
+        for priority, stats in scheduler.wait_stats().items():
+            assert stats["dropped"] == expired(futures[priority])
+            print(
+                f"{policy:>8} {priority:>8} {stats['run']:>6} {stats['dropped']:>8} "
+                f"{stats['p50_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}"
+            )
@@ -0,0 +1,77 @@
+'''
+LockedCounter (one global lock, basics02_shared_data.py) against ShardedCounter
+(sharded_counter.py) at 1 to 64 threads.
+
+Every run does TOTAL increments in all, split evenly over the threads, which all start
+together on a Barrier:
+
+- locked     LockedCounter.increment()
+- sharded    ShardedCounter.increment()
+- batched    ShardedCounter.batch(flush_every=FLUSH_EVERY).add()
+
+and checks the final value, so a lost update would show up as an AssertionError.
+Throughput is in million increments per second.
+
+With the GIL only one thread runs Python code at a time, so the threads mostly take
+turns; what the numbers show is the cost of the lock itself, plus the handoffs when a
+thread is switched out while holding it. On a free-threaded build (python3.13t) the
+threads really run in parallel and the single lock becomes the bottleneck.
+
+Run it from inside the threading-stuff folder:
+
+    python bench_sharded_counter.py
+'''
+
+import sys
+import threading
+import time
+
+from sharded_counter import LockedCounter, ShardedCounter
+
+THREAD_COUNTS = [1, 2, 4, 8, 16, 32, 64]
+TOTAL = 640_000
+FLUSH_EVERY = 1000
+
+
+def locked(counter, n):
+    for _ in range(n):
+        counter.increment()
+
+
+def batched(counter, n):
+    with counter.batch(flush_every=FLUSH_EVERY) as batch:
+        for _ in range(n):
+            batch.add()
+
+
+def run(counter, work, n_threads):
+    per_thread = TOTAL // n_threads
+    barrier = threading.Barrier(n_threads + 1)
+
+    def worker():
+        barrier.wait()
+        work(counter, per_thread)
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    assert counter.value == per_thread * n_threads, counter.value
+    return per_thread * n_threads / elapsed / 1e6
+
+
+if __name__ == "__main__":
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"{TOTAL:,} increments, GIL {'enabled' if gil else 'disabled'}, million increments/s")
+    print(f"{'threads':>7} {'locked':>8} {'sharded':>8} {'batched':>8}")
+    for n_threads in THREAD_COUNTS:
+        rates = [
+            run(LockedCounter(), locked, n_threads),
+            run(ShardedCounter(), locked, n_threads),
+            run(ShardedCounter(), batched, n_threads),
+        ]
+        print(f"{n_threads:>7} " + " ".join(f"{rate:>8.2f}" for rate in rates))
@@ -0,0 +1,74 @@
+'''
+Throughput benchmark of WorkerPool (worker_pool.py) at different worker counts.
+
+1. I/O-bound tasks (time.sleep(IO_WAIT), standing in for a network call) at a fixed
+   number of workers, next to concurrent.futures.ThreadPoolExecutor with as many
+   threads. Throughput should grow with the workers, up to workers / IO_WAIT tasks/s.
+2. No-op tasks, which measure the pool's own overhead per task.
+3. Autoscaling: a burst of I/O tasks into a pool with min_workers=1, showing how many
+   workers it grew to and that it shrinks back once idle.
+
+Run it from inside the threading-stuff folder:
+
+    python bench_worker_pool.py
+'''
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from worker_pool import WorkerPool
+
+WORKER_COUNTS = [1, 2, 4, 8, 16, 32, 64]
+IO_WAIT = 0.01
+IO_TASKS = 1000
+NOOP_TASKS = 50_000
+
+
+def noop():
+    pass
+
+
+def pool_rate(workers, fn, args, n_tasks):
+    with WorkerPool(min_workers=workers, max_workers=workers, queue_size=1000) as pool:
+        start = time.perf_counter()
+        futures = [pool.put(fn, *args) for _ in range(n_tasks)]
+        pool.join()
+        elapsed = time.perf_counter() - start
+    assert all(future.done() for future in futures)
+    return n_tasks / elapsed
+
+
+def executor_rate(workers, fn, args, n_tasks):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        start = time.perf_counter()
+        wait([executor.submit(fn, *args) for _ in range(n_tasks)])
+        elapsed = time.perf_counter() - start
+    return n_tasks / elapsed
+
+
+if __name__ == "__main__":
+    print(f"I/O-bound tasks ({IO_WAIT * 1000:.0f} ms wait), tasks/s")
+    print(f"{'workers':>7} {'WorkerPool':>12} {'ThreadPoolExecutor':>19} {'ideal':>8}")
+    for workers in WORKER_COUNTS:
+        n_tasks = min(IO_TASKS, workers * 100)
+        pool = pool_rate(workers, time.sleep, (IO_WAIT,), n_tasks)
+        executor = executor_rate(workers, time.sleep, (IO_WAIT,), n_tasks)
+        print(f"{workers:>7} {pool:>12,.0f} {executor:>19,.0f} {workers / IO_WAIT:>8,.0f}")
+
+    print("\nno-op tasks (pool overhead), tasks/s")
+    print(f"{'workers':>7} {'WorkerPool':>12} {'ThreadPoolExecutor':>19}")
+    for workers in (1, 4, 16):
+        pool = pool_rate(workers, noop, (), NOOP_TASKS)
+        executor = executor_rate(workers, noop, (), NOOP_TASKS)
+        print(f"{workers:>7} {pool:>12,.0f} {executor:>19,.0f}")
+
+    print("\nautoscaling, min_workers=1 max_workers=32")
+    with WorkerPool(min_workers=1, max_workers=32, queue_size=1000, idle_timeout=0.5) as pool:
+        start = time.perf_counter()
+        for _ in range(IO_TASKS):
+            pool.put(time.sleep, IO_WAIT)
+        pool.join()
+        elapsed = time.perf_counter() - start
+        print(f"burst of {IO_TASKS} tasks: {IO_TASKS / elapsed:,.0f} tasks/s, peaked at {pool.snapshot()['peak_workers']} workers")
+        time.sleep(1.5)
+        print(f"after 1.5 s idle: {pool.snapshot()['workers']} workers")
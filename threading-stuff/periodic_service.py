@@ -0,0 +1,169 @@
+'''
+A periodic background service, the managed version of basics03_daemon_threads.py.
+
+basics03 runs `while True: work(); time.sleep(2)` in a daemon thread, which has three
+problems:
+
+- It can't be stopped, only killed: at exit the interpreter drops daemon threads
+  wherever they are, so work in progress (a half-written batch) is lost.
+- It drifts: each round takes 2 s PLUS the time the work took, so after an hour of
+  0.1 s of work per round it has run about 1,714 times instead of 1,800.
+- Nobody knows how long the work takes, or whether it is falling behind.
+
+PeriodicService fixes them:
+
+- Stop signal: the thread waits on a threading.Event instead of time.sleep(), so
+  stop() wakes it at once. A tick that is running finishes first.
+- Fixed rate: tick n is due at start + n * interval, whatever the earlier ticks took,
+  so the timing errors don't add up.
+- Coalescing: when a tick overruns one or more due times (a slow tick, a suspended
+  laptop), the missed ticks are counted and skipped, the next tick runs once at the
+  next due time, instead of a burst of catch-up ticks back to back.
+- Flush on shutdown: stop() (and the atexit hook, for a program that just ends) runs
+  on_stop once on the service thread after the last tick, e.g. to write out buffered data.
+- Metrics: snapshot() has the tick durations (mean, p99, max), how late ticks started
+  (lag), the share of wall time spent ticking (busy) and the share spent running on the
+  CPU (cpu, from time.thread_time()). busy also counts the time a tick waits for the GIL
+  or for I/O; cpu is what the ticks take from the other threads of the process, e.g.
+  request handlers: with the GIL, a cpu share of 5% is 5% of their time.
+
+    service = PeriodicService(send_heartbeat, interval=2.0, on_stop=flush_buffer)
+    service.start()
+    ...
+    service.stop()
+'''
+
+import atexit
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicService:
+    def __init__(
+        self,
+        tick: Callable[[], Any],
+        interval: float,
+        on_stop: Optional[Callable[[], Any]] = None,
+        run_immediately: bool = False,
+        name: str = "periodic-service",
+        keep: int = 1000,
+    ) -> None:
+        """
+        Args:
+            tick (Callable): the periodic work, called with no arguments. An exception is
+                logged and counted, the service keeps running.
+            interval (float): seconds between the starts of two ticks.
+            on_stop (Callable): called once when the service stops, after the last tick.
+            run_immediately (bool): first tick at start() instead of one interval later.
+            name (str): the thread's name.
+            keep (int): recent tick durations kept for the p99.
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.tick = tick
+        self.interval = interval
+        self.on_stop = on_stop
+        self.run_immediately = run_immediately
+        self.stop_event = threading.Event()
+        # daemon, so a tick stuck forever can't keep the program from exiting; the
+        # atexit hook still stops the service cleanly when the program ends normally
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+        self.lock = threading.Lock()
+        self.durations: Deque[float] = deque(maxlen=keep)
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self.stats = {"ticks": 0, "errors": 0, "missed": 0, "busy_seconds": 0.0, "cpu_seconds": 0.0, "max_lag": 0.0}
+
+    def start(self) -> "PeriodicService":
+        self.started_at = time.monotonic()
+        self.thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        Signal the service to stop and wait (up to timeout seconds) for the running tick
+        and on_stop to finish. Returns False if the thread is still running.
+        """
+        self.stop_event.set()
+        atexit.unregister(self.stop)
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+    def __enter__(self) -> "PeriodicService":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        due = self.started_at if self.run_immediately else self.started_at + self.interval
+        try:
+            # Event.wait returns True once stop() has set it
+            while not self.stop_event.wait(max(0.0, due - time.monotonic())):
+                started, cpu_started = time.monotonic(), time.thread_time()
+                self._tick()
+                finished = time.monotonic()
+                with self.lock:
+                    self.stats["busy_seconds"] += finished - started
+                    self.stats["cpu_seconds"] += time.thread_time() - cpu_started
+                    self.stats["max_lag"] = max(self.stats["max_lag"], started - due)
+                    self.durations.append(finished - started)
+
+                due += self.interval
+                if finished >= due:
+                    missed = int((finished - due) // self.interval) + 1
+                    due += missed * self.interval
+                    with self.lock:
+                        self.stats["missed"] += missed
+        finally:
+            self.stopped_at = time.monotonic()
+            if self.on_stop is not None:
+                try:
+                    self.on_stop()
+                except Exception:
+                    logger.exception("on_stop of %s failed", self.thread.name)
+
+    def _tick(self) -> None:
+        try:
+            self.tick()
+        except Exception:
+            logger.exception("tick of %s failed", self.thread.name)
+            with self.lock:
+                self.stats["errors"] += 1
+        finally:
+            with self.lock:
+                self.stats["ticks"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Ticks run, failed and missed, tick durations and lag in ms, and the busy and cpu
+        shares of the time the service has been running.
+        """
+        with self.lock:
+            durations = sorted(self.durations)
+            stats = dict(self.stats)
+        if self.started_at is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.stopped_at or time.monotonic()) - self.started_at
+        p99 = statistics.quantiles(durations, n=100)[98] if len(durations) >= 2 else (durations or [0.0])[0]
+        return {
+            "ticks": stats["ticks"],
+            "errors": stats["errors"],
+            "missed": stats["missed"],
+            "mean_ms": statistics.fmean(durations) * 1000 if durations else 0.0,
+            "p99_ms": p99 * 1000,
+            "max_ms": (durations[-1] if durations else 0.0) * 1000,
+            "max_lag_ms": stats["max_lag"] * 1000,
+            "busy": stats["busy_seconds"] / elapsed if elapsed else 0.0,
+            "cpu": stats["cpu_seconds"] / elapsed if elapsed else 0.0,
+        }
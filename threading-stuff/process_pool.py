@@ -0,0 +1,232 @@
+'''
+A process-based backend for the worker pool, for CPU-bound tasks.
+
+Threads only take turns running Python code (the GIL), so WorkerPool can't make a
+CPU-bound task finish faster with more workers. ProcessWorkerPool has the same
+put() / join() / shutdown() API but runs the tasks in a ProcessPoolExecutor, one Python
+interpreter (and GIL) per core.
+
+Sending a task to another process costs pickling the function and its arguments, a
+trip through a pipe, and pickling the result back; for a small task that is more than
+the task itself. So tasks are sent in batches: put() adds the task to the current
+batch, and a whole batch goes to a process as one call (_run_batch), which returns
+all the results together.
+
+When is a batch sent? As soon as a process is free, or when it is full (chunk_size).
+While the processes are all busy, new tasks collect in the batch, so batches grow
+exactly when the per-task overhead matters; when they are idle, a task starts at once.
+
+Like WorkerPool, the pool holds at most queue_size unfinished tasks, and put() then
+blocks or raises PoolFull (policy). The task functions must be picklable, i.e. defined
+at the top level of a module, and the pool must be created under
+if __name__ == "__main__": on platforms that spawn processes.
+
+make_pool("thread" | "process", ...) returns one or the other.
+'''
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from worker_pool import PoolClosed, PoolFull, WorkerPool, _complete
+
+Call = Tuple[Callable[..., Any], Tuple[Any, ...], Dict[str, Any], Optional[float]]
+
+
+def _run_batch(calls: List[Call]) -> List[Tuple[bool, Any]]:
+    # Runs in the worker process. An exception is returned rather than raised, so one
+    # failing task doesn't lose the results of the others in the batch.
+    results = []
+    for fn, args, kwargs, deadline in calls:
+        # time.monotonic() is system-wide, so a deadline set in the parent is valid here
+        if deadline is not None and time.monotonic() >= deadline:
+            results.append((False, TimeoutError("task timed out in the queue")))
+            continue
+        try:
+            results.append((True, fn(*args, **kwargs)))
+        except Exception as exc:
+            results.append((False, exc))
+    return results
+
+
+class ProcessWorkerPool:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        chunk_size: int = 64,
+        queue_size: int = 10_000,
+        policy: str = "block",
+    ) -> None:
+        """
+        Args:
+            workers (int): processes, defaults to the number of CPUs.
+            chunk_size (int): most tasks sent to a process at once.
+            queue_size (int): unfinished tasks allowed before put() blocks or rejects.
+            policy (str): "block" or "reject", what put() does when queue_size is reached.
+        """
+        if policy not in ("block", "reject"):
+            raise ValueError(f"unknown policy {policy!r}")
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.policy = policy
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.slots = threading.BoundedSemaphore(queue_size)
+        self.queue_size = queue_size
+
+        # reentrant: add_done_callback() runs _batch_done() right away, in the thread
+        # holding the lock in _send_batch(), if the batch is already done by then
+        self.lock = threading.RLock()
+        self.batch: List[Call] = []
+        self.batch_futures: List[Future] = []
+        self.in_flight: Set[Future] = set()  # batch futures sent to the processes
+        self.all_done = threading.Condition(self.lock)
+        self.closed = False
+        self.stats = {"completed": 0, "failed": 0, "rejected": 0, "batches": 0}
+
+    def put(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+        block_timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Future:
+        """
+        Queue fn(*args, **kwargs) and return the Future of its result.
+
+        Args:
+            fn (Callable): the task, a picklable top-level function.
+            timeout (float): seconds from now the task has to START in, a process can't
+                be interrupted mid-task, so a started task always runs to the end.
+            block_timeout (float): with policy="block", seconds to wait for room before
+                giving up with PoolFull, None waits as long as it takes.
+
+        Raises:
+            PoolFull: queue_size tasks are unfinished (policy="reject", or block_timeout passed).
+            PoolClosed: the pool is shut down.
+        """
+        if self.closed:
+            raise PoolClosed("the pool is shut down")
+        if self.policy == "reject":
+            acquired = self.slots.acquire(blocking=False)
+        else:
+            acquired = self.slots.acquire(timeout=block_timeout)
+        if not acquired:
+            with self.lock:
+                self.stats["rejected"] += 1
+            raise PoolFull(f"{self.queue_size} tasks are already queued")
+
+        future: Future = Future()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.lock:
+            # shutdown() may have run while this put waited for a slot, and a task added
+            # now would be left in the batch (or fail to submit) after the final join
+            if self.closed:
+                self.slots.release()
+                raise PoolClosed("the pool is shut down")
+            self.batch.append((fn, args, kwargs, deadline))
+            self.batch_futures.append(future)
+            if len(self.batch) >= self.chunk_size or len(self.in_flight) < self.workers:
+                self._send_batch()
+        return future
+
+    def _send_batch(self) -> None:
+        # called with self.lock held
+        calls, futures = self.batch, self.batch_futures
+        self.batch, self.batch_futures = [], []
+        try:
+            batch_future = self.executor.submit(_run_batch, calls)
+        except Exception as exc:
+            # BrokenProcessPool, or the executor is shut down
+            for future in futures:
+                _complete(future, exception=exc)
+                self.slots.release()
+            self.stats["failed"] += len(futures)
+            self.all_done.notify_all()
+            return
+        self.in_flight.add(batch_future)
+        self.stats["batches"] += 1
+        batch_future.add_done_callback(lambda done: self._batch_done(done, futures))
+
+    def _batch_done(self, batch_future: Future, futures: List[Future]) -> None:
+        if batch_future.cancelled():
+            outcomes = None
+            for future in futures:
+                future.cancel()
+        elif batch_future.exception() is not None:
+            # the whole batch failed, e.g. a task or its result couldn't be pickled
+            outcomes = [(False, batch_future.exception())] * len(futures)
+        else:
+            outcomes = batch_future.result()
+
+        for future, (ok, value) in zip(futures, outcomes or ()):
+            if ok:
+                _complete(future, value)
+            else:
+                _complete(future, exception=value)
+        for _ in futures:
+            self.slots.release()
+
+        with self.lock:
+            self.in_flight.discard(batch_future)
+            for ok, _ in outcomes or ():
+                self.stats["completed" if ok else "failed"] += 1
+            # tasks that collected while every process was busy go now
+            if self.batch:
+                self._send_batch()
+            self.all_done.notify_all()
+
+    def join(self) -> None:
+        """
+        Block until every task put so far has finished.
+        """
+        with self.lock:
+            if self.batch:
+                self._send_batch()
+            while self.in_flight or self.batch:
+                self.all_done.wait()
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """
+        Stop accepting tasks, run (or with cancel_pending, cancel) the queued ones and
+        stop the processes.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self.batch:
+                if cancel_pending:
+                    for future in self.batch_futures:
+                        future.cancel()
+                        self.slots.release()
+                    self.batch, self.batch_futures = [], []
+                else:
+                    self._send_batch()
+        if wait and not cancel_pending:
+            self.join()
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+
+    def __enter__(self) -> "ProcessWorkerPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return {"batches_in_flight": len(self.in_flight), "batched": len(self.batch), **self.stats}
+
+
+def make_pool(backend: str = "thread", **options: Any):
+    """
+    WorkerPool (backend="thread", for I/O-bound tasks) or ProcessWorkerPool
+    (backend="process", for CPU-bound tasks). options go to the pool's constructor.
+    """
+    if backend == "thread":
+        return WorkerPool(**options)
+    if backend == "process":
+        return ProcessWorkerPool(**options)
+    raise ValueError(f"unknown backend {backend!r}")
@@ -0,0 +1,218 @@
+'''
+Priority and deadline aware scheduling for the worker threads of basics04_queue_threads.py.
+
+basics04 uses a queue.Queue, strictly first in first out: an urgent task put behind a
+hundred long batch tasks waits for all of them. Scheduler uses a queue.PriorityQueue
+instead, which always hands out the smallest entry first, and the sort key of an entry
+decides the dispatch order (policy):
+
+- "priority"  (priority, deadline, n)  lowest priority number first, and within one
+                                        priority the earliest deadline first
+- "edf"       (deadline, priority, n)  earliest deadline first, whatever the priority
+- "fifo"      (n,)                     the basics04 order, to compare against
+
+n is a counter, unique per task, so equal keys keep their put() order and the tasks
+themselves never get compared.
+
+A task whose deadline has already passed when a worker picks it up is dropped instead
+of run: its result would come too late to be of use, and running it would only make
+the tasks behind it late as well. Its future fails with DeadlineExpired.
+
+For every priority the time tasks spent waiting in the queue is recorded, see
+wait_stats(), which is where a scheduling policy shows up: the p99 wait of the
+urgent priority.
+'''
+
+import itertools
+import math
+import queue
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from worker_pool import PoolClosed, _complete
+
+POLICIES = ("priority", "edf", "fifo")
+# sorts after every real task, so the workers drain the queue before they stop
+SENTINEL_KEY = (math.inf, math.inf)
+
+
+class DeadlineExpired(Exception):
+    pass
+
+
+class Task:
+    __slots__ = ("future", "fn", "args", "kwargs", "priority", "deadline", "enqueued_at")
+
+    def __init__(self, fn, args, kwargs, priority, deadline, enqueued_at) -> None:
+        self.future: Future = Future()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued_at = enqueued_at
+
+
+class WaitStats:
+    def __init__(self, keep: int = 10_000) -> None:
+        self.waits: Deque[float] = deque(maxlen=keep)
+        self.run = 0
+        self.dropped = 0
+
+    def summary(self) -> Dict[str, float]:
+        waits = sorted(self.waits)
+        if len(waits) >= 2:
+            cuts = statistics.quantiles(waits, n=100)
+            p50, p99 = cuts[49], cuts[98]
+        else:
+            p50 = p99 = waits[0] if waits else 0.0
+        return {
+            "run": self.run,
+            "dropped": self.dropped,
+            "p50_ms": p50 * 1000,
+            "p99_ms": p99 * 1000,
+            "max_ms": (waits[-1] if waits else 0.0) * 1000,
+        }
+
+
+class Scheduler:
+    def __init__(self, workers: int = 4, policy: str = "priority", queue_size: int = 0) -> None:
+        """
+        Args:
+            workers (int): worker threads.
+            policy (str): "priority", "edf" or "fifo", see the module docstring.
+            queue_size (int): tasks that can wait, put() blocks beyond that. 0 is unbounded.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy {policy!r}")
+        self.policy = policy
+        self.tasks: "queue.PriorityQueue[Tuple[Any, ...]]" = queue.PriorityQueue(maxsize=queue_size)
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.stats: Dict[int, WaitStats] = defaultdict(WaitStats)  # only touched under self.lock
+        self.closed = False
+        # put() calls between the closed check and the end of the enqueue, shutdown()
+        # waits for them so that no task is queued after the workers have stopped
+        self.putting = 0
+        self.puts_done = threading.Condition(self.lock)
+        self.threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def sort_key(self, priority: int, deadline: float, n: int) -> Tuple:
+        if self.policy == "priority":
+            return (priority, deadline, n)
+        if self.policy == "edf":
+            return (deadline, priority, n)
+        return (n,)
+
+    def put(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Future:
+        """
+        Queue fn(*args, **kwargs) and return the Future of its result.
+
+        Args:
+            fn (Callable): the task.
+            priority (int): lower runs first (with policy="priority").
+            deadline (float): seconds from now by which the task must have STARTED, it is
+                dropped otherwise. None for no deadline.
+        """
+        with self.lock:
+            if self.closed:
+                raise PoolClosed("the scheduler is shut down")
+            self.putting += 1
+        try:
+            now = time.monotonic()
+            absolute_deadline = now + deadline if deadline is not None else math.inf
+            task = Task(fn, args, kwargs, priority, absolute_deadline, now)
+            # not under self.lock: with a queue_size, the workers need it to make room
+            self.tasks.put((*self.sort_key(priority, absolute_deadline, next(self.counter)), task))
+        finally:
+            with self.lock:
+                self.putting -= 1
+                if not self.putting:
+                    self.puts_done.notify_all()
+        return task.future
+
+    def join(self) -> None:
+        self.tasks.join()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Run the queued tasks (dropping the expired ones), then stop the workers.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            while self.putting:
+                self.puts_done.wait()
+        for _ in self.threads:
+            self.tasks.put((*SENTINEL_KEY, next(self.counter), None))
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+    def __enter__(self) -> "Scheduler":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def _worker(self) -> None:
+        while True:
+            entry = self.tasks.get()
+            task = entry[-1]
+            if task is None:
+                self.tasks.task_done()
+                break
+            try:
+                self._run(task)
+            finally:
+                self.tasks.task_done()
+
+    def _run(self, task: Task) -> None:
+        if not task.future.set_running_or_notify_cancel():
+            return
+        started = time.monotonic()
+        if started > task.deadline:
+            with self.lock:
+                self.stats[task.priority].dropped += 1
+            _complete(task.future, exception=DeadlineExpired(
+                f"deadline passed {(started - task.deadline) * 1000:.1f} ms before the task could start"
+            ))
+            return
+        with self.lock:
+            stats = self.stats[task.priority]
+            stats.run += 1
+            stats.waits.append(started - task.enqueued_at)
+        try:
+            result = task.fn(*task.args, **task.kwargs)
+        except BaseException as exc:
+            _complete(task.future, exception=exc)
+        else:
+            _complete(task.future, result)
+
+    def wait_stats(self) -> Dict[int, Dict[str, float]]:
+        """
+        Per priority: tasks run and dropped, and the p50 / p99 / max queue wait.
+        """
+        with self.lock:
+            return {priority: stats.summary() for priority, stats in sorted(self.stats.items())}
+
+
+def expired(futures: List[Future]) -> int:
+    """
+    How many of the futures failed because their deadline passed.
+    """
+    return sum(1 for future in futures if future.done() and isinstance(future.exception(), DeadlineExpired))
@@ -0,0 +1,144 @@
+'''
+Counters without the one global Lock of basics02_shared_data.py.
+
+In basics02 every increment of every thread goes through the same lock. Taking a lock
+is cheap while nobody else holds it, but with many threads incrementing at once they
+queue up behind each other, and the more threads, the longer the queue.
+
+ShardedCounter gives each thread its own shard (a threading.local), a small object only
+that thread ever writes to, so increment() needs no lock at all. Reading the counter
+sums the shards: writes are cheap and frequent, reads are rarer and do the work.
+
+- increment(n) adds to the calling thread's shard.
+- value (or int(counter)) merges the shards. A read running while other threads
+  increment sees each shard either before or after an increment, never a torn value.
+- batch() is for hot loops: the increments go to a plain attribute of a Batch object and
+  reach the shard when the batch is flushed (every flush_every adds, and at the end of
+  the with block), so the counter is only behind by what the batches hold.
+- Shards of threads that have exited are folded into one total when the counter is read,
+  so thousands of short-lived threads don't leave thousands of shards behind.
+
+LockedCounter is the basics02 counter with the same API, to compare against.
+'''
+
+import threading
+from typing import List, Optional, Tuple, Union
+
+Number = Union[int, float]
+
+
+class Shard:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value: Number = 0
+
+
+class Batch:
+    """
+    Local increments for one thread, see ShardedCounter.batch().
+    """
+
+    __slots__ = ("pending", "count", "flush_every", "shard")
+
+    def __init__(self, shard: Shard, flush_every: Optional[int]) -> None:
+        self.pending: Number = 0
+        self.count = 0
+        self.flush_every = flush_every
+        self.shard = shard
+
+    def add(self, amount: Number = 1) -> None:
+        self.pending += amount
+        self.count += 1
+        if self.flush_every is not None and self.count >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        self.shard.value += self.pending
+        self.pending = 0
+        self.count = 0
+
+    def __enter__(self) -> "Batch":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+
+class ShardedCounter:
+    def __init__(self, initial: Number = 0) -> None:
+        self.local = threading.local()
+        self.lock = threading.Lock()  # only for adding, reading and folding shards
+        self.shards: List[Tuple[threading.Thread, Shard]] = []
+        self.retired: Number = initial  # the shards of threads that have exited
+
+    def _shard(self) -> Shard:
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = Shard()
+            with self.lock:
+                self.shards.append((threading.current_thread(), shard))
+            return shard
+
+    def increment(self, amount: Number = 1) -> None:
+        try:
+            self.local.shard.value += amount
+        except AttributeError:
+            self._shard().value += amount
+
+    def batch(self, flush_every: Optional[int] = None) -> Batch:
+        """
+        A Batch of local increments for the calling thread, added to the counter when it
+        is flushed: every flush_every adds (None only at the end), and when the with
+        block exits.
+
+            with counter.batch(flush_every=1000) as batch:
+                for item in items:
+                    batch.add()
+        """
+        return Batch(self._shard(), flush_every)
+
+    @property
+    def value(self) -> Number:
+        with self.lock:
+            live = []
+            for thread, shard in self.shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    # the thread is gone, nothing writes to this shard any more
+                    self.retired += shard.value
+            self.shards = live
+            return self.retired + sum(shard.value for _, shard in live)
+
+    def __int__(self) -> int:
+        return int(self.value)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.value})"
+
+
+class LockedCounter:
+    """
+    One value behind one lock, like basics02_shared_data.py.
+    """
+
+    def __init__(self, initial: Number = 0) -> None:
+        self.lock = threading.Lock()
+        self._value = initial
+
+    def increment(self, amount: Number = 1) -> None:
+        with self.lock:
+            self._value += amount
+
+    @property
+    def value(self) -> Number:
+        with self.lock:
+            return self._value
+
+    def __int__(self) -> int:
+        return int(self.value)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.value})"
@@ -0,0 +1,331 @@
+'''
+A reusable worker pool, built on the queue + worker threads + None sentinel pattern
+of basics04_queue_threads.py, with what that example leaves out:
+
+- Backpressure: the queue is bounded (queue_size). When it's full, put() either blocks
+  the producer until there is room (policy="block") or raises PoolFull right away
+  (policy="reject"), so a fast producer can't pile up unlimited work in memory.
+- Autoscaling: the pool starts with min_workers threads. When put() sees more queued
+  tasks than idle workers it starts another one, up to max_workers. A worker that has
+  had nothing to do for idle_timeout seconds exits, down to min_workers.
+- Results: put() returns a concurrent.futures.Future, so the caller can wait for the
+  result (future.result()) or the exception the task raised.
+- Per-task timeouts: put(..., timeout=s). A task still queued when its time is up is
+  not run at all; a task running past it has its future failed with TimeoutError.
+  A thread can't be killed, so the task itself runs on, but its result is dropped
+  and nobody waits for it.
+- Graceful shutdown: shutdown() stops accepting tasks, lets the workers finish what is
+  queued (or cancels it, cancel_pending=True) and then stops them with sentinels. A
+  put() that was already accepted when shutdown() started gets its task in ahead of
+  the sentinels; the last worker to exit stops the watchdog.
+'''
+
+import heapq
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+class PoolFull(Exception):
+    pass
+
+
+class PoolClosed(RuntimeError):
+    pass
+
+
+class WorkItem(NamedTuple):
+    future: Future
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+    deadline: Optional[float]
+
+
+def _complete(future: Future, result: Any = None, exception: Optional[BaseException] = None) -> None:
+    # the watchdog may have failed the future with TimeoutError in the meantime
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class TimeoutWatchdog:
+    """
+    One thread that fails the futures of tasks running past their deadline, instead of a
+    threading.Timer (a whole thread) per task.
+    """
+
+    def __init__(self) -> None:
+        self.deadlines: List[Tuple[float, int, Future]] = []
+        self.sequence = itertools.count()  # tie breaker, futures don't compare
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, name="pool-watchdog", daemon=True)
+        self.thread.start()
+
+    def watch(self, future: Future, deadline: float) -> None:
+        with self.condition:
+            heapq.heappush(self.deadlines, (deadline, next(self.sequence), future))
+            # wake the thread up if this is now the earliest deadline
+            if self.deadlines[0][2] is future:
+                self.condition.notify()
+
+    def run(self) -> None:
+        with self.condition:
+            while not self.stopped:
+                now = time.monotonic()
+                while self.deadlines and (self.deadlines[0][0] <= now or self.deadlines[0][2].done()):
+                    _, _, future = heapq.heappop(self.deadlines)
+                    if not future.done():
+                        _complete(future, exception=TimeoutError("task timed out"))
+                wait = self.deadlines[0][0] - now if self.deadlines else None
+                self.condition.wait(wait)
+
+    def stop(self) -> None:
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.thread.join()
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        min_workers: int = 1,
+        max_workers: int = 8,
+        queue_size: int = 1000,
+        policy: str = "block",
+        idle_timeout: float = 5.0,
+    ) -> None:
+        """
+        Args:
+            min_workers (int): threads kept running even when idle, at least 1.
+            max_workers (int): upper limit of threads.
+            queue_size (int): tasks that can wait in the queue.
+            policy (str): "block" or "reject", what put() does when the queue is full.
+            idle_timeout (float): seconds a worker above min_workers waits for a task before exiting.
+        """
+        if not 1 <= min_workers <= max_workers:
+            raise ValueError("need 1 <= min_workers <= max_workers")
+        if policy not in ("block", "reject"):
+            raise ValueError(f"unknown policy {policy!r}")
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.policy = policy
+        self.idle_timeout = idle_timeout
+        self.tasks: "queue.Queue[Optional[WorkItem]]" = queue.Queue(maxsize=queue_size)
+        self.watchdog = TimeoutWatchdog()
+
+        self.lock = threading.Lock()
+        # put() calls between the closed check and the end of the enqueue, shutdown()
+        # waits for them so that no task lands behind the sentinels
+        self.putting = 0
+        self.puts_done = threading.Condition(self.lock)
+        self.threads: List[threading.Thread] = []
+        self.workers = 0
+        self.busy = 0
+        self.closed = False
+        self.stats = {"completed": 0, "failed": 0, "rejected": 0, "timed_out": 0, "peak_workers": 0}
+
+        for _ in range(min_workers):
+            self._start_worker()
+
+    # ------------------------ Producer Side ------------------------
+    def put(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+        block_timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Future:
+        """
+        Queue fn(*args, **kwargs) and return the Future of its result.
+
+        Args:
+            fn (Callable): the task.
+            timeout (float): seconds from now the task has to finish in, None for no limit.
+            block_timeout (float): with policy="block", seconds to wait for room in the
+                queue before giving up with PoolFull, None waits as long as it takes.
+
+        Raises:
+            PoolFull: the queue is full (policy="reject", or block_timeout passed).
+            PoolClosed: the pool is shut down.
+        """
+        with self.lock:
+            if self.closed:
+                raise PoolClosed("the pool is shut down")
+            self.putting += 1
+        future: Future = Future()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        item = WorkItem(future, fn, args, kwargs, deadline)
+        try:
+            if self.policy == "reject":
+                self.tasks.put_nowait(item)
+            else:
+                # not under self.lock: the workers need it to make room
+                self.tasks.put(item, timeout=block_timeout)
+        except queue.Full:
+            with self.lock:
+                self.stats["rejected"] += 1
+            raise PoolFull(f"{self.tasks.maxsize} tasks are already queued") from None
+        finally:
+            with self.lock:
+                self.putting -= 1
+                if not self.putting:
+                    self.puts_done.notify_all()
+
+        if deadline is not None:
+            self.watchdog.watch(future, deadline)
+        self._maybe_scale_up()
+        return future
+
+    def join(self) -> None:
+        """
+        Block until every task put so far has been processed.
+        """
+        self.tasks.join()
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """
+        Stop accepting tasks and stop the workers once the queue is drained.
+
+        Args:
+            wait (bool): block until all the workers have exited.
+            cancel_pending (bool): cancel the tasks still waiting in the queue instead
+                of running them.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            workers = self.workers
+
+        # puts accepted before closed was set finish their enqueue first (a blocked one
+        # waits for room, which the workers or _cancel_queued make)
+        while True:
+            if cancel_pending:
+                self._cancel_queued()
+            with self.lock:
+                if not self.putting:
+                    break
+                self.puts_done.wait(0.05 if cancel_pending else None)
+        if cancel_pending:
+            self._cancel_queued()
+
+        # Sentinels go in behind the queued tasks, so those still run first (the "drain").
+        for _ in range(workers):
+            self.tasks.put(None)
+        if wait:
+            for thread in list(self.threads):
+                thread.join()
+
+    def _cancel_queued(self) -> None:
+        while True:
+            try:
+                item = self.tasks.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item.future.cancel()
+            self.tasks.task_done()
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    # ------------------------ Workers ------------------------
+    def _start_worker(self) -> None:
+        # called with self.lock held, or from __init__
+        self.workers += 1
+        self.stats["peak_workers"] = max(self.stats["peak_workers"], self.workers)
+        thread = threading.Thread(target=self._worker, daemon=True)
+        self.threads = [t for t in self.threads if t.is_alive()]
+        self.threads.append(thread)
+        thread.start()
+
+    def _maybe_scale_up(self) -> None:
+        with self.lock:
+            idle = self.workers - self.busy
+            if not self.closed and self.workers < self.max_workers and self.tasks.qsize() > idle:
+                self._start_worker()
+
+    def _worker(self) -> None:
+        while True:
+            try:
+                item = self.tasks.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self.lock:
+                    if self.workers > self.min_workers and not self.closed:
+                        self.workers -= 1
+                        return
+                continue
+
+            if item is None:
+                with self.lock:
+                    self.workers -= 1
+                    last = self.workers == 0
+                self.tasks.task_done()
+                if last:
+                    # also when shutdown(wait=False) didn't stay to see it
+                    self.watchdog.stop()
+                return
+
+            with self.lock:
+                self.busy += 1
+            try:
+                self._run(item)
+            finally:
+                with self.lock:
+                    self.busy -= 1
+                self.tasks.task_done()
+
+    def _run(self, item: WorkItem) -> None:
+        # Already finished: the watchdog failed it while it was still queued. Checked first,
+        # set_running_or_notify_cancel() logs a critical error for a finished future.
+        if item.future.done() and not item.future.cancelled():
+            self._count("timed_out")
+            return
+        try:
+            # False if the future was cancelled while queued
+            if not item.future.set_running_or_notify_cancel():
+                return
+        except RuntimeError:
+            # the watchdog finished it between the check above and now
+            self._count("timed_out")
+            return
+        if item.deadline is not None and time.monotonic() >= item.deadline:
+            _complete(item.future, exception=TimeoutError("task timed out in the queue"))
+            self._count("timed_out")
+            return
+        try:
+            result = item.fn(*item.args, **item.kwargs)
+        except BaseException as exc:
+            _complete(item.future, exception=exc)
+            self._count("failed")
+        else:
+            _complete(item.future, result)
+            if item.future.exception() is not None:  # the watchdog got there first
+                self._count("timed_out")
+            else:
+                self._count("completed")
+
+    def _count(self, stat: str) -> None:
+        with self.lock:
+            self.stats[stat] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Current workers, busy workers and queue depth, plus the counters.
+        """
+        with self.lock:
+            return {"workers": self.workers, "busy": self.busy, "queued": self.tasks.qsize(), **self.stats}